@@ -0,0 +1,203 @@
+import sys
+import os
+import random
+import threading
+from array import array
+
+sys.path.append(
+    os.path.abspath(os.path.join(os.path.dirname(__file__), os.path.pardir))
+)
+
+from storage.internal_key_value import InternalKeyValue
+
+# node layout in links array: entry_offset + height + next node of each layer
+_ENTRY_OFFSET, _HEIGHT, _NEXT = 0, 1, 2
+# node id of head, also used as null pointer since no node links to head
+_HEAD = 0
+
+
+class ArenaSkipList(object):
+    """compact SkipList of InternalKey -> value for memtable.
+    Entries are encoded records appended into one bytearray arena, nodes are slots in one
+    integer array and refer each other by index, so no Python object is kept per entry.
+    Same single-writer/multi-reader semantics as LockFreeSkipList
+    """
+
+    MAX_HEIGHT = 32
+
+    def __init__(self, iterable=None):
+        iterable = iterable if iterable else []
+        self._write_lock = threading.Lock()
+        self._arena = bytearray()
+        self._links = array("q", [-1, self.MAX_HEIGHT] + [_HEAD] * self.MAX_HEIGHT)
+        self._height = 1
+        self._size = 0
+        self.put_many(iterable)
+
+    @property
+    def memory_usage(self):
+        """real bytes held by arena and node links"""
+        return len(self._arena) + len(self._links) * self._links.itemsize
+
+    def put(self, internal_key, value):
+        self.put_many([(internal_key, value)])
+
+    def put_many(self, key_value_pairs):
+        """put (InternalKey, value) pairs in sorted order, later pair wins for duplicated keys.
+        Search of each key starts from predecessors of previous key(search fingers)
+        """
+        with self._write_lock:
+            fingers = [_HEAD] * self.MAX_HEIGHT
+            for internal_key, value in sorted(
+                key_value_pairs, key=lambda pair: pair[0]
+            ):
+                fingers = self._find_predecessors(internal_key, fingers)
+                self._put(internal_key, value, fingers)
+
+    def floor(self, internal_key):
+        """return (InternalKey, value) of the largest key no greater than internal_key"""
+        links, current = self._links, _HEAD
+        for level in range(self._height - 1, -1, -1):
+            next_node = links[current + _NEXT + level]
+            while next_node != _HEAD and self._key_at(next_node) <= internal_key:
+                current = next_node
+                next_node = links[current + _NEXT + level]
+        if current == _HEAD:
+            return None
+        internal_key_value = self._entry_at(current)
+        return internal_key_value.extract_internal_key(), internal_key_value.value
+
+    def floor_many(self, internal_keys):
+        """floor of each key in sorted internal_keys, search of each key starts from predecessors
+        of previous key(search fingers)
+        """
+        result, fingers = [], [_HEAD] * self.MAX_HEIGHT
+        for internal_key in internal_keys:
+            fingers = self._find_predecessors(internal_key, fingers)
+            node = self._links[fingers[0] + _NEXT]
+            if node == _HEAD or self._key_at(node) != internal_key:
+                node = fingers[0]
+            if node == _HEAD:
+                result.append(None)
+            else:
+                internal_key_value = self._entry_at(node)
+                result.append(
+                    (
+                        internal_key_value.extract_internal_key(),
+                        internal_key_value.value,
+                    )
+                )
+        return result
+
+    def items(self, start_internal_key=None):
+        """iterate from the first key no less than start_internal_key without lock,
+        nodes inserted after iteration starts are invisible
+        """
+        # node ids grow with insertion
+        links, limit = self._links, len(self._links)
+        node = (
+            links[_HEAD + _NEXT]
+            if start_internal_key is None
+            else links[self._find_less_than(start_internal_key) + _NEXT]
+        )
+        while node != _HEAD:
+            if node < limit:
+                internal_key_value = self._entry_at(node)
+                yield internal_key_value.extract_internal_key(), internal_key_value.value
+            node = links[node + _NEXT]
+
+    def reversed_items(self, end_internal_key=None):
+        """iterate keys less than end_internal_key in descending order without lock,
+        each step is a search since nodes only link to successors
+        """
+        limit = len(self._links)
+        node = self._find_less_than(end_internal_key)
+        while node != _HEAD:
+            internal_key_value = self._entry_at(node)
+            internal_key = internal_key_value.extract_internal_key()
+            if node < limit:
+                yield internal_key, internal_key_value.value
+            node = self._find_less_than(internal_key)
+
+    def size(self, accurate=False):
+        return self._size
+
+    def _put(self, internal_key, value, predecessors):
+        """predecessors of key in each layer are found, must be called with writer lock held"""
+        links = self._links
+        entry_offset = len(self._arena)
+        self._arena.extend(
+            InternalKeyValue(
+                internal_key.key,
+                internal_key.sequence_number,
+                internal_key.type,
+                value,
+            ).serialize()
+        )
+        node = links[predecessors[0] + _NEXT]
+        if node != _HEAD and self._key_at(node) == internal_key:
+            # old entry is left in arena, switching offset is atomic
+            links[node + _ENTRY_OFFSET] = entry_offset
+            return
+        height = self._random_height()
+        self._height = max(self._height, height)
+        # fully link new node before publishing it, bottom layer first
+        node = len(links)
+        links.extend(
+            [entry_offset, height]
+            + [links[predecessors[level] + _NEXT + level] for level in range(height)]
+        )
+        for level in range(height):
+            links[predecessors[level] + _NEXT + level] = node
+        self._size += 1
+
+    def _find_predecessors(self, internal_key, fingers):
+        """return last node whose key is less than internal_key in each layer, search starts from
+        fingers which are predecessors of a smaller key
+        """
+        links = self._links
+        predecessors, current = [_HEAD] * self.MAX_HEIGHT, _HEAD
+        for level in range(self._height - 1, -1, -1):
+            # start from the rightmost one of finger and node descended from upper layer
+            finger = fingers[level]
+            if finger != _HEAD and (
+                current == _HEAD or self._key_at(current) < self._key_at(finger)
+            ):
+                current = finger
+            next_node = links[current + _NEXT + level]
+            while next_node != _HEAD and self._key_at(next_node) < internal_key:
+                current = next_node
+                next_node = links[current + _NEXT + level]
+            predecessors[level] = current
+        return predecessors
+
+    def _find_less_than(self, internal_key):
+        """last node whose key is less than internal_key, last node of list if it is None"""
+        links, current = self._links, _HEAD
+        for level in range(self._height - 1, -1, -1):
+            next_node = links[current + _NEXT + level]
+            while next_node != _HEAD and (
+                internal_key is None or self._key_at(next_node) < internal_key
+            ):
+                current = next_node
+                next_node = links[current + _NEXT + level]
+        return current
+
+    def _key_at(self, node):
+        return InternalKeyValue.decode_internal_key(
+            self._arena, self._links[node + _ENTRY_OFFSET]
+        )
+
+    def _entry_at(self, node):
+        return InternalKeyValue.decode(self._arena, self._links[node + _ENTRY_OFFSET])[
+            0
+        ]
+
+    def _random_height(self):
+        height = 1
+        while height < self.MAX_HEIGHT and random.random() <= 0.5:
+            height += 1
+        return height
+
+    def __len__(self):
+        return self.size()
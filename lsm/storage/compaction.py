@@ -0,0 +1,281 @@
+import sys
+import os
+import heapq
+import uuid
+import contextlib
+import configparser
+from collections import defaultdict
+
+sys.path.append(
+    os.path.abspath(os.path.join(os.path.dirname(__file__), os.path.pardir))
+)
+
+from storage.internal_key import KeyType
+from storage.sstable import SSTableWriter
+from logger.log_util import logger
+
+
+class Compaction(object):
+    """sstables picked for one compaction, merged result is written into output_level"""
+
+    def __init__(
+        self, inputs, output_level, older_sstables, table_size_limit=None, conf=None
+    ):
+        assert inputs
+        self.inputs = inputs
+        self.output_level = output_level
+        # sstables out of compaction which may hold older versions of input keys
+        self._older_sstables = older_sstables
+        # size limit of output sstables, use configured one if it is None
+        self._table_size_limit = table_size_limit
+        # options of output sstables, bundled lsm_conf.ini if it is None
+        self._conf = conf
+
+    @property
+    def min_key(self):
+        return min(sstable.min_key for sstable in self.inputs)
+
+    @property
+    def max_key(self):
+        return max(sstable.max_key for sstable in self.inputs)
+
+    def is_base_level_for_key(self, key):
+        """True if no older version of key exists out of this compaction, then tombstone could be dropped"""
+        return not any(
+            sstable.min_key <= key <= sstable.max_key
+            for sstable in self._older_sstables
+        )
+
+    def run(self, table_cache, smallest_snapshot):
+        """k-way merge inputs into new sstables, return SSTableWriter list of outputs.
+        Versions hidden from all snapshots and unnecessary tombstones are dropped
+        """
+        writers, writer = [], None
+        with contextlib.ExitStack() as stack:
+            # keep input readers open while merging
+            sstable_iterators = [
+                stack.enter_context(
+                    table_cache.reader(sstable.table_level, sstable.table_name)
+                ).items(fill_cache=False)
+                for sstable in self.inputs
+            ]
+            for versions in _group_by_key(heapq.merge(*sstable_iterators)):
+                for internal_key_value in self._drop_obsolete_versions(
+                    versions, smallest_snapshot
+                ):
+                    if writer is None or not writer.append(internal_key_value):
+                        if writer:
+                            writer.close()
+                        writer = SSTableWriter(
+                            self.output_level,
+                            uuid.uuid4().hex,
+                            self._table_size_limit,
+                            conf=self._conf,
+                        )
+                        writers.append(writer)
+                        writer.append(internal_key_value)
+        if writer:
+            writer.close()
+        logger.debug(
+            "compaction finished",
+            output_level=self.output_level,
+            input_count=len(self.inputs),
+            output_count=len(writers),
+        )
+        return writers
+
+    def _drop_obsolete_versions(self, versions, smallest_snapshot):
+        """versions of one key in ascending sequence number order, return kept ones in same order"""
+        kept, last_sequence_number = [], None
+        for internal_key_value in reversed(versions):
+            if (
+                last_sequence_number is not None
+                and last_sequence_number <= smallest_snapshot
+            ):
+                # hidden by a newer version which is visible to all snapshots
+                pass
+            elif (
+                internal_key_value.type == KeyType.DELETE
+                and internal_key_value.sequence_number <= smallest_snapshot
+                and self.is_base_level_for_key(internal_key_value.key)
+            ):
+                # nothing to delete in older sstables
+                pass
+            else:
+                kept.append(internal_key_value)
+            last_sequence_number = internal_key_value.sequence_number
+        kept.reverse()
+        return kept
+
+    def __str__(self):
+        return "(inputs: [{}], output_level: {})".format(
+            ", ".join(map(str, self.inputs)), self.output_level
+        )
+
+
+class LeveledCompactionStrategy(object):
+    """level 0 sstables may overlap, sstables in other levels are disjoint and level size grows exponentially"""
+
+    def __init__(self, conf=None):
+        if conf is None:
+            conf = configparser.ConfigParser()
+            conf.read(
+                os.path.join(
+                    os.path.dirname(__file__), os.path.pardir, "conf", "lsm_conf.ini"
+                )
+            )
+        self._conf = conf
+        self._max_level = int(conf["SSTABLE"]["MAX_LEVEL"])
+        self._level0_compaction_trigger = int(
+            conf["COMPACTION"]["LEVEL0_COMPACTION_TRIGGER"]
+        )
+        self._level_size_base = int(conf["COMPACTION"]["LEVEL_SIZE_BASE"])
+        self._level_size_multiplier = int(conf["COMPACTION"]["LEVEL_SIZE_MULTIPLIER"])
+        # max key of last compaction in each level, compact level in round-robin
+        self._compact_pointers = {}
+
+    def pick_compaction(self, sstables):
+        """return Compaction for the level which needs compaction most, None if all levels are fine"""
+        level_to_sstables = defaultdict(list)
+        for sstable in sstables:
+            level_to_sstables[sstable.table_level].append(sstable)
+        best_level, best_score = None, 1
+        # the last level could never be compacted
+        for level in range(self._max_level):
+            score = self._score(level, level_to_sstables[level])
+            if score >= best_score:
+                best_level, best_score = level, score
+        if best_level is None:
+            return None
+
+        if best_level == 0:
+            # level 0 sstables overlap, compact all of them together
+            inputs = list(level_to_sstables[0])
+        else:
+            inputs = [
+                self._next_sstable_to_compact(best_level, level_to_sstables[best_level])
+            ]
+        min_key = min(sstable.min_key for sstable in inputs)
+        max_key = max(sstable.max_key for sstable in inputs)
+        inputs.extend(
+            sstable
+            for sstable in level_to_sstables[best_level + 1]
+            if sstable.min_key <= max_key and min_key <= sstable.max_key
+        )
+        self._compact_pointers[best_level] = max_key
+        older_sstables = [
+            sstable
+            for level in range(best_level + 2, self._max_level + 1)
+            for sstable in level_to_sstables[level]
+        ]
+        return Compaction(inputs, best_level + 1, older_sstables, conf=self._conf)
+
+    def _score(self, level, sstables):
+        if level == 0:
+            return len(sstables) / self._level0_compaction_trigger
+        max_bytes = self._level_size_base * (self._level_size_multiplier ** (level - 1))
+        return sum(sstable.table_size for sstable in sstables) / max_bytes
+
+    def _next_sstable_to_compact(self, level, sstables):
+        sstables = sorted(sstables, key=lambda sstable: sstable.min_key)
+        compact_pointer = self._compact_pointers.get(level)
+        for sstable in sstables:
+            if compact_pointer is None or sstable.min_key > compact_pointer:
+                return sstable
+        # wrap around
+        return sstables[0]
+
+
+class SizeTieredCompactionStrategy(object):
+    """merge similar sized sstables in level 0 into one bigger sstable, every record is rewritten
+    only a few times, which suits write-heavy workloads. Deeper levels are never compacted
+    """
+
+    def __init__(self, conf=None):
+        if conf is None:
+            conf = configparser.ConfigParser()
+            conf.read(
+                os.path.join(
+                    os.path.dirname(__file__), os.path.pardir, "conf", "lsm_conf.ini"
+                )
+            )
+        self._conf = conf
+        self._min_threshold = int(conf["COMPACTION"]["SIZE_TIERED_MIN_THRESHOLD"])
+        self._max_threshold = int(conf["COMPACTION"]["SIZE_TIERED_MAX_THRESHOLD"])
+        self._bucket_low = float(conf["COMPACTION"]["SIZE_TIERED_BUCKET_LOW"])
+        self._bucket_high = float(conf["COMPACTION"]["SIZE_TIERED_BUCKET_HIGH"])
+        self._min_sstable_size = int(conf["COMPACTION"]["SIZE_TIERED_MIN_SSTABLE_SIZE"])
+        # block offsets in sstable index are 32bit, larger tiers are split into several sstables
+        self._max_sstable_size = int(conf["COMPACTION"]["SIZE_TIERED_MAX_SSTABLE_SIZE"])
+
+    def pick_compaction(self, sstables):
+        """return Compaction for the largest bucket of similar sized sstables, None if no bucket is full"""
+        level0_sstables = [sstable for sstable in sstables if sstable.table_level == 0]
+        buckets = [
+            bucket
+            for bucket in self._buckets(level0_sstables)
+            if len(bucket) >= self._min_threshold
+        ]
+        if not buckets:
+            return None
+        # more sstables first, then cheaper one
+        bucket = min(
+            buckets,
+            key=lambda bucket: (
+                -len(bucket),
+                sum(sstable.table_size for sstable in bucket),
+            ),
+        )
+        inputs = bucket[: self._max_threshold]
+        # deeper levels may exist after switching from leveled strategy or bulk loads
+        older_sstables = [sstable for sstable in sstables if sstable not in inputs]
+        # a tier is a single sstable unless it outgrows max sstable size
+        return Compaction(
+            inputs,
+            0,
+            older_sstables,
+            table_size_limit=self._max_sstable_size,
+            conf=self._conf,
+        )
+
+    def _buckets(self, sstables):
+        """group sstables whose sizes are close to bucket average, small sstables are always grouped"""
+        buckets = []
+        for sstable in sorted(sstables, key=lambda sstable: sstable.table_size):
+            for bucket in buckets:
+                average_size = sum(s.table_size for s in bucket) / len(bucket)
+                if (
+                    self._bucket_low * average_size
+                    <= sstable.table_size
+                    <= self._bucket_high * average_size
+                ) or (
+                    sstable.table_size < self._min_sstable_size
+                    and average_size < self._min_sstable_size
+                ):
+                    bucket.append(sstable)
+                    break
+            else:
+                buckets.append([sstable])
+        return buckets
+
+
+COMPACTION_STRATEGIES = {
+    "leveled": LeveledCompactionStrategy,
+    "size_tiered": SizeTieredCompactionStrategy,
+}
+
+
+def _group_by_key(internal_key_values):
+    """group sorted InternalKeyValue stream by key, duplicated (key, sequence_number) are skipped"""
+    versions = []
+    for internal_key_value in internal_key_values:
+        if versions and versions[-1].key != internal_key_value.key:
+            yield versions
+            versions = []
+        if (
+            not versions
+            or versions[-1].sequence_number != internal_key_value.sequence_number
+        ):
+            versions.append(internal_key_value)
+    if versions:
+        yield versions
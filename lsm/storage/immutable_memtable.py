@@ -7,7 +7,9 @@ sys.path.append(
 )
 
 from storage.memtable_log import ImmutableMemtableLog
-from utils.skiplist import SkipList
+from storage.internal_key import KeyType, InternalKey
+from storage.internal_key_value import InternalKeyValue
+from utils.skiplist import LockFreeSkipList
 
 
 class ImmutableMemtable(object):
@@ -28,11 +30,11 @@ class ImmutableMemtable(object):
             )
         )
         # immutable from memtable in-memory, just copy data structure
-        if skiplist:
+        if skiplist is not None:
             self.__skiplist = skiplist
         else:
             # recover skiplist from logs
-            self.__skiplist = SkipList(
+            self.__skiplist = LockFreeSkipList(
                 [
                     (
                         internal_key_value.extract_internal_key(),
@@ -42,9 +44,28 @@ class ImmutableMemtable(object):
                 ]
             )
 
+    def lookup(self, key, sequence_number):
+        """return latest InternalKeyValue(including deletion) no later than sequence_number, None if not found"""
+        return lookup_skiplist(self.__skiplist, key, sequence_number)
+
+    def lookup_many(self, keys, sequence_number):
+        """return {key: latest InternalKeyValue} of sorted keys, keys not found are absent"""
+        return lookup_many_skiplist(self.__skiplist, keys, sequence_number)
+
     def items(self):
         return self.__skiplist.items()
 
+    def scan(self, start=None, end=None, reverse=False):
+        """iterate InternalKeyValue of keys in [start, end) in (key, sequence_number) order"""
+        return scan_skiplist(self.__skiplist, start, end, reverse)
+
+    def remove(self):
+        """remove immutable log after data is persisted in sstables"""
+        self._immutable_log.remove()
+
+    def __len__(self):
+        return self.__skiplist.size()
+
     def __str__(self):
         return (
             "{"
@@ -56,3 +77,58 @@ class ImmutableMemtable(object):
             )
             + "}"
         )
+
+
+def lookup_skiplist(skiplist, key, sequence_number):
+    """find latest version of key no later than sequence_number in a skiplist of InternalKey"""
+    # type is a placeholder here
+    floor_result = skiplist.floor(InternalKey(key, sequence_number, KeyType.PUT))
+    if floor_result is None:
+        return None
+    floor_key, floor_value = floor_result
+    # need to check key again, since we use floor here
+    if floor_key.key == key:
+        assert floor_key.sequence_number <= sequence_number
+        return InternalKeyValue(
+            floor_key.key, floor_key.sequence_number, floor_key.type, floor_value
+        )
+    else:
+        return None
+
+
+def lookup_many_skiplist(skiplist, keys, sequence_number):
+    """lookup_skiplist for sorted keys in one pass, return {key: InternalKeyValue} of found keys"""
+    floor_results = skiplist.floor_many(
+        [InternalKey(key, sequence_number, KeyType.PUT) for key in keys]
+    )
+    result = {}
+    for key, floor_result in zip(keys, floor_results):
+        if floor_result is not None and floor_result[0].key == key:
+            floor_key, floor_value = floor_result
+            result[key] = InternalKeyValue(
+                floor_key.key, floor_key.sequence_number, floor_key.type, floor_value
+            )
+    return result
+
+
+def scan_skiplist(skiplist, start, end, reverse):
+    """iterate InternalKeyValue of keys in [start, end) in a skiplist of InternalKey lazily,
+    in descending order if reverse. None start or end means unbounded
+    """
+    if reverse:
+        # (end, 0) is the smallest InternalKey of end
+        items = skiplist.reversed_items(
+            InternalKey(end, 0, KeyType.PUT) if end is not None else None
+        )
+    else:
+        items = skiplist.items(
+            InternalKey(start, 0, KeyType.PUT) if start is not None else None
+        )
+    for internal_key, value in items:
+        if (reverse and start is not None and internal_key.key < start) or (
+            not reverse and end is not None and internal_key.key >= end
+        ):
+            return
+        yield InternalKeyValue(
+            internal_key.key, internal_key.sequence_number, internal_key.type, value
+        )
@@ -1,4 +1,3 @@
-import pickle
 import sys
 import os
 
@@ -7,7 +6,12 @@ sys.path.append(
 )
 
 from utils import byte_utils
-from internal_key import KeyType, InternalKey
+from storage.internal_key import KeyType, InternalKey
+
+# header flags
+PUT_FLAG = 1 << 63
+FORMAT_V2_FLAG = 1 << 62
+SEQUENCE_NUMBER_MASK = (1 << 62) - 1
 
 
 class InternalKeyValue(object):
@@ -15,11 +19,16 @@ class InternalKeyValue(object):
 
     def __init__(self, key, sequence_number, type=KeyType.PUT, value=None):
         """
-        type  + sequence_number +  key_size +    key    +    value_size +  value
-        1bit       63bit            32bit     var-length       32bit     var-length
+        version 2, key and value are encoded by byte_utils.object_to_byte_array:
+        type  + version + sequence_number + key_size +    key    + value_size +  value
+        1bit     1bit        62bit          varint   var-length    varint    var-length
+
+        version 1, key and value are pickled:
+        type  + version + sequence_number + key_size +    key    + value_size +  value
+        1bit     1bit        62bit           32bit   var-length     32bit    var-length
         """
         assert key is not None
-        assert sequence_number >= 0
+        assert 0 <= sequence_number <= SEQUENCE_NUMBER_MASK
 
         self.type = type
         self.sequence_number = sequence_number
@@ -75,27 +84,20 @@ class InternalKeyValue(object):
         return hash_value
 
     def serialize(self):
-        """serialize internal key-value pair to byte_array, only pickle objects when necessary"""
-        byte_array = bytearray()
-        header = (
-            self.sequence_number | (1 << 63)
-            if self.type == KeyType.PUT
-            else self.sequence_number
-        )
+        """serialize internal key-value pair to byte_array in version 2 format"""
+        header = self.sequence_number | FORMAT_V2_FLAG
+        if self.type == KeyType.PUT:
+            header |= PUT_FLAG
         # append header first
-        byte_array.extend(byte_utils.integer_to_n_bytes_array(header, 8))
-        pickle_key = pickle.dumps(self.key)
-        # key length
-        byte_array.extend(byte_utils.integer_to_four_bytes_array(len(pickle_key)))
-        # key byte array
-        byte_array.extend(pickle_key)
+        byte_array = bytearray(byte_utils.integer_to_n_bytes_array(header, 8))
+        key_byte_array = byte_utils.object_to_byte_array(self.key)
+        byte_array.extend(byte_utils.encode_varint(len(key_byte_array)))
+        byte_array.extend(key_byte_array)
         # it is a put operation, value is needed
         if self.type == KeyType.PUT:
-            pickle_value = pickle.dumps(self.value)
-            # value length
-            byte_array.extend(byte_utils.integer_to_four_bytes_array(len(pickle_value)))
-            # value byte array
-            byte_array.extend(pickle_value)
+            value_byte_array = byte_utils.object_to_byte_array(self.value)
+            byte_array.extend(byte_utils.encode_varint(len(value_byte_array)))
+            byte_array.extend(value_byte_array)
         return bytes(byte_array)
 
     def extract_internal_key(self):
@@ -109,32 +111,76 @@ class InternalKeyValue(object):
             return None
         # parsing header
         header = byte_utils.byte_array_to_integer(header)
-        type = KeyType.PUT if (header & (1 << 63)) else KeyType.DELETE
-        sequence_number = header & ((1 << 63) - 1)
+        type = KeyType.PUT if (header & PUT_FLAG) else KeyType.DELETE
+        sequence_number = header & SEQUENCE_NUMBER_MASK
         # parsing key and value
-        key_size = file_io.read(4)
-        if len(key_size) != 4:
+        if header & FORMAT_V2_FLAG:
+            key_size = byte_utils.read_varint(file_io)
+        else:
+            key_size = _read_fixed_size(file_io)
+        if key_size is None:
             return None
-        key_size = byte_utils.byte_array_to_integer(key_size)
         key_byte_array = file_io.read(key_size)
         if len(key_byte_array) != key_size:
             return None
         if type == KeyType.PUT:
-            value_size = file_io.read(4)
-            if len(value_size) != 4:
+            if header & FORMAT_V2_FLAG:
+                value_size = byte_utils.read_varint(file_io)
+            else:
+                value_size = _read_fixed_size(file_io)
+            if value_size is None:
                 return None
-            value_size = byte_utils.byte_array_to_integer(value_size)
             value_byte_array = file_io.read(value_size)
             if len(value_byte_array) != value_size:
                 return None
-            key, value = pickle.loads(key_byte_array), pickle.loads(value_byte_array)
             return InternalKeyValue(
-                key=key, sequence_number=sequence_number, type=type, value=value
+                key=byte_utils.byte_array_to_object(key_byte_array),
+                sequence_number=sequence_number,
+                type=type,
+                value=byte_utils.byte_array_to_object(value_byte_array),
             )
         else:
-            key = pickle.loads(key_byte_array)
+            key = byte_utils.byte_array_to_object(key_byte_array)
             return InternalKeyValue(key=key, sequence_number=sequence_number, type=type)
 
+    @staticmethod
+    def decode(buffer, offset=0):
+        """decode from in-memory buffer at offset, return (InternalKeyValue, next_offset).
+        InternalKeyValue is None if buffer is truncated or corrupted
+        """
+        if offset + 8 > len(buffer):
+            return None, offset
+        header = byte_utils.byte_array_to_integer(buffer[offset : offset + 8])
+        type = KeyType.PUT if (header & PUT_FLAG) else KeyType.DELETE
+        sequence_number = header & SEQUENCE_NUMBER_MASK
+        is_format_v2 = bool(header & FORMAT_V2_FLAG)
+        result = _decode_field(buffer, offset + 8, is_format_v2)
+        if result is None:
+            return None, offset
+        key, position = result
+        value = None
+        if type == KeyType.PUT:
+            result = _decode_field(buffer, position, is_format_v2)
+            if result is None:
+                return None, offset
+            value, position = result
+        return InternalKeyValue(key, sequence_number, type, value), position
+
+    @staticmethod
+    def decode_internal_key(buffer, offset=0):
+        """decode only InternalKey of record at offset, value is skipped. None if buffer is truncated"""
+        if offset + 8 > len(buffer):
+            return None
+        header = byte_utils.byte_array_to_integer(buffer[offset : offset + 8])
+        result = _decode_field(buffer, offset + 8, bool(header & FORMAT_V2_FLAG))
+        if result is None:
+            return None
+        return InternalKey(
+            result[0],
+            header & SEQUENCE_NUMBER_MASK,
+            KeyType.PUT if (header & PUT_FLAG) else KeyType.DELETE,
+        )
+
     @staticmethod
     def delete_key(key, sequence_number):
         return InternalKeyValue(key, sequence_number, type=KeyType.DELETE)
@@ -142,3 +188,31 @@ class InternalKeyValue(object):
     @staticmethod
     def put_key(key, value, sequence_number):
         return InternalKeyValue(key, sequence_number, type=KeyType.PUT, value=value)
+
+
+def _read_fixed_size(file_io):
+    """read 32bit size of version 1 format, return None if EOF found"""
+    size = file_io.read(4)
+    if len(size) != 4:
+        return None
+    return byte_utils.byte_array_to_integer(size)
+
+
+def _decode_field(buffer, position, is_format_v2):
+    """decode size-prefixed key or value, return (object, next_position), None if buffer is truncated"""
+    if is_format_v2:
+        result = byte_utils.decode_varint(buffer, position)
+        if result is None:
+            return None
+        size, position = result
+    else:
+        if position + 4 > len(buffer):
+            return None
+        size = byte_utils.byte_array_to_integer(buffer[position : position + 4])
+        position += 4
+    if size == 0 or position + size > len(buffer):
+        return None
+    return (
+        byte_utils.byte_array_to_object(buffer[position : position + size]),
+        position + size,
+    )
@@ -1,16 +1,730 @@
+import sys
+import os
+import uuid
+import threading
+import bisect
+import contextlib
+import configparser
+from collections import defaultdict, deque, Counter
+
+sys.path.append(
+    os.path.abspath(os.path.join(os.path.dirname(__file__), os.path.pardir))
+)
+
+from storage.memtable import Memtable
+from storage.immutable_memtable import ImmutableMemtable
+from storage.internal_key import KeyType
+from storage.internal_key_value import InternalKeyValue
+from storage.manifest import Manifest, SSTableMetadata
+from storage.sequence_manager import SequenceManager
+from storage.sstable import SSTableWriter, delete_sstable, move_sstable
+from storage.table_cache import TableCache
+from storage.compaction import COMPACTION_STRATEGIES
+from storage.merging_iterator import MergingIterator, visible_key_values
+from storage.snapshot import Snapshot
+from utils.lru_cache import LRUCache
+from logger.log_util import logger
+
+
 class LSMClient(object):
+    """LSM storage engine, memtable is frozen and flushed into sstables by a background thread,
+    which also compacts sstables
+    """
+
     def __init__(self, conf_path=None):
+        conf = configparser.ConfigParser()
+        conf.read(
+            os.path.join(
+                os.path.dirname(__file__), os.path.pardir, "conf", "lsm_conf.ini"
+            )
+        )
+        # client options could be overridden by conf_path
+        if conf_path:
+            conf.read(conf_path)
+        self._memtable_size_limit = int(conf["MEMTABLE"]["MEMTABLE_SIZE_LIMIT"])
+        # seconds a group commit leader waits for more writers
+        self._group_commit_max_delay = (
+            float(conf["MEMTABLE"]["GROUP_COMMIT_MAX_DELAY"]) / 1000
+        )
+        # sstable and compaction options are read from merged conf too
+        self._conf = conf
+        self._compaction_strategy = COMPACTION_STRATEGIES[
+            conf["COMPACTION"]["STRATEGY"]
+        ](conf)
+        self._snapshot_limit = int(conf["SNAPSHOT"]["SNAPSHOT_LIMIT"])
+        self._max_level = int(conf["SSTABLE"]["MAX_LEVEL"])
+        # decoded data blocks shared by all sstable readers
+        self._block_cache = LRUCache(int(conf["CACHE"]["BLOCK_CACHE_SIZE"]))
 
-        pass
+        self._sequence_manager = SequenceManager()
+        self._manifest = Manifest()
+        self._memtable = Memtable(
+            self._sequence_manager,
+            conf["MEMTABLE"]["LOG_SYNC"],
+            conf["MEMTABLE"]["MEMTABLE_TYPE"],
+        )
+        # recover immutable memtable which was not flushed before last shutdown
+        self._immutable_memtable = ImmutableMemtable()
+        if len(self._immutable_memtable) == 0:
+            self._immutable_memtable.remove()
+            self._immutable_memtable = None
+        # sequence number file may be lost or corrupted, never reuse numbers found in logs
+        self._sequence_manager.advance_to(
+            max(
+                (
+                    internal_key.sequence_number
+                    for memtable in [self._memtable, self._immutable_memtable]
+                    if memtable is not None
+                    for internal_key, _ in memtable.items()
+                ),
+                default=0,
+            )
+        )
+        # latest sequence number whose writes are all applied. Allocated numbers are ahead of it
+        # while a group is being committed, reads and snapshots never see a partial group
+        self._applied_sequence_number = self._sequence_manager.current
+        # sequence numbers of bulk loads not registered yet, visible one stays below them
+        self._pending_bulk_loads = set()
+        # sequence number of default reads and new snapshots
+        self._visible_sequence_number = self._applied_sequence_number
+        # incremented after memtable is frozen, in-memory readers retry if it changes
+        self._memtable_version = 0
+        self._table_cache = TableCache(
+            int(conf["CACHE"]["TABLE_CACHE_MAX_OPEN_TABLES"]),
+            int(conf["CACHE"]["TABLE_CACHE_SIZE"]),
+            self._block_cache,
+            conf["SSTABLE"].getboolean("USE_MMAP"),
+        )
+        # incremented when sstables are removed, reads pin the epoch they started with.
+        # sstable files are deleted after all reads which may see them are finished
+        self._sstables_epoch = 0
+        self._active_read_epochs = Counter()
+        self._obsolete_sstables = []
+        # table name -> largest sequence number in it, for sstables written since client started.
+        # Older sstables only hold versions older than any bulk load of this client
+        self._sstable_max_sequence_numbers = {}
+        # sequence number -> count of live snapshots pinned at it
+        self._snapshots = Counter()
+        self._closed = False
+        # guard writes, background work state and manifest
+        self._lock = threading.Lock()
+        self._background_work_condition = threading.Condition(self._lock)
+        # pending writers, the first one is leader which commits the whole group.
+        # Bulk loads wait on the condition too, for commit, flush and compaction to finish
+        self._writers = deque()
+        self._writers_condition = threading.Condition(self._lock)
+        # True while leader writes a group into memtable
+        self._committing = False
+        # True while background thread runs a compaction
+        self._compacting = False
+        # first failure of flush or compaction, background work is stopped and later writes fail
+        self._background_error = None
+        self._background_thread = threading.Thread(
+            target=self._background_work, name="lsm-background-work", daemon=True
+        )
+        self._background_thread.start()
 
     def put(self, key, value):
-
-        pass
+        self._write([(key, value, KeyType.PUT)])
 
     def remove(self, key):
+        self._write([(key, None, KeyType.DELETE)])
 
-        pass
+    def write(self, write_batch):
+        """apply all operations of WriteBatch atomically, they share one sequence number"""
+        if len(write_batch) > 0:
+            self._write(write_batch.update_operations)
 
     def get(self, key, sequence_number=None):
+        sequence_number = (
+            sequence_number
+            if sequence_number is not None
+            else self._visible_sequence_number
+        )
+        internal_key_value = self._lookup_in_memory(key, sequence_number)
+        if internal_key_value is None:
+            internal_key_value = self._lookup_in_sstables(key, sequence_number)
+        if internal_key_value is None or internal_key_value.type == KeyType.DELETE:
+            return None
+        return internal_key_value.value
+
+    def multi_get(self, keys, sequence_number=None):
+        """return values of keys in order of keys, None for missing ones. Keys are sorted once and
+        resolved in batch by memtables and each level, keys in same block share one block read
+        """
+        sequence_number = (
+            sequence_number
+            if sequence_number is not None
+            else self._visible_sequence_number
+        )
+        sorted_keys = sorted(set(keys))
+        internal_key_values = self._lookup_many_in_memory(sorted_keys, sequence_number)
+        missing_keys = [key for key in sorted_keys if key not in internal_key_values]
+        if missing_keys:
+            internal_key_values.update(
+                self._lookup_many_in_sstables(missing_keys, sequence_number)
+            )
+        values = []
+        for key in keys:
+            internal_key_value = internal_key_values.get(key)
+            if internal_key_value is None or internal_key_value.type == KeyType.DELETE:
+                values.append(None)
+            else:
+                values.append(internal_key_value.value)
+        return values
+
+    def scan(self, start=None, end=None, reverse=False, sequence_number=None):
+        """iterate (key, value) of keys in [start, end) in key order lazily, descending if reverse.
+        None start or end means unbounded. Data is captured when iteration starts, sstables
+        are pinned until iteration finishes or iterator is closed
+        """
+        sequence_number = (
+            sequence_number
+            if sequence_number is not None
+            else self._visible_sequence_number
+        )
+        # memtables must be captured before sstables, otherwise a flush in between loses data
+        iterators = self._scan_in_memory(start, end, reverse)
+        epoch, sstables = self._pin_sstables()
+        try:
+            with contextlib.ExitStack() as stack:
+                for sstable in sstables:
+                    if (start is None or sstable.max_key >= start) and (
+                        end is None or sstable.min_key < end
+                    ):
+                        reader = stack.enter_context(
+                            self._table_cache.reader(
+                                sstable.table_level, sstable.table_name
+                            )
+                        )
+                        iterators.append(reader.scan(start, end, reverse))
+                yield from visible_key_values(
+                    MergingIterator(iterators, reverse), sequence_number, reverse
+                )
+        finally:
+            self._unpin_sstables(epoch)
+
+    def bulk_load(self, key_value_pairs):
+        """load (key, value) pairs sorted by strictly increasing key into sstables directly,
+        bypassing memtable log and skiplist. Loaded data is newer than data written before
+        the load starts. Sstables are registered atomically at the deepest level which keeps
+        newer data above older data. The load is rejected if concurrent writes of its range
+        were already compacted below that level. Writes committed while loading become
+        visible after the load is registered. Return count of loaded pairs
+        """
+        with self._lock:
+            # one sequence number for all pairs, keys are unique
+            sequence_number = self._sequence_manager.allocate(1)
+            self._pending_bulk_loads.add(sequence_number)
+        try:
+            return self._bulk_load(key_value_pairs, sequence_number)
+        finally:
+            with self._lock:
+                if sequence_number in self._pending_bulk_loads:
+                    self._pending_bulk_loads.discard(sequence_number)
+                    self._publish_sequence_number(sequence_number)
+
+    def _bulk_load(self, key_value_pairs, sequence_number):
+        count, writers = self._write_bulk_sstables(key_value_pairs, sequence_number)
+        if not writers:
+            return 0
+        min_key, max_key = writers[0].min_key, writers[-1].max_key
+        with self._lock:
+            while True:
+                if self._background_error is not None:
+                    for writer in writers:
+                        delete_sstable(writer.table_level, writer.table_name)
+                    self._raise_background_error()
+                # registration must not race with commits or compactions which change levels
+                if self._committing or self._compacting:
+                    self._writers_condition.wait()
+                # older versions of loaded keys in memory would shadow loaded data, flush them first
+                elif self._immutable_memtable is not None and self._contains_range(
+                    self._immutable_memtable, min_key, max_key
+                ):
+                    self._writers_condition.wait()
+                elif self._contains_range(self._memtable, min_key, max_key):
+                    if self._immutable_memtable is None:
+                        self._freeze_memtable()
+                    self._writers_condition.wait()
+                else:
+                    break
+            level = self._bulk_load_level(min_key, max_key)
+            if self._has_newer_sstables_below(level, min_key, max_key, sequence_number):
+                for writer in writers:
+                    delete_sstable(writer.table_level, writer.table_name)
+                raise Exception(
+                    "bulk load of [{}, {}] conflicts with concurrent writes, retry it".format(
+                        min_key, max_key
+                    )
+                )
+            for writer in writers:
+                if level != writer.table_level:
+                    move_sstable(writer.table_level, level, writer.table_name)
+            self._manifest.update_sstables(
+                [
+                    SSTableMetadata(
+                        level,
+                        writer.table_name,
+                        writer.table_size,
+                        writer.min_key,
+                        writer.max_key,
+                    )
+                    for writer in writers
+                ],
+                [],
+            )
+            for writer in writers:
+                self._sstable_max_sequence_numbers[writer.table_name] = sequence_number
+            # loaded data becomes visible after it is registered
+            self._pending_bulk_loads.discard(sequence_number)
+            self._publish_sequence_number(sequence_number)
+            self._background_work_condition.notify_all()
+        logger.debug(
+            "bulk load finished", count=count, level=level, sstable_count=len(writers)
+        )
+        return count
+
+    def snapshot(self):
+        """return Snapshot pinned at visible sequence number, it should be released after use"""
+        with self._lock:
+            if sum(self._snapshots.values()) >= self._snapshot_limit:
+                raise Exception(
+                    "too many live snapshots, limit is {}".format(self._snapshot_limit)
+                )
+            sequence_number = self._visible_sequence_number
+            self._snapshots[sequence_number] += 1
+        logger.debug("snapshot created", sequence_number=sequence_number)
+        return Snapshot(self, sequence_number)
+
+    @property
+    def block_cache_stats(self):
+        """hits, misses, evictions and usage of block cache"""
+        return self._block_cache.stats()
+
+    @property
+    def table_cache_stats(self):
+        """hits, misses, evictions and usage of table cache"""
+        return self._table_cache.stats()
+
+    def close(self):
+        """wait for pending flush, then release all resources"""
+        with self._lock:
+            self._closed = True
+            self._background_work_condition.notify_all()
+        self._background_thread.join()
+        self._delete_obsolete_sstables()
+        self._memtable.close()
+        self._manifest.close()
+        self._sequence_manager.close()
+        self._table_cache.close()
+        with self._lock:
+            if self._background_error is not None:
+                self._raise_background_error()
+
+    def _write(self, update_operations):
+        """group commit. Writers queue up, the first one becomes leader and commits batches of all
+        queued writers with one log append, followers just wait for it
+        """
+        writer = _Writer(update_operations)
+        with self._lock:
+            # memtable would never be flushed again
+            if self._background_error is not None:
+                self._raise_background_error()
+            self._writers.append(writer)
+            while not writer.done and writer is not self._writers[0]:
+                self._writers_condition.wait()
+            if writer.done:
+                if writer.error:
+                    raise writer.error
+                return
+            if self._group_commit_max_delay > 0:
+                # give concurrent writers a chance to join the group
+                self._writers_condition.wait(self._group_commit_max_delay)
+            group, self._committing = list(self._writers), True
+        # log and skiplist are written without lock, later writers queue up behind the leader.
+        # Memtable is never frozen while a group is being committed
+        error, last_sequence_number = None, None
+        try:
+            last_sequence_number = self._memtable.write_batches(
+                [w.update_operations for w in group]
+            )
+        except Exception as e:
+            error = e
+        with self._lock:
+            if last_sequence_number is not None:
+                # the whole group becomes visible at once
+                self._publish_sequence_number(last_sequence_number)
+            self._committing = False
+            for w in group:
+                self._writers.popleft()
+                w.done, w.error = True, error
+            logger.debug("group committed", batch_count=len(group))
+            self._maybe_freeze_memtable()
+            self._writers_condition.notify_all()
+        if error:
+            raise error
+
+    def _publish_sequence_number(self, sequence_number):
+        """mark writes up to sequence_number applied, must be called with lock held.
+        A snapshot taken before a pending bulk load registers must never see its data
+        """
+        self._applied_sequence_number = max(
+            self._applied_sequence_number, sequence_number
+        )
+        self._visible_sequence_number = min(
+            [self._applied_sequence_number]
+            + [pending - 1 for pending in self._pending_bulk_loads]
+        )
+
+    def _raise_background_error(self):
+        """raise recorded background error, must be called with lock held"""
+        raise Exception(
+            "background work failed: {}".format(self._background_error)
+        ) from self._background_error
+
+    def _maybe_freeze_memtable(self):
+        """freeze memtable when it is full, must be called with lock held.
+        If previous immutable memtable is still being flushed, keep writing into memtable instead of blocking.
+        Group commit in progress freezes memtable itself after it finishes
+        """
+        if (
+            not self._committing
+            and self._memtable.byte_size >= self._memtable_size_limit
+            and self._immutable_memtable is None
+        ):
+            self._freeze_memtable()
+
+    def _freeze_memtable(self):
+        self._immutable_memtable = self._memtable.immutable()
+        self._memtable_version += 1
+        logger.debug("memtable frozen", memtable_version=self._memtable_version)
+        self._background_work_condition.notify_all()
+
+    def _write_bulk_sstables(self, key_value_pairs, sequence_number):
+        """write pairs into the level their keys seen so far would be loaded into, so sstables use
+        filter policy of that level. They are moved if target level changes on registration.
+        Return (count, SSTableWriter list)
+        """
+        count, writers, writer, min_key, last_key = 0, [], None, None, None
+        try:
+            for key, value in key_value_pairs:
+                if last_key is not None and not last_key < key:
+                    raise Exception(
+                        "keys of bulk load must be strictly increasing, {} after {}".format(
+                            key, last_key
+                        )
+                    )
+                internal_key_value = InternalKeyValue(
+                    key, sequence_number, KeyType.PUT, value
+                )
+                if writer is None or not writer.append(internal_key_value):
+                    if writer:
+                        writer.close()
+                    min_key = key if min_key is None else min_key
+                    with self._lock:
+                        # target level only gets shallower as more keys are loaded
+                        level = self._bulk_load_level(min_key, key)
+                    writer = SSTableWriter(level, uuid.uuid4().hex, conf=self._conf)
+                    writers.append(writer)
+                    writer.append(internal_key_value)
+                count, last_key = count + 1, key
+        except Exception:
+            # sstables are not registered yet, just remove their files
+            for w in writers:
+                w.close()
+                delete_sstable(w.table_level, w.table_name)
+            raise
+        if writer:
+            writer.close()
+        return count, writers
+
+    def _bulk_load_level(self, min_key, max_key):
+        """deepest level where no sstable of it or upper levels overlaps [min_key, max_key].
+        Level 0 always works, since overlapped sstables in it are resolved by sequence number
+        """
+        overlapped_levels = [
+            sstable.table_level
+            for sstable in self._manifest.sstables
+            if sstable.min_key <= max_key and min_key <= sstable.max_key
+        ]
+        return max(min(overlapped_levels, default=self._max_level + 1) - 1, 0)
+
+    def _has_newer_sstables_below(self, level, min_key, max_key, sequence_number):
+        """True if an sstable deeper than level overlaps [min_key, max_key] and holds writes
+        after sequence_number, eg. writes during bulk load flushed and compacted before it
+        registers. Data loaded into level would shadow them
+        """
+        return any(
+            sstable.table_level > level
+            and sstable.min_key <= max_key
+            and min_key <= sstable.max_key
+            and self._sstable_max_sequence_numbers.get(sstable.table_name, 0)
+            > sequence_number
+            for sstable in self._manifest.sstables
+        )
+
+    def _contains_range(self, memtable, min_key, max_key):
+        """True if memtable has any record of key in [min_key, max_key]"""
+        internal_key_value = next(iter(memtable.scan(min_key)), None)
+        return internal_key_value is not None and internal_key_value.key <= max_key
+
+    def _lookup_in_memory(self, key, sequence_number):
+        while True:
+            memtable_version = self._memtable_version
+            immutable_memtable = self._immutable_memtable
+            internal_key_value = self._memtable.lookup(key, sequence_number)
+            if internal_key_value is None and immutable_memtable is not None:
+                internal_key_value = immutable_memtable.lookup(key, sequence_number)
+            # memtable is frozen concurrently, data may moved to immutable memtable
+            if memtable_version == self._memtable_version:
+                return internal_key_value
+
+    def _lookup_many_in_memory(self, keys, sequence_number):
+        """return {key: InternalKeyValue} of sorted keys found in memtables"""
+        while True:
+            memtable_version = self._memtable_version
+            immutable_memtable = self._immutable_memtable
+            result = self._memtable.lookup_many(keys, sequence_number)
+            if immutable_memtable is not None:
+                result.update(
+                    immutable_memtable.lookup_many(
+                        [key for key in keys if key not in result], sequence_number
+                    )
+                )
+            # memtable is frozen concurrently, data may moved to immutable memtable
+            if memtable_version == self._memtable_version:
+                return result
+
+    def _release_snapshot(self, sequence_number):
+        with self._lock:
+            self._snapshots[sequence_number] -= 1
+            if self._snapshots[sequence_number] == 0:
+                del self._snapshots[sequence_number]
+        logger.debug("snapshot released", sequence_number=sequence_number)
+
+    def _scan_in_memory(self, start, end, reverse):
+        while True:
+            memtable_version = self._memtable_version
+            immutable_memtable = self._immutable_memtable
+            iterators = [self._memtable.scan(start, end, reverse)]
+            if immutable_memtable is not None:
+                iterators.append(immutable_memtable.scan(start, end, reverse))
+            # memtable is frozen concurrently, data may moved to immutable memtable
+            if memtable_version == self._memtable_version:
+                return iterators
+
+    def _lookup_in_sstables(self, key, sequence_number):
+        epoch, sstables = self._pin_sstables()
+        try:
+            return self._lookup_in_pinned_sstables(key, sequence_number, sstables)
+        finally:
+            self._unpin_sstables(epoch)
+
+    def _lookup_in_pinned_sstables(self, key, sequence_number, sstables):
+        level_to_sstables = defaultdict(list)
+        for sstable in sstables:
+            if sstable.min_key <= key <= sstable.max_key:
+                level_to_sstables[sstable.table_level].append(sstable)
+        # newer data always lives in lower level, sstables in same level may overlap
+        for level in sorted(level_to_sstables.keys()):
+            result = None
+            for sstable in level_to_sstables[level]:
+                with self._table_cache.reader(
+                    sstable.table_level, sstable.table_name
+                ) as reader:
+                    internal_key_value = reader.get(key, sequence_number)
+                if internal_key_value and (
+                    result is None
+                    or internal_key_value.sequence_number > result.sequence_number
+                ):
+                    result = internal_key_value
+            if result:
+                return result
+        return None
+
+    def _lookup_many_in_sstables(self, keys, sequence_number):
+        """return {key: InternalKeyValue} of sorted keys found in sstables, level by level"""
+        epoch, sstables = self._pin_sstables()
+        try:
+            level_to_sstables = defaultdict(list)
+            for sstable in sstables:
+                level_to_sstables[sstable.table_level].append(sstable)
+            result = {}
+            # newer data always lives in lower level, sstables in same level may overlap
+            for level in sorted(level_to_sstables.keys()):
+                level_result = {}
+                for sstable in level_to_sstables[level]:
+                    start = bisect.bisect_left(keys, sstable.min_key)
+                    end = bisect.bisect_right(keys, sstable.max_key)
+                    if start == end:
+                        continue
+                    with self._table_cache.reader(
+                        sstable.table_level, sstable.table_name
+                    ) as reader:
+                        found = reader.get_many(keys[start:end], sequence_number)
+                    for key, internal_key_value in found.items():
+                        if (
+                            key not in level_result
+                            or internal_key_value.sequence_number
+                            > level_result[key].sequence_number
+                        ):
+                            level_result[key] = internal_key_value
+                result.update(level_result)
+                keys = [key for key in keys if key not in level_result]
+                if not keys:
+                    break
+            return result
+        finally:
+            self._unpin_sstables(epoch)
+
+    def _pin_sstables(self):
+        """return current sstables, they won't be deleted until unpinned"""
+        with self._lock:
+            self._active_read_epochs[self._sstables_epoch] += 1
+            return self._sstables_epoch, list(self._manifest.sstables)
+
+    def _unpin_sstables(self, epoch):
+        with self._lock:
+            self._active_read_epochs[epoch] -= 1
+            if self._active_read_epochs[epoch] == 0:
+                del self._active_read_epochs[epoch]
+            has_obsolete_sstables = bool(self._obsolete_sstables)
+        if has_obsolete_sstables:
+            self._delete_obsolete_sstables()
+
+    def _delete_obsolete_sstables(self):
+        with self._lock:
+            oldest_epoch = min(self._active_read_epochs, default=self._sstables_epoch)
+            # sstable removed at epoch e is visible to reads started before e
+            deletable_sstables = [
+                sstable
+                for removed_epoch, sstable in self._obsolete_sstables
+                if removed_epoch <= oldest_epoch
+            ]
+            self._obsolete_sstables = [
+                (removed_epoch, sstable)
+                for removed_epoch, sstable in self._obsolete_sstables
+                if removed_epoch > oldest_epoch
+            ]
+        for sstable in deletable_sstables:
+            self._table_cache.invalidate(sstable.table_level, sstable.table_name)
+            delete_sstable(sstable.table_level, sstable.table_name)
+
+    def _background_work(self):
+        flushed_last = False
+        while True:
+            with self._lock:
+                while True:
+                    immutable_memtable, compaction = self._immutable_memtable, None
+                    # alternate flush and compaction when both are needed, so neither of them starves.
+                    # No more compaction after closed
+                    if not self._closed and (
+                        immutable_memtable is None or flushed_last
+                    ):
+                        compaction = self._compaction_strategy.pick_compaction(
+                            self._manifest.sstables
+                        )
+                        self._compacting = compaction is not None
+                    if immutable_memtable or compaction or self._closed:
+                        break
+                    self._background_work_condition.wait()
+            try:
+                if compaction:
+                    self._compact(compaction)
+                    flushed_last = False
+                elif immutable_memtable:
+                    self._flush_immutable_memtable(immutable_memtable)
+                    flushed_last = True
+                else:
+                    return
+            except Exception as e:
+                logger.error("background work failed", error_message=str(e))
+                with self._lock:
+                    self._background_error = e
+                return
+            finally:
+                with self._lock:
+                    self._compacting = False
+                    # wake up bulk loads waiting for flush or compaction
+                    self._writers_condition.notify_all()
+
+    def _compact(self, compaction):
+        logger.debug("compaction started", compaction=str(compaction))
+        # versions hidden from oldest snapshot and latest reads could be dropped
+        with self._lock:
+            smallest_snapshot = min(
+                self._snapshots, default=self._visible_sequence_number
+            )
+        writers = compaction.run(self._table_cache, smallest_snapshot)
+        with self._lock:
+            self._manifest.update_sstables(
+                [
+                    SSTableMetadata(
+                        writer.table_level,
+                        writer.table_name,
+                        writer.table_size,
+                        writer.min_key,
+                        writer.max_key,
+                    )
+                    for writer in writers
+                ],
+                compaction.inputs,
+            )
+            for writer in writers:
+                self._sstable_max_sequence_numbers[writer.table_name] = (
+                    writer.max_sequence_number
+                )
+            for sstable in compaction.inputs:
+                self._sstable_max_sequence_numbers.pop(sstable.table_name, None)
+            self._sstables_epoch += 1
+            self._obsolete_sstables.extend(
+                (self._sstables_epoch, sstable) for sstable in compaction.inputs
+            )
+        self._delete_obsolete_sstables()
+
+    def _flush_immutable_memtable(self, immutable_memtable):
+        """write immutable memtable into level 0 sstables, sstable I/O is done without lock"""
+        writers, writer = [], None
+        for internal_key, value in immutable_memtable.items():
+            internal_key_value = InternalKeyValue(
+                internal_key.key, internal_key.sequence_number, internal_key.type, value
+            )
+            if writer is None or not writer.append(internal_key_value):
+                if writer:
+                    writer.close()
+                writer = SSTableWriter(0, uuid.uuid4().hex, conf=self._conf)
+                writers.append(writer)
+                writer.append(internal_key_value)
+        if writer:
+            writer.close()
+        with self._lock:
+            for writer in writers:
+                self._manifest.add_sstable(
+                    writer.table_level,
+                    writer.table_name,
+                    writer.table_size,
+                    writer.min_key,
+                    writer.max_key,
+                )
+                self._sstable_max_sequence_numbers[writer.table_name] = (
+                    writer.max_sequence_number
+                )
+            self._immutable_memtable = None
+            # data is persisted in sstables, log is useless now.
+            # It must be removed before next freeze, which reuses the log file
+            immutable_memtable.remove()
+            logger.debug("immutable memtable flushed", sstable_count=len(writers))
+            # memtable may already be full while flushing
+            self._maybe_freeze_memtable()
+
+
+class _Writer(object):
+    """a pending write waiting in group commit queue"""
+
+    __slots__ = ["update_operations", "done", "error"]
 
-        pass
+    def __init__(self, update_operations):
+        self.update_operations = update_operations
+        self.done = False
+        self.error = None
@@ -1,9 +1,13 @@
 import os
+import sys
 import configparser
-import pickle
 from enum import Enum
 
-from lsm.utils import byte_utils
+sys.path.append(
+    os.path.abspath(os.path.join(os.path.dirname(__file__), os.path.pardir))
+)
+
+from utils import byte_utils
 
 
 class Manifest(object):
@@ -13,6 +17,8 @@ class Manifest(object):
         conf.read(
             os.path.join(os.path.dirname(__file__), os.pardir, "conf", "lsm_conf.ini")
         )
+        if not os.path.exists(conf["SSTABLE"]["WORK_DIR"]):
+            os.makedirs(conf["SSTABLE"]["WORK_DIR"])
         manifest_path = os.path.join(
             conf["SSTABLE"]["WORK_DIR"], conf["SSTABLE"]["MANIFEST_FILENAME"]
         )
@@ -46,6 +52,15 @@ class Manifest(object):
         manifest_log = ManifestLog(sstable_metadata, ManifestLogType.REMOVE)
         self._update_change(manifest_log)
 
+    def update_sstables(self, add_sstables, remove_sstables):
+        """add and remove several sstables atomically, by replacing manifest with final sstables"""
+        sstables = (self._sstables - set(remove_sstables)) | set(add_sstables)
+        self._file.close()
+        self._replace_manifest(sstables)
+        self._file = open(self._manifest_path, "ab")
+        # readers may hold old set, so never update it in place here
+        self._sstables = sstables
+
     def close(self):
         self._file.close()
 
@@ -59,12 +74,18 @@ class Manifest(object):
                     compact_sstables.add(sstable_metadata)
                 else:
                     compact_sstables.discard(sstable_metadata)
+        self._replace_manifest(compact_sstables)
+        self._file = open(self._manifest_path, "ab")
+
+    def _replace_manifest(self, sstables):
         with open(self._manifest_path + ".tmp", "wb") as tmp_file:
-            for sstable in compact_sstables:
+            for sstable in sstables:
                 # only need add operation
                 tmp_file.write(ManifestLog(sstable, ManifestLogType.ADD).serialize())
+            tmp_file.flush()
+            os.fsync(tmp_file.fileno())
+        # rename is atomic, manifest is either old one or new one after crash
         os.replace(self._manifest_path + ".tmp", self._manifest_path)
-        self._file = open(self._manifest_path, "ab")
 
     def _update_change(self, manifest_log):
         # write disk log first
@@ -103,7 +124,7 @@ class ManifestLog(object):
         )
         byte_array.extend(byte_utils.integer_to_four_bytes_array(header))
         # table name
-        table_name = pickle.dumps(self.sstable_metadata.table_name)
+        table_name = byte_utils.object_to_byte_array(self.sstable_metadata.table_name)
         byte_array.extend(byte_utils.integer_to_n_bytes_array(len(table_name), 1))
         byte_array.extend(table_name)
         # table size
@@ -113,11 +134,11 @@ class ManifestLog(object):
         # serialize min_key and max_key for add operation
         if self.type == ManifestLogType.ADD:
             # min_key
-            min_key = pickle.dumps(self.sstable_metadata.min_key)
+            min_key = byte_utils.object_to_byte_array(self.sstable_metadata.min_key)
             byte_array.extend(byte_utils.integer_to_n_bytes_array(len(min_key), 4))
             byte_array.extend(min_key)
             # max_key
-            max_key = pickle.dumps(self.sstable_metadata.max_key)
+            max_key = byte_utils.object_to_byte_array(self.sstable_metadata.max_key)
             byte_array.extend(byte_utils.integer_to_n_bytes_array(len(max_key), 4))
             byte_array.extend(max_key)
         return bytes(byte_array)
@@ -139,7 +160,7 @@ class ManifestLog(object):
         table_name = file_io.read(table_name_length)
         if len(table_name) != table_name_length:
             return None
-        table_name = pickle.loads(table_name)
+        table_name = byte_utils.byte_array_to_object(table_name)
         # table_size
         table_size = file_io.read(8)
         if len(table_size) != 8:
@@ -154,7 +175,7 @@ class ManifestLog(object):
             min_key = file_io.read(min_key_length)
             if len(min_key) != min_key_length:
                 return None
-            min_key = pickle.loads(min_key)
+            min_key = byte_utils.byte_array_to_object(min_key)
             # max_key
             max_key_length = file_io.read(4)
             if len(max_key_length) != 4:
@@ -163,7 +184,7 @@ class ManifestLog(object):
             max_key = file_io.read(max_key_length)
             if len(max_key) != max_key_length:
                 return None
-            max_key = pickle.loads(max_key)
+            max_key = byte_utils.byte_array_to_object(max_key)
         else:
             min_key, max_key = None, None
         return ManifestLog(
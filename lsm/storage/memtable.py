@@ -2,18 +2,26 @@ import sys
 import os
 import configparser
 
-
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
 
-from utils.skiplist import SkipList
+from utils.skiplist import LockFreeSkipList
+from storage.arena_skiplist import ArenaSkipList
 from storage.write_batch import WriteBatch
-from storage.internal_key import KeyType, InternalKey
+from storage.internal_key import KeyType
 from storage.memtable_log import MemtableLog
-from storage.immutable_memtable import ImmutableMemtable
+from storage.immutable_memtable import (
+    ImmutableMemtable,
+    lookup_skiplist,
+    lookup_many_skiplist,
+    scan_skiplist,
+)
+
+# skiplist implementations of memtable, arena one is compact and accounts real bytes
+MEMTABLE_TYPES = {"skiplist": LockFreeSkipList, "arena": ArenaSkipList}
 
 
 class Memtable(object):
-    def __init__(self, sequence_manager):
+    def __init__(self, sequence_manager, log_sync=None, memtable_type=None):
         conf = configparser.ConfigParser()
         conf.read(
             os.path.join(
@@ -26,39 +34,87 @@ class Memtable(object):
         memtable_log_filepath = os.path.join(
             os.path.curdir, "memtable", conf["MEMTABLE"]["MEMTABLE_LOG_FILENAME"]
         )
-        self._memtable_log = MemtableLog(memtable_log_filepath)
+        # use configured sync policy if log_sync is None
+        self._memtable_log = MemtableLog(
+            memtable_log_filepath, log_sync or conf["MEMTABLE"]["LOG_SYNC"]
+        )
+        # use configured skiplist implementation if memtable_type is None
+        self._skiplist_type = MEMTABLE_TYPES[
+            memtable_type or conf["MEMTABLE"]["MEMTABLE_TYPE"]
+        ]
         # recover from memtable log
-        self._skiplist = SkipList(
+        self._skiplist = self._skiplist_type(
             [
                 (internal_key_value.extract_internal_key(), internal_key_value.value)
                 for internal_key_value in self._memtable_log.logs()
             ]
         )
+        # approximate byte size of data in memtable, measured by log size
+        self._byte_size = self._memtable_log.size
+
+    @property
+    def byte_size(self):
+        # arena knows the real bytes it holds
+        if isinstance(self._skiplist, ArenaSkipList):
+            return self._skiplist.memory_usage
+        return self._byte_size
 
     def put(self, key, value):
         ops = [(key, value, KeyType.PUT)]
-        self._write_batch(self._group_write_into_batch(ops))
+        self.write_batches([ops])
 
     def remove(self, key):
         ops = [(key, None, KeyType.DELETE)]
-        self._write_batch(self._group_write_into_batch(ops))
+        self.write_batches([ops])
+
+    def write_batches(self, update_operations_list):
+        """group commit, batches of several writers are logged by one append and sync.
+        Each batch gets its own sequence number in list order, return the last one
+        """
+        # one allocation for the whole group
+        first_sequence_number = self._sequence_manager.allocate(
+            len(update_operations_list)
+        )
+        write_batches = [
+            self._group_write_into_batch(update_operations, first_sequence_number + i)
+            for i, update_operations in enumerate(update_operations_list)
+        ]
+        self._write_batch(
+            [
+                internal_key_value
+                for write_batch in write_batches
+                for internal_key_value in write_batch
+            ]
+        )
+        return first_sequence_number + len(update_operations_list) - 1
 
     def get(self, key, sequence_number=None):
+        internal_key_value = self.lookup(key, sequence_number)
+        return internal_key_value.value if internal_key_value else None
+
+    def lookup(self, key, sequence_number=None):
+        """return latest InternalKeyValue(including deletion) no later than sequence_number, None if not found"""
         sequence_number = (
             sequence_number
             if sequence_number is not None
             else self._sequence_manager.current
         )
-        # type is a placeholder here
-        floor_key, floor_value = self._skiplist.floor(
-            InternalKey(key, sequence_number, KeyType.PUT)
+        return lookup_skiplist(self._skiplist, key, sequence_number)
+
+    def lookup_many(self, keys, sequence_number=None):
+        """return {key: latest InternalKeyValue} of sorted keys, keys not found are absent"""
+        sequence_number = (
+            sequence_number
+            if sequence_number is not None
+            else self._sequence_manager.current
         )
-        # need to check key again, since we use floor here
-        if floor_key.key == key:
-            assert floor_key.sequence_number <= sequence_number
-            return floor_value
-        else:
-            return None
+        return lookup_many_skiplist(self._skiplist, keys, sequence_number)
+
+    def scan(self, start=None, end=None, reverse=False):
+        """iterate InternalKeyValue of keys in [start, end) in (key, sequence_number) order.
+        Current skiplist is bound at once, so iteration is not affected by freezing
+        """
+        return scan_skiplist(self._skiplist, start, end, reverse)
 
     def immutable(self):
         # frozen current skiplist
@@ -66,12 +122,19 @@ class Memtable(object):
         # frozen memtable_log
         self._memtable_log.immutable()
         # create a new skiplist for current memtable
-        self._skiplist = SkipList()
+        self._skiplist = self._skiplist_type()
+        self._byte_size = 0
         return immutable_memtable
 
     def items(self):
         return self._skiplist.items()
 
+    def close(self):
+        self._memtable_log.close()
+
+    def __len__(self):
+        return self._skiplist.size()
+
     def __str__(self):
         return (
             "{"
@@ -84,20 +147,21 @@ class Memtable(object):
             + "}"
         )
 
-    def _group_write_into_batch(self, update_operations):
+    def _group_write_into_batch(self, update_operations, next_sequence_number):
         """group writes into one batch, remove redundant writes"""
-        next_sequence_number = next(self._sequence_manager)
         key_to_last_operation = {
             key: (key, value, type) for key, value, type in update_operations
         }
         return WriteBatch(list(key_to_last_operation.values()), next_sequence_number)
 
-    def _write_batch(self, write_batch):
-        """write batch to log and skiplist"""
+    def _write_batch(self, internal_key_values):
+        """write InternalKeyValue list to log and skiplist"""
         # log first
-        self._memtable_log.write_logs_in_batch(write_batch)
-        # then write data to skiplist
-        for internal_key_value in write_batch:
-            self._skiplist.put(
-                internal_key_value.extract_internal_key(), internal_key_value.value
-            )
+        self._byte_size += self._memtable_log.write_logs_in_batch(internal_key_values)
+        # then write data to skiplist in sorted order
+        self._skiplist.put_many(
+            [
+                (internal_key_value.extract_internal_key(), internal_key_value.value)
+                for internal_key_value in internal_key_values
+            ]
+        )
@@ -1,44 +1,56 @@
 import os
 import sys
 
-
 sys.path.append(
     os.path.abspath(os.path.join(os.path.dirname(__file__), os.path.pardir))
 )
 
 from storage.internal_key_value import InternalKeyValue
 
+SYNC_POLICIES = ("none", "flush", "fsync")
+
 
 class MemtableLog(object):
-    """log for memtable"""
+    """log for memtable.
+    sync policy after each append: none leaves data in user space buffer, flush hands it to OS,
+    fsync persists it on disk
+    """
 
-    def __init__(self, filepath):
+    def __init__(self, filepath, sync="flush"):
+        assert sync in SYNC_POLICIES
         self._filepath = filepath
+        self._sync = sync
         self._file = open(filepath, "ab")
 
     def write_log(self, key_value):
-        """append a log"""
+        """append a log, return written byte size"""
         assert isinstance(key_value, InternalKeyValue)
-        self._file.write(key_value.serialize())
-        self._file.flush()
+        byte_array = key_value.serialize()
+        self._file.write(byte_array)
+        self._sync_file()
+        return len(byte_array)
 
     def write_logs_in_batch(self, key_value_batch):
-        """more efficient than single write for many times"""
+        """more efficient than single write for many times, return written byte size"""
         write_byte_array = bytearray()
         for key_value in key_value_batch:
             assert isinstance(key_value, InternalKeyValue)
             write_byte_array.extend(key_value.serialize())
-        self._file.write(bytes(write_byte_array))
-        self._file.flush()
+        self._file.write(write_byte_array)
+        self._sync_file()
+        return len(write_byte_array)
+
+    @property
+    def size(self):
+        """byte size of current log file"""
+        return os.path.getsize(self._filepath)
 
     def logs(self):
         """return a log iterator, can not guarantee concurrency control between read and write"""
         with open(self._filepath, "rb") as f:
-            log = InternalKeyValue.deserialize(f)
-            # abort loop when corrupted data or EOF found
-            while log:
-                yield log
-                log = InternalKeyValue.deserialize(f)
+            byte_array = f.read()
+        # abort loop when corrupted data or EOF found
+        yield from _decode_logs(byte_array)
 
     def immutable(self):
         # transfer log from mutable to immutable
@@ -47,6 +59,15 @@ class MemtableLog(object):
         # always create a new file
         self._file = open(self._filepath, "ab")
 
+    def close(self):
+        self._file.close()
+
+    def _sync_file(self):
+        if self._sync != "none":
+            self._file.flush()
+            if self._sync == "fsync":
+                os.fsync(self._file.fileno())
+
 
 class ImmutableMemtableLog(object):
     """log for immutable-memtable"""
@@ -61,10 +82,18 @@ class ImmutableMemtableLog(object):
         """return file iterator"""
         # create file when necessary
         with open(self._filepath, "rb") as f:
-            log = InternalKeyValue.deserialize(f)
-            while log:
-                yield log
-                log = InternalKeyValue.deserialize(f)
+            byte_array = f.read()
+        yield from _decode_logs(byte_array)
 
     def remove(self):
         os.remove(self._filepath)
+
+
+def _decode_logs(byte_array):
+    """decode logs from in-memory buffer until corrupted data or end of buffer"""
+    # slicing memoryview doesn't copy
+    byte_array = memoryview(byte_array)
+    log, position = InternalKeyValue.decode(byte_array)
+    while log:
+        yield log
+        log, position = InternalKeyValue.decode(byte_array, position)
@@ -0,0 +1,56 @@
+import sys
+import os
+import heapq
+
+sys.path.append(
+    os.path.abspath(os.path.join(os.path.dirname(__file__), os.path.pardir))
+)
+
+from storage.internal_key import KeyType
+
+
+class MergingIterator(object):
+    """k-way merge of sorted InternalKeyValue iterators by a heap, lazily.
+    Iterators must be in descending order if reverse, duplicated (key, sequence_number) is yielded once
+    """
+
+    def __init__(self, iterators, reverse=False):
+        self._merged = heapq.merge(*iterators, reverse=reverse)
+        self._last = None
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        while True:
+            internal_key_value = next(self._merged)
+            last, self._last = self._last, internal_key_value
+            # same record may exist in memtable and sstables, or in sstables before and after compaction
+            if (
+                last is None
+                or last.key != internal_key_value.key
+                or last.sequence_number != internal_key_value.sequence_number
+            ):
+                return internal_key_value
+
+
+def visible_key_values(internal_key_values, sequence_number, reverse=False):
+    """yield (key, value) of latest version no later than sequence_number for each key,
+    deleted keys are hidden. internal_key_values are merged in (key, sequence_number) order
+    """
+    last_key, latest = None, None
+    for internal_key_value in internal_key_values:
+        if latest is not None and internal_key_value.key != last_key:
+            if latest.type == KeyType.PUT:
+                yield latest.key, latest.value
+            latest = None
+        last_key = internal_key_value.key
+        if internal_key_value.sequence_number > sequence_number:
+            continue
+        # versions are ascending in forward order, descending in reverse order
+        if reverse:
+            latest = latest or internal_key_value
+        else:
+            latest = internal_key_value
+    if latest is not None and latest.type == KeyType.PUT:
+        yield latest.key, latest.value
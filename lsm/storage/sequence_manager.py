@@ -11,51 +11,79 @@ from logger.log_util import logger
 
 
 class SequenceManager(object):
-    """trivial solution..."""
+    """allocate sequence numbers from leased ranges. Only the end of current lease is persisted,
+    so there is no I/O unless a lease runs out. After restart allocation continues after the end
+    of last lease, numbers in between are skipped
+    """
 
     def __init__(self):
         conf = configparser.ConfigParser()
         conf.read(
             os.path.join(os.path.dirname(__file__), os.pardir, "conf", "lsm_conf.ini")
         )
-        sequence_number_filepath = conf["SEQUENCE_NUMBER"]["SEQUENCE_NUMBER_FILENAME"]
-        if os.path.exists(sequence_number_filepath):
-            self._id = int(open(sequence_number_filepath).read())
-        else:
-            # default initial value
-            self._id = 0
-        self._file = open(sequence_number_filepath, "w")
+        self._filepath = conf["SEQUENCE_NUMBER"]["SEQUENCE_NUMBER_FILENAME"]
+        self._lease_size = int(conf["SEQUENCE_NUMBER"]["LEASE_SIZE"])
+        # all numbers not greater than lease end may have been used before last shutdown
+        self._lease_end = self._read_value_from_disk()
+        self._id = self._lease_end
         self._lock = threading.Lock()
 
     @property
     def current(self):
         """latest sequence number"""
-        self._lock.acquire()
-        ans = self._id
-        self._lock.release()
-        return ans
+        return self._id
 
     def __next__(self):
         """move to next sequence number"""
-        self._lock.acquire()
-        self._id += 1
-        ans = self._id
-        self._write_value_to_disk(ans)
-        self._lock.release()
-        logger.debug("return next sequence number", sequence_number=ans)
-        return ans
+        return self.allocate(1)
+
+    def allocate(self, count):
+        """allocate count consecutive sequence numbers, return the first one"""
+        assert count > 0
+        with self._lock:
+            first = self._id + 1
+            self._renew_lease(self._id + count)
+            self._id += count
+        return first
+
+    def advance_to(self, sequence_number):
+        """make sure later allocated numbers are greater than sequence_number,
+        eg. sequence numbers recovered from logs
+        """
+        with self._lock:
+            if sequence_number > self._id:
+                self._renew_lease(sequence_number)
+                self._id = sequence_number
 
     def close(self):
-        self._file.close()
+        pass
 
-    def _write_value_to_disk(self, value):
+    def _renew_lease(self, sequence_number):
+        """persist a new lease when sequence_number is out of current one, must be called with lock held"""
+        if sequence_number > self._lease_end:
+            lease_end = sequence_number + self._lease_size
+            self._write_value_to_disk(lease_end)
+            self._lease_end = lease_end
+
+    def _read_value_from_disk(self):
+        if not os.path.exists(self._filepath):
+            # default initial value
+            return 0
+        with open(self._filepath) as f:
+            content = f.read().strip()
         try:
-            self._file.write(str(value))
-            self._file.flush()
-        except Exception as e:
-            logger.error(
-                "write sequence number to disk failed",
-                error_message=str(e),
-                sequence_number=value,
-            )
-        logger.debug("write sequence number to disk succeeded", sequence_number=value)
+            return int(content)
+        except ValueError:
+            # sequence numbers recovered from logs are applied by advance_to
+            logger.error("sequence number file is corrupted", content=content[:32])
+            return 0
+
+    def _write_value_to_disk(self, value):
+        # replace file atomically, a crash never leaves a partially written value
+        tmp_filepath = self._filepath + ".tmp"
+        with open(tmp_filepath, "w") as f:
+            f.write(str(value))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_filepath, self._filepath)
+        logger.debug("sequence number lease persisted", lease_end=value)
@@ -0,0 +1,42 @@
+class Snapshot(object):
+    """consistent read view of LSMClient pinned at a sequence number. Versions visible to it
+    are kept by compaction until it is released, no data is copied
+    """
+
+    def __init__(self, client, sequence_number):
+        self._client = client
+        self._sequence_number = sequence_number
+        self._released = False
+
+    @property
+    def sequence_number(self):
+        return self._sequence_number
+
+    def get(self, key):
+        assert not self._released, "snapshot is released"
+        return self._client.get(key, self._sequence_number)
+
+    def multi_get(self, keys):
+        assert not self._released, "snapshot is released"
+        return self._client.multi_get(keys, self._sequence_number)
+
+    def scan(self, start=None, end=None, reverse=False):
+        assert not self._released, "snapshot is released"
+        return self._client.scan(start, end, reverse, self._sequence_number)
+
+    def release(self):
+        """release pinned sequence number, could be called more than once"""
+        if not self._released:
+            self._released = True
+            self._client._release_snapshot(self._sequence_number)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
+
+    def __str__(self):
+        return "(sequence_number: {}, released: {})".format(
+            self._sequence_number, self._released
+        )
@@ -1,78 +1,348 @@
 import sys
 import os
+import io
+import mmap
+import bisect
+import struct
+import threading
 import configparser
 
 sys.path.append(os.path.join(os.path.dirname(__file__), os.path.pardir))
 
-from storage.sstable_block import SSTableBlock
+from storage.sstable_block import (
+    SSTableBlock,
+    SSTableBlockReader,
+    LegacySSTableBlockReader,
+    COMPRESSION_TYPES,
+    decompress_block,
+)
 from storage.sstable_block_index import SSTableBlockIndex
 from storage.sstable_block_filter import SSTableBlockFilter
+from utils.bloomfilter import (
+    BytesBloomFilter,
+    DoubleHashingBloomFilter,
+    BlockedBloomFilter,
+)
+from utils.byte_utils import (
+    integer_to_n_bytes_array,
+    integer_to_four_bytes_array,
+    byte_array_to_integer,
+)
 from logger.log_util import logger
 
+# single-file sstable layout:
+# data blocks + filter section + index section + footer
+# footer: filter_offset + filter_length + index_offset + index_length + version + magic_number
+#             64bit          64bit           64bit          64bit        32bit     64bit
+FOOTER_STRUCT = struct.Struct(">QQQQIQ")
+FOOTER_SIZE = FOOTER_STRUCT.size
+MAGIC_NUMBER = 0x4C534D5353544142
+# version 1: blocks of concatenated serialized records
+# version 2: prefix compressed blocks with restart points
+# version 3: blocks end with compression type byte
+# version 4: filter section starts with filter policy
+FORMAT_VERSION = 4
+
+# filter section of version 4:
+# block:       policy + filter * block_count
+# full:        policy + filter of all keys
+# partitioned: policy + partition_index_length + partition_index + filter * partition_count
+#               8bit         32bit
+# partition index entries are SSTableBlockIndex of filters, offset is relative to first filter
+FILTER_POLICIES = {"block": 0, "full": 1, "partitioned": 2}
+
 
 class SSTableWriter(object):
+    """write data blocks into sstable file, index and filters are buffered in memory until close"""
 
-    def __init__(self, table_level, table_name):
+    def __init__(
+        self,
+        table_level,
+        table_name,
+        table_size_limit=None,
+        compression=None,
+        filter_type=None,
+        filter_policy=None,
+        conf=None,
+    ):
         assert isinstance(table_level, int)
         assert isinstance(table_name, str)
 
-        conf = configparser.ConfigParser()
-        conf.read(os.path.join(os.path.dirname(__file__), os.path.pardir, "conf", "lsm_conf.ini"))
+        # options of client, bundled lsm_conf.ini if it is None
+        if conf is None:
+            conf = configparser.ConfigParser()
+            conf.read(
+                os.path.join(
+                    os.path.dirname(__file__), os.path.pardir, "conf", "lsm_conf.ini"
+                )
+            )
+        self._conf = conf
         self._work_dir = conf["SSTABLE"]["WORK_DIR"]
-        self._table_size_limit = int(conf["SSTABLE"]["TABLE_SIZE_LIMIT"])
-        self._sstable_filepath = os.path.join(self._work_dir, str(table_level), table_name)
-        self._sstable_index_filepath = self._sstable_filepath + ".index"
-        self._sstable_filter_filepath = self._sstable_filepath + ".filter"
+        # use configured limit by default
+        self._table_size_limit = (
+            table_size_limit
+            if table_size_limit is not None
+            else int(conf["SSTABLE"]["TABLE_SIZE_LIMIT"])
+        )
+        # block compression, use configured one by default
+        self._compression_type = COMPRESSION_TYPES[
+            compression if compression is not None else conf["SSTABLE"]["COMPRESSION"]
+        ]
+        self._compression_min_ratio = float(conf["SSTABLE"]["COMPRESSION_MIN_RATIO"])
+        # block filter, use configured one by default
+        self._filter_type = (
+            filter_type if filter_type is not None else conf["SSTABLE"]["FILTER_TYPE"]
+        )
+        if self._filter_type not in ("bytes", "double_hashing", "blocked"):
+            raise Exception("unknown filter type {}".format(self._filter_type))
+        self._filter_false_positive_rate = float(
+            conf["SSTABLE"]["FILTER_FALSE_POSITIVE_RATE"]
+        )
+        # filter per block, per table or per partition, use configured policy of level by default
+        self._filter_policy = (
+            filter_policy
+            if filter_policy is not None
+            else _level_filter_policy(conf, table_level)
+        )
+        if self._filter_policy not in FILTER_POLICIES:
+            raise Exception("unknown filter policy {}".format(self._filter_policy))
+        self._filter_partition_size = int(conf["SSTABLE"]["FILTER_PARTITION_SIZE"])
+        # keys not covered by full filter or filter partitions yet
+        self._filter_keys = []
+        self._filter_partitions = []
+        self._table_level = table_level
+        self._table_name = table_name
+        self._sstable_filepath = os.path.join(
+            self._work_dir, str(table_level), table_name
+        )
+        if not os.path.exists(os.path.dirname(self._sstable_filepath)):
+            os.makedirs(os.path.dirname(self._sstable_filepath), exist_ok=True)
+        self._data_file = open(self._sstable_filepath, "wb")
+        # serialized index and filter of each block
+        self._index_byte_array, self._filter_byte_array = bytearray(), bytearray()
         self._offset, self._filter_offset = 0, 0
         self._last_block = None
+        # key range of appended records
+        self._min_key, self._max_key = None, None
+        self._max_sequence_number = 0
 
-    def new_block(self):
-        # flush block in-memory first
-        if self._last_block:
-            self._last_block.flush()
-        self._last_block = None
-        # allocate a new block to flush data
-        file_byte_size = os.stat(self._sstable_filepath).st_size if os.path.exists(self._sstable_filepath) else 0
-        if file_byte_size < self._table_size_limit:
-            block = SSTableBlock(self)
-            self._last_block = block
-            return block
-        else:
-            logger.debug("block num reach threshold")
-            return None
+    @property
+    def table_level(self):
+        return self._table_level
+
+    @property
+    def table_name(self):
+        return self._table_name
+
+    @property
+    def table_size(self):
+        """byte size of stored data blocks flushed so far"""
+        return self._offset
+
+    @property
+    def min_key(self):
+        return self._min_key
+
+    @property
+    def max_key(self):
+        return self._max_key
+
+    @property
+    def max_sequence_number(self):
+        """largest sequence number of appended records"""
+        return self._max_sequence_number
+
+    def append(self, internal_key_value):
+        """append records in (key, sequence_number) order, return False if sstable is full.
+        All versions of a key are kept in the same sstable, so table size limit may be exceeded slightly
+        """
+        if self._last_block is None or not self._last_block.append(internal_key_value):
+            if self._last_block:
+                self._last_block.flush()
+            if (
+                self._offset >= self._table_size_limit
+                and internal_key_value.key != self._max_key
+            ):
+                logger.debug(
+                    "sstable reach size threshold", table_name=self._table_name
+                )
+                return False
+            self._last_block = SSTableBlock(self, self._conf)
+            self._last_block.append(internal_key_value)
+        if self._min_key is None:
+            self._min_key = internal_key_value.key
+        self._max_key = internal_key_value.key
+        self._max_sequence_number = max(
+            self._max_sequence_number, internal_key_value.sequence_number
+        )
+        return True
 
     def close(self):
-        """frozen sstable"""
+        """frozen sstable, write filter and index sections and footer"""
+        if self._data_file.closed:
+            return
         if self._last_block:
             self._last_block.flush()
         self._last_block = None
+        filter_header = bytearray(
+            integer_to_n_bytes_array(FILTER_POLICIES[self._filter_policy], 1)
+        )
+        if self._filter_policy == "full":
+            self._append_filter(self._filter_keys)
+        elif self._filter_policy == "partitioned":
+            if self._filter_keys:
+                self._cut_filter_partition()
+            partition_index = b"".join(
+                partition.serialize() for partition in self._filter_partitions
+            )
+            filter_header.extend(integer_to_four_bytes_array(len(partition_index)))
+            filter_header.extend(partition_index)
+        filter_offset = self._offset
+        filter_length = len(filter_header) + len(self._filter_byte_array)
+        index_offset = filter_offset + filter_length
+        self._data_file.write(filter_header)
+        self._data_file.write(self._filter_byte_array)
+        self._data_file.write(self._index_byte_array)
+        self._data_file.write(
+            FOOTER_STRUCT.pack(
+                filter_offset,
+                filter_length,
+                index_offset,
+                len(self._index_byte_array),
+                FORMAT_VERSION,
+                MAGIC_NUMBER,
+            )
+        )
+        self._data_file.close()
+        self._index_byte_array, self._filter_byte_array = None, None
+
+    def _add_filter_keys(self, keys, max_key):
+        """keys of a flushed block, build filters according to filter policy"""
+        if self._filter_policy == "block":
+            self._append_filter(keys)
+            return
+        # versions of a key are adjacent, add each key once
+        last_key = self._filter_keys[-1] if self._filter_keys else None
+        for key in keys:
+            if key != last_key:
+                self._filter_keys.append(key)
+                last_key = key
+        # partitions are cut at block boundary, so each block is covered by one partition
+        if (
+            self._filter_policy == "partitioned"
+            and len(self._filter_keys) >= self._filter_partition_size
+        ):
+            self._cut_filter_partition(max_key)
+
+    def _cut_filter_partition(self, max_key=None):
+        offset = len(self._filter_byte_array)
+        self._append_filter(self._filter_keys)
+        self._filter_partitions.append(
+            SSTableBlockIndex(
+                max_key if max_key is not None else self._max_key,
+                offset,
+                len(self._filter_byte_array) - offset,
+                0,
+            )
+        )
+        self._filter_keys = []
+
+    def _append_filter(self, keys):
+        if self._filter_type == "bytes":
+            # sized for at least a full block of keys
+            block_filter = BytesBloomFilter(size_estimate=max(len(keys), 512))
+        elif self._filter_type == "blocked":
+            block_filter = BlockedBloomFilter(
+                len(keys), self._filter_false_positive_rate
+            )
+        else:
+            block_filter = DoubleHashingBloomFilter(
+                len(keys), self._filter_false_positive_rate
+            )
+        for key in keys:
+            block_filter.add(key)
+        filter_byte_array = SSTableBlockFilter(block_filter).serialize()
+        self._filter_byte_array.extend(filter_byte_array)
+        self._filter_offset += len(filter_byte_array)
+        logger.debug(
+            "append filter",
+            policy=self._filter_policy,
+            key_count=len(keys),
+            filter_length=len(filter_byte_array),
+        )
 
 
 class SSTableReader(object):
 
-    def __init__(self, table_level, table_name):
+    def __init__(self, table_level, table_name, block_cache=None, use_mmap=None):
         assert isinstance(table_level, int)
         assert isinstance(table_name, str)
         conf = configparser.ConfigParser()
-        conf.read(os.path.join(os.path.dirname(__file__), os.path.pardir, "conf", "lsm_conf.ini"))
+        conf.read(
+            os.path.join(
+                os.path.dirname(__file__), os.path.pardir, "conf", "lsm_conf.ini"
+            )
+        )
         self._work_dir = conf["SSTABLE"]["WORK_DIR"]
-        self._sstable_filepath = os.path.join(self._work_dir, str(table_level), table_name)
-        self._sstable_index_filepath = self._sstable_filepath + ".index"
-        self._sstable_filter_filepath = self._sstable_filepath + ".filter"
-        # deserialize index_blocks and filter_blocks
+        # use configured read mode if it is None
+        if use_mmap is None:
+            use_mmap = conf["SSTABLE"].getboolean("USE_MMAP")
+        self._table_level = table_level
+        self._table_name = table_name
+        self._sstable_filepath = os.path.join(
+            self._work_dir, str(table_level), table_name
+        )
         self._data_block_file = open(self._sstable_filepath, "rb")
-        self._sstable_indexes = []
-        self._sstable_filters = []
-        with open(self._sstable_index_filepath, "rb") as f:
-            sstable_index = SSTableBlockIndex.deserialize(f)
-            while sstable_index:
-                self._sstable_indexes.append(sstable_index)
-                sstable_index = SSTableBlockIndex.deserialize(f)
-        with open(self._sstable_filter_filepath, "rb") as f:
-            sstable_filter = SSTableBlockFilter.deserialize(f)
-            while sstable_filter:
-                self._sstable_filters.append(sstable_filter)
-                sstable_filter = SSTableBlockFilter.deserialize(f)
+        # seek and read on data file should be atomic
+        self._data_block_file_lock = threading.Lock()
+        file_size = os.fstat(self._data_block_file.fileno()).st_size
+        # blocks are sliced from mapping without copy, empty file could not be mapped
+        self._mmap, self._mmap_view = None, None
+        if use_mmap and file_size > 0:
+            self._mmap = mmap.mmap(
+                self._data_block_file.fileno(), 0, access=mmap.ACCESS_READ
+            )
+            self._mmap_view = memoryview(self._mmap)
+            # mapping holds its own file descriptor
+            self._data_block_file.close()
+        # block readers shared among readers, keyed by (sstable filepath, block offset)
+        self._block_cache = block_cache
+        footer = self._read_footer(file_size)
+        # legacy sstables are version 1
+        self._format_version = 1 if footer is None else footer[-2]
+        if footer is None:
+            # sstables written before single-file format keep index and filters in side files
+            with open(self._sstable_filepath + ".index", "rb") as f:
+                index_byte_array = f.read()
+            with open(self._sstable_filepath + ".filter", "rb") as f:
+                filter_byte_array = f.read()
+        else:
+            filter_offset, filter_length, index_offset, index_length, _, _ = footer
+            # filter and index sections are adjacent, read them at once
+            sections = self._read(filter_offset, filter_length + index_length)
+            filter_byte_array = sections[: index_offset - filter_offset]
+            index_byte_array = sections[index_offset - filter_offset :]
+        self._sstable_indexes = _deserialize_all(SSTableBlockIndex, index_byte_array)
+        # sorted max keys for binary search
+        self._max_keys = [
+            sstable_index.max_key for sstable_index in self._sstable_indexes
+        ]
+        # one of block filters, full filter or index of filter partitions is used
+        self._sstable_filters, self._full_filter = [], None
+        self._filter_partitions, self._filter_partition_max_keys = [], []
+        if self._format_version >= 4:
+            filter_memory_usage = self._load_filters(filter_byte_array, footer[0])
+        else:
+            self._filter_policy = "block"
+            self._sstable_filters = _deserialize_all(
+                SSTableBlockFilter, filter_byte_array
+            )
+            filter_memory_usage = len(filter_byte_array)
+        if self._filter_policy == "block":
+            # filters are written along with indexes, one for each block
+            assert len(self._sstable_indexes) == len(self._sstable_filters)
+        # index and filters are held in memory, approximate by their encoded size
+        self._memory_usage = len(index_byte_array) + filter_memory_usage
 
     @property
     def sstable_indexes(self):
@@ -82,6 +352,341 @@ class SSTableReader(object):
     def sstable_filters(self):
         return self._sstable_filters
 
-    def load_block(self, offset, length):
-        self._data_block_file.seek(offset)
-        # TODO load block
\ No newline at end of file
+    @property
+    def filter_policy(self):
+        return self._filter_policy
+
+    @property
+    def table_level(self):
+        return self._table_level
+
+    @property
+    def table_name(self):
+        return self._table_name
+
+    @property
+    def memory_usage(self):
+        return self._memory_usage
+
+    def load_block(self, offset, length, fill_cache=True):
+        """load a data block and return its reader, which iterates decoded InternalKeyValue.
+        Bulk reads like compaction should not fill block cache, to keep hot blocks in it
+        """
+        if self._block_cache is not None:
+            block = self._block_cache.get((self._sstable_filepath, offset))
+            if block is not None:
+                return block
+        block_byte_array = self._read(offset, length)
+        if self._format_version >= 3:
+            block_byte_array = decompress_block(block_byte_array)
+        fill_cache = self._block_cache is not None and fill_cache
+        if (
+            fill_cache
+            and self._mmap_view is not None
+            and isinstance(block_byte_array, memoryview)
+        ):
+            # cached block must not hold the mapping, which is unmapped when reader is closed
+            block_byte_array = bytes(block_byte_array)
+        if self._format_version >= 2:
+            block = SSTableBlockReader(block_byte_array)
+        else:
+            block = LegacySSTableBlockReader(block_byte_array)
+        if fill_cache:
+            # charge by uncompressed block size
+            self._block_cache.put(
+                (self._sstable_filepath, offset), block, len(block_byte_array)
+            )
+        return block
+
+    def get(self, key, sequence_number):
+        """return latest InternalKeyValue(including deletion) no later than sequence_number, None if not found"""
+        result = None
+        # one probe for full or partitioned filter
+        if not self._may_contain(key):
+            return None
+        # first block whose max_key is not less than key
+        index = bisect.bisect_left(self._max_keys, key)
+        while index < len(self._sstable_indexes):
+            sstable_index = self._sstable_indexes[index]
+            # only read block when bloom filter says key may exist
+            if not self._sstable_filters or key in self._sstable_filters[index]:
+                # seek to key inside block
+                for internal_key_value in self.load_block(
+                    sstable_index.offset, sstable_index.length
+                ).iterate(key):
+                    # records are sorted in (key, sequence_number) order
+                    if (
+                        internal_key_value.key > key
+                        or internal_key_value.sequence_number > sequence_number
+                    ):
+                        break
+                    result = internal_key_value
+            # newer versions of key continue in next block only if current block ends with key
+            if sstable_index.max_key != key:
+                break
+            index += 1
+        return result
+
+    def get_many(self, keys, sequence_number):
+        """get for sorted keys in one pass, return {key: InternalKeyValue} of found keys.
+        Keys falling into same block share one block load
+        """
+        result = {}
+        keys = [
+            key
+            for key, may_contain in zip(keys, self._may_contain_many(keys))
+            if may_contain
+        ]
+        # key whose newer versions may continue in next block
+        pending_key = None
+        start, index = 0, 0
+        while start < len(keys) or pending_key is not None:
+            if pending_key is not None:
+                index += 1
+            else:
+                # first block whose max_key is not less than key
+                index = bisect.bisect_left(self._max_keys, keys[start], index)
+            if index == len(self._sstable_indexes):
+                break
+            sstable_index = self._sstable_indexes[index]
+            end = bisect.bisect_right(keys, sstable_index.max_key, start)
+            block_keys = keys[start:end]
+            start = end
+            if pending_key is not None:
+                block_keys.insert(0, pending_key)
+                pending_key = None
+            if self._sstable_filters and block_keys:
+                block_keys = [
+                    key
+                    for key, may_contain in zip(
+                        block_keys,
+                        self._sstable_filters[index].contains_many(block_keys),
+                    )
+                    if may_contain
+                ]
+            if not block_keys:
+                continue
+            block = self.load_block(sstable_index.offset, sstable_index.length)
+            for key in block_keys:
+                # seek to key inside block
+                for internal_key_value in block.iterate(key):
+                    if (
+                        internal_key_value.key > key
+                        or internal_key_value.sequence_number > sequence_number
+                    ):
+                        break
+                    result[key] = internal_key_value
+                else:
+                    pending_key = key if key == sstable_index.max_key else None
+        return result
+
+    def items(self, fill_cache=True):
+        """iterate all records in (key, sequence_number) order, load one block at a time"""
+        for sstable_index in self._sstable_indexes:
+            # decode whole block at once, suspended iterator should not hold block buffer
+            for internal_key_value in list(
+                self.load_block(sstable_index.offset, sstable_index.length, fill_cache)
+            ):
+                yield internal_key_value
+
+    def scan(self, start=None, end=None, reverse=False, fill_cache=True):
+        """iterate records of keys in [start, end) in (key, sequence_number) order, descending if reverse.
+        Only blocks overlapped with the range are loaded, one at a time
+        """
+        # first block may hold start, last block may hold keys less than end
+        first_index = 0 if start is None else bisect.bisect_left(self._max_keys, start)
+        last_index = (
+            len(self._sstable_indexes) - 1
+            if end is None
+            else min(
+                bisect.bisect_left(self._max_keys, end), len(self._sstable_indexes) - 1
+            )
+        )
+        indexes = range(first_index, last_index + 1)
+        for index in reversed(indexes) if reverse else indexes:
+            sstable_index = self._sstable_indexes[index]
+            internal_key_values = list(
+                self.load_block(
+                    sstable_index.offset, sstable_index.length, fill_cache
+                ).iterate(start)
+            )
+            for internal_key_value in (
+                reversed(internal_key_values) if reverse else internal_key_values
+            ):
+                if end is not None and internal_key_value.key >= end:
+                    if not reverse:
+                        return
+                else:
+                    yield internal_key_value
+
+    def close(self):
+        if self._mmap is not None:
+            self._mmap_view.release()
+            self._mmap.close()
+        else:
+            self._data_block_file.close()
+
+    def _may_contain(self, key):
+        """False if table level filter says key doesn't exist, block filters are probed per block"""
+        if self._full_filter is not None:
+            return key in self._full_filter
+        if self._filter_partitions:
+            index = bisect.bisect_left(self._filter_partition_max_keys, key)
+            if index == len(self._filter_partitions):
+                return False
+            return key in self._load_filter_partition(index)
+        return True
+
+    def _may_contain_many(self, keys):
+        """_may_contain for sorted keys, probes are batched by full filter or each partition"""
+        if self._full_filter is not None:
+            return self._full_filter.contains_many(keys)
+        if not self._filter_partitions:
+            return [True] * len(keys)
+        result, start, index = [], 0, 0
+        while start < len(keys):
+            index = bisect.bisect_left(
+                self._filter_partition_max_keys, keys[start], index
+            )
+            if index == len(self._filter_partitions):
+                result.extend([False] * (len(keys) - start))
+                break
+            end = bisect.bisect_right(
+                keys, self._filter_partition_max_keys[index], start
+            )
+            result.extend(
+                self._load_filter_partition(index).contains_many(keys[start:end])
+            )
+            start = end
+        return result
+
+    def _load_filters(self, filter_byte_array, filter_offset):
+        """load filter section of version 4, return memory usage of loaded filters.
+        Filter partitions are loaded lazily, only their index is held in memory
+        """
+        self._filter_policy = {
+            policy_id: policy for policy, policy_id in FILTER_POLICIES.items()
+        }[filter_byte_array[0]]
+        if self._filter_policy == "block":
+            self._sstable_filters = _deserialize_all(
+                SSTableBlockFilter, filter_byte_array[1:]
+            )
+            return len(filter_byte_array)
+        if self._filter_policy == "full":
+            self._full_filter = SSTableBlockFilter.deserialize(
+                io.BytesIO(filter_byte_array[1:])
+            )
+            return len(filter_byte_array)
+        partition_index_length = byte_array_to_integer(filter_byte_array[1:5])
+        self._filter_partitions = _deserialize_all(
+            SSTableBlockIndex, filter_byte_array[5 : 5 + partition_index_length]
+        )
+        self._filter_partition_max_keys = [
+            partition.max_key for partition in self._filter_partitions
+        ]
+        # partition offsets are relative to first filter
+        self._filter_partition_offset = filter_offset + 5 + partition_index_length
+        return 5 + partition_index_length
+
+    def _load_filter_partition(self, index):
+        partition = self._filter_partitions[index]
+        offset = self._filter_partition_offset + partition.offset
+        if self._block_cache is not None:
+            partition_filter = self._block_cache.get((self._sstable_filepath, offset))
+            if partition_filter is not None:
+                return partition_filter
+        partition_filter = SSTableBlockFilter.deserialize(
+            io.BytesIO(self._read(offset, partition.length))
+        )
+        if self._block_cache is not None:
+            # partitions share block cache with data blocks, keyed by their file offsets
+            self._block_cache.put(
+                (self._sstable_filepath, offset), partition_filter, partition.length
+            )
+        return partition_filter
+
+    def _read(self, offset, length):
+        """return memoryview of length bytes at offset, a slice of mapping in mmap mode"""
+        if self._mmap_view is not None:
+            return self._mmap_view[offset : offset + length]
+        with self._data_block_file_lock:
+            self._data_block_file.seek(offset)
+            return memoryview(self._data_block_file.read(length))
+
+    def _read_footer(self, file_size):
+        """return unpacked footer, None if sstable is in legacy three-file format"""
+        if file_size < FOOTER_SIZE:
+            return None
+        footer = FOOTER_STRUCT.unpack(self._read(file_size - FOOTER_SIZE, FOOTER_SIZE))
+        if footer[-1] != MAGIC_NUMBER:
+            return None
+        if footer[-2] > FORMAT_VERSION:
+            raise Exception("unsupported sstable format version {}".format(footer[-2]))
+        return footer
+
+
+def _level_filter_policy(conf, table_level):
+    """filter policy of level, levels out of LEVEL_FILTER_POLICIES use FILTER_POLICY"""
+    level_policies = [
+        policy.strip()
+        for policy in conf["SSTABLE"]["LEVEL_FILTER_POLICIES"].split(",")
+        if policy.strip()
+    ]
+    if table_level < len(level_policies):
+        return level_policies[table_level]
+    return conf["SSTABLE"]["FILTER_POLICY"]
+
+
+def _deserialize_all(cls, byte_array):
+    """deserialize consecutive SSTableBlockIndex or SSTableBlockFilter from byte_array"""
+    file_io, result = io.BytesIO(byte_array), []
+    element = cls.deserialize(file_io)
+    while element:
+        result.append(element)
+        element = cls.deserialize(file_io)
+    return result
+
+
+def delete_sstable(table_level, table_name):
+    """remove data, index and filter files of a sstable"""
+    conf = configparser.ConfigParser()
+    conf.read(
+        os.path.join(os.path.dirname(__file__), os.path.pardir, "conf", "lsm_conf.ini")
+    )
+    sstable_filepath = os.path.join(
+        conf["SSTABLE"]["WORK_DIR"], str(table_level), table_name
+    )
+    for filepath in [
+        sstable_filepath,
+        sstable_filepath + ".index",
+        sstable_filepath + ".filter",
+    ]:
+        if os.path.exists(filepath):
+            os.remove(filepath)
+    logger.debug("sstable deleted", table_level=table_level, table_name=table_name)
+
+
+def move_sstable(table_level, new_table_level, table_name):
+    """move data, index and filter files of an unregistered sstable into another level"""
+    conf = configparser.ConfigParser()
+    conf.read(
+        os.path.join(os.path.dirname(__file__), os.path.pardir, "conf", "lsm_conf.ini")
+    )
+    sstable_filepath = os.path.join(
+        conf["SSTABLE"]["WORK_DIR"], str(table_level), table_name
+    )
+    new_sstable_directory = os.path.join(
+        conf["SSTABLE"]["WORK_DIR"], str(new_table_level)
+    )
+    os.makedirs(new_sstable_directory, exist_ok=True)
+    new_sstable_filepath = os.path.join(new_sstable_directory, table_name)
+    for suffix in ["", ".index", ".filter"]:
+        # side files only exist in legacy format
+        if os.path.exists(sstable_filepath + suffix):
+            os.replace(sstable_filepath + suffix, new_sstable_filepath + suffix)
+    logger.debug(
+        "sstable moved",
+        table_level=table_level,
+        new_table_level=new_table_level,
+        table_name=table_name,
+    )
@@ -1,41 +1,88 @@
 import os
 import sys
+import bz2
+import lzma
+import zlib
 import configparser
 
+sys.path.append(
+    os.path.abspath(os.path.join(os.path.dirname(__file__), os.path.pardir))
+)
 
-sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), os.path.pardir)))
 
-
-from storage.sstable_block_filter import SSTableBlockFilter
 from storage.sstable_block_index import SSTableBlockIndex
-from utils.bloomfilter import BytesBloomFilter
+from storage.internal_key_value import InternalKeyValue, PUT_FLAG, SEQUENCE_NUMBER_MASK
+from storage.internal_key import KeyType
+from utils import byte_utils
 from logger.log_util import logger
 
+# compression type byte stored at block tail
+NO_COMPRESSION = 0
+COMPRESSION_TYPES = {"none": NO_COMPRESSION, "zlib": 1, "lzma": 2, "bz2": 3}
+_COMPRESSORS = {1: zlib.compress, 2: lzma.compress, 3: bz2.compress}
+_DECOMPRESSORS = {1: zlib.decompress, 2: lzma.decompress, 3: bz2.decompress}
+
 
 class SSTableBlock(object):
+    """
+    data block, keys are prefix compressed against previous entry and stored in full at restart points:
+    entry:   shared_size + non_shared_size + header +  key_delta  + value_size +   value
+              varint          varint        64bit   var-length     varint     var-length
+    block:   entry * n + restart_offset * restart_count + restart_count
+                               32bit                         32bit
+    header is type + sequence_number as in InternalKeyValue, value_size and value only exist for put.
+    Block is stored compressed or raw, followed by a compression type byte
+    """
 
-    def __init__(self, sstable):
-        conf = configparser.ConfigParser()
-        conf.read(os.path.join(os.path.dirname(__file__), os.path.pardir, "conf", "lsm_conf.ini"))
+    def __init__(self, sstable, conf=None):
+        if conf is None:
+            conf = configparser.ConfigParser()
+            conf.read(
+                os.path.join(
+                    os.path.dirname(__file__), os.path.pardir, "conf", "lsm_conf.ini"
+                )
+            )
         self._sstable = sstable
-        # copy metadata here
-        self._sstable_filepath = sstable._sstable_filepath
-        self._sstable_index_filepath = sstable._sstable_index_filepath
-        self._sstable_filter_filepath = sstable._sstable_filter_filepath
-        # filter
-        self._filter = BytesBloomFilter(size_estimate = 512)
+        # keys of block, filter is built when block is flushed and key count is known
+        self._keys = []
         # max index data
         self._max_key = None
         # block offset and size limit
         self._block_offset = 0
         self._block_size = int(conf["SSTABLE"]["BLOCK_SIZE"])
+        # entries between restart points
+        self._restart_interval = int(conf["SSTABLE"]["BLOCK_RESTART_INTERVAL"])
+        self._restarts = []
+        # entries since last restart point
+        self._entry_count = 0
+        self._last_key_byte_array = b""
         # buffer byte array
         self._byte_array = bytearray()
 
     def append(self, internal_key_value):
         """if append succeeded, return True, vice versa"""
-        byte_array = internal_key_value.serialize()
-        if len(byte_array) + self._block_offset <= self._block_size:
+        key_byte_array = byte_utils.object_to_byte_array(internal_key_value.key)
+        is_restart = (
+            len(self._restarts) == 0 or self._entry_count >= self._restart_interval
+        )
+        shared_size = (
+            0
+            if is_restart
+            else _shared_prefix_size(self._last_key_byte_array, key_byte_array)
+        )
+        byte_array = _encode_entry(internal_key_value, key_byte_array, shared_size)
+        # restart array and its count are appended when block is flushed
+        restarts_size = 4 * (len(self._restarts) + (1 if is_restart else 0)) + 4
+        # an empty block always accepts a record, even if record is larger than block size
+        if (
+            self._block_offset == 0
+            or len(byte_array) + self._block_offset + restarts_size <= self._block_size
+        ):
+            if is_restart:
+                self._restarts.append(self._block_offset)
+                self._entry_count = 0
+            self._entry_count += 1
+            self._last_key_byte_array = key_byte_array
             # update byte array
             self._byte_array.extend(byte_array)
             self._block_offset += len(byte_array)
@@ -43,32 +90,192 @@ class SSTableBlock(object):
             if self._max_key is None or internal_key_value.key > self._max_key:
                 self._max_key = internal_key_value.key
             # update filter
-            self._filter.add(internal_key_value.key)
+            self._keys.append(internal_key_value.key)
             return True
         else:
             return False
 
     def flush(self):
-        """flush block information to sstable disk file"""
+        """write block data into sstable file, index and filter are buffered by sstable until it is closed"""
+        # append restart points
+        self._byte_array.extend(byte_utils.integers_to_byte_array(self._restarts, 4))
+        self._byte_array.extend(
+            byte_utils.integer_to_four_bytes_array(len(self._restarts))
+        )
+        byte_array = _compress_block(
+            self._byte_array,
+            self._sstable._compression_type,
+            self._sstable._compression_min_ratio,
+        )
+        self._block_offset = len(byte_array)
         # append data
-        with open(self._sstable_filepath, "ab") as f:
-            f.write(self._byte_array)
-            logger.debug("flush sstable data", data_length = len(self._byte_array))
+        self._sstable._data_file.write(byte_array)
+        logger.debug(
+            "flush sstable data",
+            raw_length=len(self._byte_array),
+            data_length=len(byte_array),
+            restart_count=len(self._restarts),
+        )
         # append index
-        with open(self._sstable_index_filepath, "ab") as f:
-            f.write(SSTableBlockIndex(self._max_key, self._sstable._offset, self._block_offset, self._sstable._filter_offset).serialize())
-            logger.debug("flush sstable index", max_key = self._max_key, offset = self._sstable._offset, length = self._block_offset)
-        # append filter
-        with open(self._sstable_filter_filepath, "ab") as f:
-            filter_byte_array = SSTableBlockFilter(self._filter).serialize()
-            f.write(filter_byte_array)
-            # update filter offset
-            self._sstable._filter_offset += len(filter_byte_array)
-            logger.debug("flush filter", origin_offset = self._sstable._filter_offset - len(filter_byte_array),
-                                         current_offset = self._sstable._filter_offset)
+        self._sstable._index_byte_array.extend(
+            SSTableBlockIndex(
+                self._max_key,
+                self._sstable._offset,
+                self._block_offset,
+                self._sstable._filter_offset,
+            ).serialize()
+        )
+        logger.debug(
+            "flush sstable index",
+            max_key=self._max_key,
+            offset=self._sstable._offset,
+            length=self._block_offset,
+        )
+        # append filter, built by sstable according to its filter policy
+        self._sstable._add_filter_keys(self._keys, self._max_key)
         # reset last block in sstable
         self._sstable._last_block = None
         logger.debug("reset last block to None")
         # update offset in sstable
         self._sstable._offset += self._block_offset
-        logger.debug("update sstable offset", origin_offset = self._sstable._offset - self._block_offset, current_offset = self._sstable._offset)
\ No newline at end of file
+        logger.debug(
+            "update sstable offset",
+            origin_offset=self._sstable._offset - self._block_offset,
+            current_offset=self._sstable._offset,
+        )
+
+
+class SSTableBlockReader(object):
+    """decode a prefix compressed data block, buffer could be bytes or memoryview.
+    Seeking a key binary searches restart points and decodes entries after the closest one only
+    """
+
+    def __init__(self, buffer):
+        self._buffer = buffer
+        restart_count = byte_utils.byte_array_to_integers(
+            buffer, 4, 1, len(buffer) - 4
+        )[0]
+        self._restarts_offset = len(buffer) - 4 - 4 * restart_count
+        self._restarts = byte_utils.byte_array_to_integers(
+            buffer, 4, restart_count, self._restarts_offset
+        )
+
+    def __iter__(self):
+        return self.iterate()
+
+    def iterate(self, start=None):
+        """iterate records in (key, sequence_number) order, from the first one whose key is not less than start"""
+        buffer = self._buffer
+        offset = 0 if start is None else self._restarts[self._seek_restart(start)]
+        last_key_byte_array = b""
+        while offset < self._restarts_offset:
+            shared_size, offset = byte_utils.decode_varint(buffer, offset)
+            non_shared_size, offset = byte_utils.decode_varint(buffer, offset)
+            header = byte_utils.byte_array_to_integer(buffer[offset : offset + 8])
+            offset += 8
+            key_byte_array = last_key_byte_array[:shared_size] + bytes(
+                buffer[offset : offset + non_shared_size]
+            )
+            offset += non_shared_size
+            last_key_byte_array = key_byte_array
+            value_byte_array = None
+            if header & PUT_FLAG:
+                value_size, offset = byte_utils.decode_varint(buffer, offset)
+                value_byte_array = buffer[offset : offset + value_size]
+                offset += value_size
+            key = byte_utils.byte_array_to_object(key_byte_array)
+            if start is not None and key < start:
+                continue
+            if value_byte_array is None:
+                yield InternalKeyValue(
+                    key, header & SEQUENCE_NUMBER_MASK, KeyType.DELETE
+                )
+            else:
+                yield InternalKeyValue(
+                    key,
+                    header & SEQUENCE_NUMBER_MASK,
+                    KeyType.PUT,
+                    byte_utils.byte_array_to_object(value_byte_array),
+                )
+
+    def _seek_restart(self, key):
+        """index of the last restart point whose key is less than key, 0 if there is none"""
+        left, right = 0, len(self._restarts) - 1
+        while left < right:
+            middle = (left + right + 1) // 2
+            if self._restart_key(middle) < key:
+                left = middle
+            else:
+                right = middle - 1
+        return left
+
+    def _restart_key(self, index):
+        # key of entry at restart point is not shared with previous one
+        offset = self._restarts[index]
+        _, offset = byte_utils.decode_varint(self._buffer, offset)
+        non_shared_size, offset = byte_utils.decode_varint(self._buffer, offset)
+        offset += 8
+        return byte_utils.byte_array_to_object(
+            self._buffer[offset : offset + non_shared_size]
+        )
+
+
+class LegacySSTableBlockReader(object):
+    """decode a block of concatenated serialized records, written before prefix compression"""
+
+    def __init__(self, buffer):
+        self._internal_key_values, position = [], 0
+        internal_key_value, position = InternalKeyValue.decode(buffer, position)
+        while internal_key_value:
+            self._internal_key_values.append(internal_key_value)
+            internal_key_value, position = InternalKeyValue.decode(buffer, position)
+
+    def __iter__(self):
+        return iter(self._internal_key_values)
+
+    def iterate(self, start=None):
+        for internal_key_value in self._internal_key_values:
+            if start is None or internal_key_value.key >= start:
+                yield internal_key_value
+
+
+def decompress_block(buffer):
+    """strip compression type byte from stored block and decompress it, raw block is returned as a slice"""
+    compression_type = buffer[-1]
+    if compression_type == NO_COMPRESSION:
+        return buffer[:-1]
+    if compression_type not in _DECOMPRESSORS:
+        raise Exception("unknown block compression type {}".format(compression_type))
+    return _DECOMPRESSORS[compression_type](buffer[:-1])
+
+
+def _compress_block(byte_array, compression_type, min_ratio):
+    """compressed block is kept only if it saves at least min_ratio of raw size"""
+    if compression_type != NO_COMPRESSION:
+        compressed_byte_array = _COMPRESSORS[compression_type](bytes(byte_array))
+        if len(compressed_byte_array) <= len(byte_array) * (1 - min_ratio):
+            return compressed_byte_array + bytes([compression_type])
+    return bytes(byte_array) + bytes([NO_COMPRESSION])
+
+
+def _shared_prefix_size(a, b):
+    size = min(len(a), len(b))
+    for i in range(size):
+        if a[i] != b[i]:
+            return i
+    return size
+
+
+def _encode_entry(internal_key_value, key_byte_array, shared_size):
+    header = internal_key_value.sequence_number
+    if internal_key_value.type == KeyType.PUT:
+        header |= PUT_FLAG
+    byte_array = bytearray(byte_utils.encode_varint(shared_size))
+    byte_array.extend(byte_utils.encode_varint(len(key_byte_array) - shared_size))
+    byte_array.extend(byte_utils.integer_to_n_bytes_array(header, 8))
+    byte_array.extend(key_byte_array[shared_size:])
+    if internal_key_value.type == KeyType.PUT:
+        value_byte_array = byte_utils.object_to_byte_array(internal_key_value.value)
+        byte_array.extend(byte_utils.encode_varint(len(value_byte_array)))
+        byte_array.extend(value_byte_array)
+    return byte_array
@@ -7,8 +7,20 @@ sys.path.append(
 )
 
 
-from utils.byte_utils import integer_to_four_bytes_array
+from utils.byte_utils import integer_to_n_bytes_array
 from utils.byte_utils import byte_array_to_integer
+from utils.bloomfilter import (
+    BytesBloomFilter,
+    DoubleHashingBloomFilter,
+    BlockedBloomFilter,
+)
+
+# type id of serialized filter -> filter class. Legacy filters start with 32bit length of
+# pickled filter type, whose first byte is always 0, so type ids start from 1
+FILTER_TYPES = {1: BytesBloomFilter, 2: DoubleHashingBloomFilter, 3: BlockedBloomFilter}
+FILTER_TYPE_IDS = {
+    filter_type: type_id for type_id, filter_type in FILTER_TYPES.items()
+}
 
 
 class SSTableBlockFilter(object):
@@ -22,13 +34,20 @@ class SSTableBlockFilter(object):
         # delegate contains to block_filter
         return item in self.block_filter
 
+    def contains_many(self, items):
+        """membership of each item, batched if block_filter supports it"""
+        if hasattr(self.block_filter, "contains_many"):
+            return self.block_filter.contains_many(items)
+        return [item in self.block_filter for item in items]
+
     def serialize(self):
+        """filter_type_id + filter_byte_array
+        8bit             var
+        """
         byte_array = bytearray()
-        filter_type_byte_array = pickle.dumps(type(self.block_filter))
-        # filter type length
-        byte_array.extend(integer_to_four_bytes_array(len(filter_type_byte_array)))
-        # filter type pickle byte array
-        byte_array.extend(filter_type_byte_array)
+        byte_array.extend(
+            integer_to_n_bytes_array(FILTER_TYPE_IDS[type(self.block_filter)], 1)
+        )
         # filter byte array
         filter_byte_array = self.block_filter.serialize()
         byte_array.extend(filter_byte_array)
@@ -36,11 +55,23 @@ class SSTableBlockFilter(object):
 
     @staticmethod
     def deserialize(file_io):
-        """filter_type_length + filter_type_byte_array + filter_byte_array
+        """filter_type_id + filter_byte_array, or legacy format:
+        filter_type_length + filter_type_byte_array + filter_byte_array
                32bit                                         var
         """
-        filter_type_length = file_io.read(4)
-        if len(filter_type_length) != 4:
+        filter_type_id = file_io.read(1)
+        if len(filter_type_id) != 1:
+            return None
+        filter_type_id = filter_type_id[0]
+        if filter_type_id != 0:
+            if filter_type_id not in FILTER_TYPES:
+                raise Exception("unknown filter type id {}".format(filter_type_id))
+            filter = FILTER_TYPES[filter_type_id].deserialize(file_io)
+            return SSTableBlockFilter(filter) if filter else None
+
+        # legacy filter, type is pickled
+        filter_type_length = file_io.read(3)
+        if len(filter_type_length) != 3:
             return None
         filter_type_length = byte_array_to_integer(filter_type_length)
 
@@ -49,5 +80,9 @@ class SSTableBlockFilter(object):
             return None
         filter_type = pickle.loads(filter_type_byte_array)
 
-        filter = filter_type.deserialize(file_io)
-        return SSTableBlockFilter(filter)
+        # legacy bytes bloom filter pickles its hash functions too
+        deserialize = getattr(
+            filter_type, "deserialize_legacy", filter_type.deserialize
+        )
+        filter = deserialize(file_io)
+        return SSTableBlockFilter(filter) if filter else None
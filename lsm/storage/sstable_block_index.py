@@ -1,15 +1,14 @@
-import pickle
 import os
 import sys
-import pickle
-
 
 sys.path.append(
     os.path.abspath(os.path.join(os.path.dirname(__file__), os.path.pardir))
 )
 
 from utils.byte_utils import integer_to_four_bytes_array
-from utils.byte_utils import byte_array_to_integer
+from utils.byte_utils import byte_array_to_integer, byte_array_to_integers
+from utils.byte_utils import integers_to_byte_array
+from utils.byte_utils import object_to_byte_array, byte_array_to_object
 
 
 class SSTableBlockIndex(object):
@@ -24,15 +23,13 @@ class SSTableBlockIndex(object):
     def serialize(self):
         byte_array = bytearray()
         # append max_key first
-        max_key_object = pickle.dumps(self.max_key)
+        max_key_object = object_to_byte_array(self.max_key)
         byte_array.extend(integer_to_four_bytes_array(len(max_key_object)))
         byte_array.extend(max_key_object)
-        # then append offset
-        byte_array.extend(integer_to_four_bytes_array(self.offset))
-        # next length
-        byte_array.extend(integer_to_four_bytes_array(self.length))
-        # finally filter_offset
-        byte_array.extend(integer_to_four_bytes_array(self.filter_offset))
+        # then offset, length and filter_offset
+        byte_array.extend(
+            integers_to_byte_array([self.offset, self.length, self.filter_offset], 4)
+        )
         return bytes(byte_array)
 
     @staticmethod
@@ -44,19 +41,12 @@ class SSTableBlockIndex(object):
         max_key = file_io.read(max_key_length)
         if len(max_key) != max_key_length:
             return None
-        max_key = pickle.loads(max_key)
-        offset = file_io.read(4)
-        if len(offset) != 4:
-            return None
-        offset = byte_array_to_integer(offset)
-        length = file_io.read(4)
-        if len(length) != 4:
-            return None
-        length = byte_array_to_integer(length)
-        filter_offset = file_io.read(4)
-        if len(filter_offset) != 4:
+        max_key = byte_array_to_object(max_key)
+        # offset, length and filter_offset are decoded together
+        fields = file_io.read(12)
+        if len(fields) != 12:
             return None
-        filter_offset = byte_array_to_integer(filter_offset)
+        offset, length, filter_offset = byte_array_to_integers(fields, 4)
         return SSTableBlockIndex(max_key, offset, length, filter_offset)
 
     def __str__(self):
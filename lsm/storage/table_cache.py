@@ -0,0 +1,95 @@
+import os
+import sys
+import threading
+import contextlib
+
+sys.path.append(
+    os.path.abspath(os.path.join(os.path.dirname(__file__), os.path.pardir))
+)
+
+from storage.sstable import SSTableReader
+from utils.lru_cache import LRUCache
+from logger.log_util import logger
+
+
+class TableCache(object):
+    """LRU cache of opened SSTableReader, bounded by open table count and memory of indexes and filters.
+    Readers in use are closed after released, even if they are evicted
+    """
+
+    def __init__(self, max_open_tables, capacity, block_cache=None, use_mmap=None):
+        self._block_cache = block_cache
+        # read mode of opened sstables, use configured one if it is None
+        self._use_mmap = use_mmap
+        self._cache = LRUCache(
+            capacity, max_entries=max_open_tables, on_evict=self._on_evict
+        )
+        # guard reference count of entries, reentrant since eviction happens inside cache operations
+        self._lock = threading.RLock()
+
+    @contextlib.contextmanager
+    def reader(self, table_level, table_name):
+        """open sstable lazily, reader should only be used inside with block"""
+        entry = self._acquire(table_level, table_name)
+        try:
+            yield entry.reader
+        finally:
+            self._release(entry)
+
+    def invalidate(self, table_level, table_name):
+        """evict reader of a removed sstable"""
+        with self._lock:
+            self._cache.remove((table_level, table_name))
+
+    def stats(self):
+        return self._cache.stats()
+
+    def close(self):
+        with self._lock:
+            self._cache.clear()
+
+    def _acquire(self, table_level, table_name):
+        key = (table_level, table_name)
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry:
+                entry.refs += 1
+                return entry
+        # open sstable without lock, other threads may open same one concurrently
+        reader = SSTableReader(
+            table_level, table_name, self._block_cache, self._use_mmap
+        )
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry:
+                reader.close()
+            else:
+                entry = _TableCacheEntry(reader)
+                self._cache.put(key, entry, reader.memory_usage)
+                # too large to be cached
+                entry.evicted = key not in self._cache
+            entry.refs += 1
+            return entry
+
+    def _release(self, entry):
+        with self._lock:
+            entry.refs -= 1
+            if entry.refs == 0 and entry.evicted:
+                entry.reader.close()
+
+    def _on_evict(self, key, entry):
+        with self._lock:
+            entry.evicted = True
+            if entry.refs == 0:
+                entry.reader.close()
+        logger.debug("sstable reader evicted", table_level=key[0], table_name=key[1])
+
+
+class _TableCacheEntry(object):
+
+    __slots__ = ["reader", "refs", "evicted"]
+
+    def __init__(self, reader):
+        self.reader = reader
+        self.refs = 0
+        self.evicted = False
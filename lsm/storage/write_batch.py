@@ -5,27 +5,48 @@ sys.path.append(
     os.path.abspath(os.path.join(os.path.dirname(__file__), os.path.pardir))
 )
 from logger.log_util import logger
+from storage.internal_key import KeyType
 from storage.internal_key_value import InternalKeyValue
 
 
 class WriteBatch(object):
-    """batch writing to storage"""
+    """batch writing to storage, all operations are applied atomically.
+    Operations are staged by put and remove, sequence_number is assigned when batch is written
+    """
 
-    def __init__(self, update_operations, sequence_number):
+    def __init__(self, update_operations=None, sequence_number=None):
         # all write operations share same sequence_number
-        self._batch = []
-        for key, value, type in update_operations:
-            # batch element is InternalKeyValue
-            self._batch.append(InternalKeyValue(key, sequence_number, type, value))
+        self._update_operations = list(update_operations) if update_operations else []
+        self.sequence_number = sequence_number
         logger.debug(
             "Batch construction succeeded",
             sequence_number=sequence_number,
-            length=len(self._batch),
+            length=len(self._update_operations),
         )
 
+    @property
+    def update_operations(self):
+        """(key, value, type) list in staged order"""
+        return self._update_operations
+
+    def put(self, key, value):
+        assert key is not None
+        self._update_operations.append((key, value, KeyType.PUT))
+        return self
+
+    def remove(self, key):
+        assert key is not None
+        self._update_operations.append((key, None, KeyType.DELETE))
+        return self
+
+    def __len__(self):
+        return len(self._update_operations)
+
     def __iter__(self):
-        for pair in self._batch:
-            yield pair
+        """batch element is InternalKeyValue"""
+        assert self.sequence_number is not None, "sequence_number is not assigned"
+        for key, value, type in self._update_operations:
+            yield InternalKeyValue(key, self.sequence_number, type, value)
 
     def __str__(self):
-        return "(" + ", ".join(list(map(str, self._batch))) + ")"
+        return "(" + ", ".join(list(map(str, self))) + ")"
@@ -1,6 +1,10 @@
 import sys
 import os
+import math
+import random
 import pickle
+import functools
+import mmh3
 from bitarray import bitarray
 
 sys.path.append(
@@ -12,6 +16,8 @@ from utils.byte_utils import integer_to_n_bytes_array
 from utils.byte_utils import byte_array_to_bitarray
 from utils.byte_utils import bitarray_to_byte_array
 from utils.byte_utils import byte_array_to_integer
+from utils.byte_utils import byte_array_to_integers
+from utils.byte_utils import integers_to_byte_array
 from utils import bloomfilter_hash_functions
 
 
@@ -27,9 +33,13 @@ class BytesBloomFilter(object):
         if bitmap:
             assert isinstance(bitmap, bitarray)
             self._bits = self._ceiling_bits(len(bitmap))
-            self._bitmap = bitarray(self._bits)
-            self._bitmap.setall(False)
-            self._bitmap = self._bitmap | bitmap
+            if self._bits == len(bitmap):
+                # deserialized bitmap is used as is
+                self._bitmap = bitmap
+            else:
+                self._bitmap = bitarray(self._bits)
+                self._bitmap.setall(False)
+                self._bitmap[: len(bitmap)] = bitmap
         else:
             self._bits = (
                 self._ceiling_bits(bits)
@@ -67,7 +77,7 @@ class BytesBloomFilter(object):
         return self._bitmap
 
     def add(self, value):
-        value = self._process_value(value)
+        value = _process_value(value)
         for hash_func in self._hash_functions:
             index = hash_func.hash(value)
             self._bitmap[index] = True
@@ -85,7 +95,7 @@ class BytesBloomFilter(object):
         return filter
 
     def __contains__(self, item):
-        item = self._process_value(item)
+        item = _process_value(item)
         for hash_func in self._hash_functions:
             index = hash_func.hash(item)
             if not self._bitmap[index]:
@@ -97,32 +107,50 @@ class BytesBloomFilter(object):
 
     def serialize(self):
         """
-        bitmap_byte_array_length + bitmap + hash_functions_length + [func_length + func_bytes] * hash_functions_length
-            32bit                                8bit                   32bit
+        bitmap_byte_array_length + bitmap + hash_functions_length + [func_type + value1 + value2] * hash_functions_length
+            32bit                                8bit                   8bit     64bit    64bit
         """
         byte_array = bytearray()
         # bitmap first
         bitmap_byte_array = bitarray_to_byte_array(self._bitmap)
         byte_array.extend(integer_to_four_bytes_array(len(bitmap_byte_array)))
         byte_array.extend(bitmap_byte_array)
-        # then hash functions
+        # then hash functions, only their types and coefficients
         byte_array.extend(integer_to_n_bytes_array(len(self._hash_functions), 1))
         for func in self._hash_functions:
-            func_object = pickle.dumps(func)
-            byte_array.extend(integer_to_four_bytes_array(len(func_object)))
-            byte_array.extend(func_object)
+            byte_array.extend(integer_to_n_bytes_array(func.TYPE_ID, 1))
+            byte_array.extend(integers_to_byte_array(func.coefficients, 8))
         return bytes(byte_array)
 
     @staticmethod
     def deserialize(file_io):
-        bitmap_length = file_io.read(4)
-        if len(bitmap_length) != 4:
+        bitmap = _read_bitmap(file_io)
+        if bitmap is None:
             return None
-        bitmap_length = byte_array_to_integer(bitmap_length)
-        bitmap = file_io.read(bitmap_length)
-        if len(bitmap) != bitmap_length:
+        hash_function_length = file_io.read(1)
+        if len(hash_function_length) != 1:
+            return None
+        hash_function_length = hash_function_length[0]
+        hash_functions_byte_array = file_io.read(17 * hash_function_length)
+        if len(hash_functions_byte_array) != 17 * hash_function_length:
+            return None
+        hash_functions = []
+        for offset in range(0, len(hash_functions_byte_array), 17):
+            hash_class = bloomfilter_hash_functions.HASH_FUNCTION_TYPES[
+                hash_functions_byte_array[offset]
+            ]
+            value1, value2 = byte_array_to_integers(
+                hash_functions_byte_array, 8, 2, offset + 1
+            )
+            hash_functions.append(hash_class(len(bitmap), value1, value2))
+        return BytesBloomFilter(hash_functions=hash_functions, bitmap=bitmap)
+
+    @staticmethod
+    def deserialize_legacy(file_io):
+        """deserialize filter written before compact encoding, whose hash functions are pickled"""
+        bitmap = _read_bitmap(file_io)
+        if bitmap is None:
             return None
-        bitmap = byte_array_to_bitarray(bitmap)
         hash_function_length = file_io.read(1)
         if len(hash_function_length) != 1:
             return None
@@ -149,17 +177,286 @@ class BytesBloomFilter(object):
             ans <<= 1
         return ans
 
-    def _process_value(self, value):
-        # special check for common string usage
-        if isinstance(value, str):
-            value = value.encode("utf-8")
-        elif isinstance(value, int):
-            value = str(value).encode("utf-8")
-        assert isinstance(value, bytes)
-        return value
-
     def __str__(self):
         output = "bits: {}, hash_functions: {}, bitmap: {}".format(
             self.bits, self.hash_functions, self.bitmap
         )
         return output
+
+
+class DoubleHashingBloomFilter(object):
+    """bloom filter deriving all k indices from one 128bit murmur hash, index_i = h1 + i * h2.
+    Bits and k are sized from expected item count and target false positive rate
+    """
+
+    def __init__(
+        self,
+        expected_items=1,
+        false_positive_rate=0.01,
+        hash_count=None,
+        seed=0,
+        bitmap=None,
+    ):
+        assert 0 < false_positive_rate < 1
+        if bitmap is not None:
+            assert isinstance(bitmap, bitarray)
+            self._bitmap = bitmap
+        else:
+            # optimal bits = -n * ln(p) / ln(2)^2, rounded up to whole bytes
+            bits = math.ceil(
+                -max(expected_items, 1)
+                * math.log(false_positive_rate)
+                / (math.log(2) ** 2)
+            )
+            self._bitmap = bitarray((bits + 7) // 8 * 8)
+            self._bitmap.setall(False)
+        self._bits = len(self._bitmap)
+        # optimal k = bits / n * ln(2)
+        self._hash_count = hash_count or max(
+            1, round(self._bits / max(expected_items, 1) * math.log(2))
+        )
+        self._seed = seed
+
+    @property
+    def bits(self):
+        return self._bits
+
+    @property
+    def hash_count(self):
+        return self._hash_count
+
+    @property
+    def seed(self):
+        return self._seed
+
+    @property
+    def bitmap(self):
+        return self._bitmap
+
+    def add(self, value):
+        h1, h2 = self._hash(value)
+        for i in range(self._hash_count):
+            self._bitmap[(h1 + i * h2) % self._bits] = True
+
+    def __contains__(self, item):
+        h1, h2 = self._hash(item)
+        bits, bitmap = self._bits, self._bitmap
+        # probe one index at a time, most missing keys stop at the first ones
+        for i in range(self._hash_count):
+            if not bitmap[(h1 + i * h2) % bits]:
+                return False
+        return True
+
+    def __len__(self):
+        return self._bits
+
+    def serialize(self):
+        """
+        hash_count + seed + bitmap_byte_array_length + bitmap
+          8bit      32bit          32bit
+        """
+        byte_array = bytearray(integer_to_n_bytes_array(self._hash_count, 1))
+        byte_array.extend(integer_to_four_bytes_array(self._seed))
+        bitmap_byte_array = bitarray_to_byte_array(self._bitmap)
+        byte_array.extend(integer_to_four_bytes_array(len(bitmap_byte_array)))
+        byte_array.extend(bitmap_byte_array)
+        return bytes(byte_array)
+
+    @staticmethod
+    def deserialize(file_io):
+        header = file_io.read(9)
+        if len(header) != 9:
+            return None
+        hash_count = header[0]
+        seed = byte_array_to_integer(header[1:5])
+        bitmap_length = byte_array_to_integer(header[5:9])
+        bitmap = file_io.read(bitmap_length)
+        if len(bitmap) != bitmap_length:
+            return None
+        return DoubleHashingBloomFilter(
+            hash_count=hash_count, seed=seed, bitmap=byte_array_to_bitarray(bitmap)
+        )
+
+    def _hash(self, value):
+        # unsigned 128bit value, same on murmurhash3 and newer mmh3 releases
+        hash_value = mmh3.hash128(_process_value(value), self._seed)
+        # two independent 64bit halves, odd h2 never degenerates to a single index
+        return hash_value & 0xFFFFFFFFFFFFFFFF, (hash_value >> 64) | 1
+
+    def __str__(self):
+        return "bits: {}, hash_count: {}, seed: {}".format(
+            self._bits, self._hash_count, self._seed
+        )
+
+
+class BlockedBloomFilter(object):
+    """bloom filter whose k bits of a key all fall into one 512bit block, so a probe touches one
+    cache line. contains_many probes a batch of keys and converts each touched block only once
+    """
+
+    BLOCK_BITS = 512
+    # more bits per key barely lowers false positives of a block, caps size of mask tables too
+    MAX_HASH_COUNT = 30
+
+    def __init__(
+        self,
+        expected_items=1,
+        false_positive_rate=0.01,
+        hash_count=None,
+        seed=0,
+        bitmap=None,
+    ):
+        assert 0 < false_positive_rate < 1
+        if bitmap is not None:
+            assert len(bitmap) % (self.BLOCK_BITS // 8) == 0
+            self._bitmap = bytearray(bitmap)
+        else:
+            bits = math.ceil(
+                -max(expected_items, 1)
+                * math.log(false_positive_rate)
+                / (math.log(2) ** 2)
+            )
+            block_count = max(1, math.ceil(bits / self.BLOCK_BITS))
+            self._bitmap = bytearray(block_count * self.BLOCK_BITS // 8)
+        self._block_count = len(self._bitmap) * 8 // self.BLOCK_BITS
+        # decoded blocks for probes, built on first probe
+        self._block_values = None
+        # derived from bits per key requested, not from bits rounded up to whole blocks
+        self._hash_count = hash_count or min(
+            self.MAX_HASH_COUNT,
+            max(1, round(-math.log(false_positive_rate) / math.log(2))),
+        )
+        if not 0 < self._hash_count <= 255:
+            raise Exception(
+                "hash count {} out of range [1, 255]".format(self._hash_count)
+            )
+        self._seed = seed
+
+    @property
+    def bits(self):
+        return len(self._bitmap) * 8
+
+    @property
+    def hash_count(self):
+        return self._hash_count
+
+    @property
+    def seed(self):
+        return self._seed
+
+    @property
+    def bitmap(self):
+        return self._bitmap
+
+    def add(self, value):
+        block, mask = self._locate(value)
+        offset = block * (self.BLOCK_BITS // 8)
+        block_value = int.from_bytes(
+            self._bitmap[offset : offset + self.BLOCK_BITS // 8], "little"
+        )
+        self._bitmap[offset : offset + self.BLOCK_BITS // 8] = (
+            block_value | mask
+        ).to_bytes(self.BLOCK_BITS // 8, "little")
+        self._block_values = None
+
+    def __contains__(self, item):
+        return self.contains_many([item])[0]
+
+    def contains_many(self, items):
+        """membership of each item, in order of items"""
+        if self._block_values is None:
+            # 512bit integer of each block, a probe is a single mask test
+            block_size = self.BLOCK_BITS // 8
+            self._block_values = [
+                int.from_bytes(self._bitmap[offset : offset + block_size], "little")
+                for offset in range(0, len(self._bitmap), block_size)
+            ]
+        block_values, result = self._block_values, []
+        for item in items:
+            block, mask = self._locate(item)
+            result.append(block_values[block] & mask == mask)
+        return result
+
+    def __len__(self):
+        return self.bits
+
+    def serialize(self):
+        """
+        hash_count + seed + bitmap_byte_array_length + bitmap
+          8bit      32bit          32bit
+        """
+        byte_array = bytearray(integer_to_n_bytes_array(self._hash_count, 1))
+        byte_array.extend(integer_to_four_bytes_array(self._seed))
+        byte_array.extend(integer_to_four_bytes_array(len(self._bitmap)))
+        byte_array.extend(self._bitmap)
+        return bytes(byte_array)
+
+    @staticmethod
+    def deserialize(file_io):
+        header = file_io.read(9)
+        if len(header) != 9:
+            return None
+        bitmap_length = byte_array_to_integer(header[5:9])
+        bitmap = file_io.read(bitmap_length)
+        if len(bitmap) != bitmap_length:
+            return None
+        return BlockedBloomFilter(
+            hash_count=header[0], seed=byte_array_to_integer(header[1:5]), bitmap=bitmap
+        )
+
+    def _locate(self, value):
+        """block of value and mask of its bits inside the block"""
+        hash_value = mmh3.hash128(_process_value(value), self._seed)
+        block = (hash_value & 0xFFFFFFFFFFFFFFFF) % self._block_count
+        # k bits are the union of two precomputed patterns, avoid a loop per bit
+        low_masks, high_masks = _block_mask_tables(self._hash_count)
+        return (
+            block,
+            low_masks[(hash_value >> 64) & 0xFFF]
+            | high_masks[(hash_value >> 76) & 0xFFF],
+        )
+
+    def __str__(self):
+        return "blocks: {}, hash_count: {}, seed: {}".format(
+            self._block_count, self._hash_count, self._seed
+        )
+
+
+@functools.lru_cache(maxsize=None)
+def _block_mask_tables(hash_count):
+    """two tables of 4096 masks over a 512bit block, which hold half of hash_count distinct bits each.
+    Generated from a fixed seed, so serialized BlockedBloomFilter is always probed with same patterns
+    """
+    generator = random.Random(hash_count)
+    tables = []
+    for bit_count in [hash_count - hash_count // 2, hash_count // 2]:
+        table = []
+        for _ in range(4096):
+            bit_indexes = set()
+            while len(bit_indexes) < bit_count:
+                bit_indexes.add(generator.getrandbits(9))
+            table.append(sum(1 << bit_index for bit_index in bit_indexes))
+        tables.append(table)
+    return tables
+
+
+def _read_bitmap(file_io):
+    """read 32bit length prefixed bitmap, None if EOF found"""
+    bitmap_length = file_io.read(4)
+    if len(bitmap_length) != 4:
+        return None
+    bitmap_length = byte_array_to_integer(bitmap_length)
+    bitmap = file_io.read(bitmap_length)
+    if len(bitmap) != bitmap_length:
+        return None
+    return byte_array_to_bitarray(bitmap)
+
+
+def _process_value(value):
+    # special check for common string usage
+    if isinstance(value, str):
+        value = value.encode("utf-8")
+    elif isinstance(value, int):
+        value = str(value).encode("utf-8")
+    assert isinstance(value, bytes)
+    return value
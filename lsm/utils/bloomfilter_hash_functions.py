@@ -12,10 +12,18 @@ __all__ = [
 
 
 class HashFunction(object):
-    def __init__(self, bits):
+    # identify hash function in serialized bloom filter
+    TYPE_ID = None
+
+    def __init__(self, bits, value1=None, value2=None):
         self._bits = bits
-        self._value1 = random.randint(0, self._bits - 1)
-        self._value2 = random.randint(0, self._bits - 1)
+        # random coefficients unless restored from serialized filter
+        self._value1 = random.randint(0, self._bits - 1) if value1 is None else value1
+        self._value2 = random.randint(0, self._bits - 1) if value2 is None else value2
+
+    @property
+    def coefficients(self):
+        return self._value1, self._value2
 
     def hash(self, value):
         """bits will always be the power of two"""
@@ -32,16 +40,22 @@ class HashFunction(object):
 
 
 class Murmur32HashFunction(HashFunction):
+    TYPE_ID = 1
+
     def _hash(self, value):
         return mmh3.hash(value)
 
 
 class Murmur128HashFunction(HashFunction):
+    TYPE_ID = 2
+
     def _hash(self, value):
         return mmh3.hash128(value)
 
 
 class MD5HashFunction(HashFunction):
+    TYPE_ID = 3
+
     def _hash(self, value):
         md5 = hashlib.md5()
         md5.update(value)
@@ -49,6 +63,8 @@ class MD5HashFunction(HashFunction):
 
 
 class SHA1HashFunction(HashFunction):
+    TYPE_ID = 4
+
     def _hash(self, value):
         sha1 = hashlib.sha1()
         sha1.update(value)
@@ -56,7 +72,19 @@ class SHA1HashFunction(HashFunction):
 
 
 class SHA256HashFunction(HashFunction):
+    TYPE_ID = 5
+
     def _hash(self, value):
         sha256 = hashlib.sha256()
         sha256.update(value)
         return int(sha256.hexdigest(), 16)
+
+
+# type id of hash function in serialized bloom filter -> hash function class
+HASH_FUNCTION_TYPES = {
+    1: Murmur32HashFunction,
+    2: Murmur128HashFunction,
+    3: MD5HashFunction,
+    4: SHA1HashFunction,
+    5: SHA256HashFunction,
+}
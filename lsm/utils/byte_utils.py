@@ -1,40 +1,70 @@
+import pickle
+import struct
 from bitarray import bitarray
 
+# type tags of object encoding, pickle data always starts with PROTO opcode 0x80,
+# so pickled objects need no extra tag and legacy pickled data is still readable
+NONE_TAG = 0x00
+BYTES_TAG = 0x01
+STR_TAG = 0x02
+INT_TAG = 0x03
+PICKLE_TAG = 0x80
+
+
+# precompiled codecs for common fixed widths, big endian
+_STRUCT_FORMATS = {1: "B", 2: "H", 4: "I", 8: "Q"}
+
 
 def byte_array_to_integer(byte_array):
-    """convert byte_array into integer"""
-    result = 0
-    for b in byte_array:
-        result = (result << 8) + int(b)
-    return result
+    """convert big endian byte_array into integer"""
+    return int.from_bytes(byte_array, "big")
+
+
+def byte_array_to_integers(buffer, width, count=None, offset=0):
+    """decode count big endian integers of width bytes each from buffer at offset,
+    all remaining complete integers are decoded if count is None
+    """
+    if count is None:
+        count = (len(buffer) - offset) // width
+    assert offset + count * width <= len(buffer)
+    struct_format = _STRUCT_FORMATS.get(width)
+    if struct_format:
+        return list(
+            struct.unpack_from(">{}{}".format(count, struct_format), buffer, offset)
+        )
+    view = memoryview(buffer)
+    return [
+        int.from_bytes(view[start : start + width], "big")
+        for start in range(offset, offset + count * width, width)
+    ]
+
+
+def integers_to_byte_array(values, width):
+    """encode integers into concatenated big endian byte array of width bytes each,
+    raise if any of them does not fit in width bytes
+    """
+    limit = 1 << (width * 8)
+    for value in values:
+        if not 0 <= value < limit:
+            raise Exception("{} does not fit in {} bytes".format(value, width))
+    struct_format = _STRUCT_FORMATS.get(width)
+    if struct_format:
+        return struct.pack(">{}{}".format(len(values), struct_format), *values)
+    return b"".join(value.to_bytes(width, "big") for value in values)
 
 
 def byte_array_to_bitarray(byte_array):
     """byte_array to bitarray, from left to right. First length bit will be chose"""
-    length = len(byte_array) * 8
-    result = bitarray(length)
-    result.setall(False)
-    for index, b in enumerate(byte_array):
-        int_value = int(b)
-        for i in reversed(range(8)):
-            if (int_value & (1 << i)) != 0:
-                result[index * 8 + 7 - i] = True
+    result = bitarray(endian="big")
+    result.frombytes(bytes(byte_array))
     return result
 
 
 def bitarray_to_byte_array(bit_array):
+    """bitarray to byte_array, from left to right. Last byte is padded with zero bits"""
     assert isinstance(bit_array, bitarray)
-    index, byte_array = 0, bytearray()
-    while index < len(bit_array):
-        start, end = index, min(index + 7, len(bit_array) - 1)
-        # convert bits[start: end + 1] into byte
-        int_value, highest_digit = 0, 7
-        for i in range(start, end + 1, 1):
-            int_value = int_value | (1 << highest_digit) if bit_array[i] else int_value
-            highest_digit -= 1
-        byte_array.append(int_value)
-        index += 8
-    return byte_array
+    # bits keep their index order when copied into a big endian bitarray
+    return bytearray(bitarray(bit_array, endian="big").tobytes())
 
 
 def integer_to_four_bytes_array(value):
@@ -43,9 +73,80 @@ def integer_to_four_bytes_array(value):
 
 
 def integer_to_n_bytes_array(value, n):
-    """convert integer into n bytes array"""
-    n *= 8
+    """convert integer into n bytes array, higher bits out of n bytes are dropped"""
+    return (value & ((1 << (n * 8)) - 1)).to_bytes(n, "big")
+
+
+def encode_varint(value):
+    """encode non-negative integer into LEB128 varint bytes"""
+    assert value >= 0
     byte_array = bytearray()
-    for i in range(n, 0, -8):
-        byte_array.append(int((value >> (i - 8)) & ((1 << 8) - 1)))
+    while value >= 0x80:
+        byte_array.append((value & 0x7F) | 0x80)
+        value >>= 7
+    byte_array.append(value)
     return bytes(byte_array)
+
+
+def decode_varint(buffer, offset=0):
+    """decode varint from buffer at offset, return (value, next_offset), None if buffer is truncated"""
+    # one byte varint is the common case for key and value sizes
+    if offset < len(buffer) and buffer[offset] < 0x80:
+        return buffer[offset], offset + 1
+    result, shift = 0, 0
+    while offset < len(buffer):
+        b = buffer[offset]
+        offset += 1
+        result |= (b & 0x7F) << shift
+        if b < 0x80:
+            return result, offset
+        shift += 7
+    return None
+
+
+def read_varint(file_io):
+    """read varint from file, return None if EOF found"""
+    result, shift = 0, 0
+    while True:
+        b = file_io.read(1)
+        if len(b) != 1:
+            return None
+        result |= (b[0] & 0x7F) << shift
+        if b[0] < 0x80:
+            return result
+        shift += 7
+
+
+def object_to_byte_array(obj):
+    """encode bytes, str, int and None with a type tag and raw data, other objects are pickled"""
+    # bool is subclass of int, but it should be decoded as bool
+    obj_type = type(obj)
+    if obj_type is bytes:
+        return bytes([BYTES_TAG]) + obj
+    elif obj_type is str:
+        return bytes([STR_TAG]) + obj.encode("utf-8")
+    elif obj_type is int:
+        # zigzag encoding for negative integers
+        return bytes([INT_TAG]) + encode_varint(
+            obj << 1 if obj >= 0 else ((-obj) << 1) - 1
+        )
+    elif obj is None:
+        return bytes([NONE_TAG])
+    else:
+        return pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def byte_array_to_object(byte_array):
+    """decode object encoded by object_to_byte_array, byte_array could be bytes or memoryview"""
+    tag = byte_array[0]
+    if tag == BYTES_TAG:
+        return bytes(byte_array[1:])
+    elif tag == STR_TAG:
+        return str(byte_array[1:], "utf-8")
+    elif tag == INT_TAG:
+        value = decode_varint(byte_array, 1)[0]
+        return value >> 1 if (value & 1) == 0 else -((value + 1) >> 1)
+    elif tag == NONE_TAG:
+        return None
+    else:
+        return pickle.loads(byte_array)
@@ -14,10 +14,18 @@ class DoubleLinkedList(object):
         self._node_set = set()
 
     def add_last(self, value):
-        self._insert_after(self._tail, self.ListNode(value))
+        """append value to the end, return list node which could be removed later"""
+        list_node = self.ListNode(value)
+        self._insert_after(self._tail, list_node)
+        self._node_set.add(list_node)
+        return list_node
 
     def add_first(self, value):
-        self._insert_after(self._head, self.ListNode(value))
+        """insert value at the beginning, return list node which could be removed later"""
+        list_node = self.ListNode(value)
+        self._insert_after(self._head, list_node)
+        self._node_set.add(list_node)
+        return list_node
 
     def peek_last(self):
         self._empty_check()
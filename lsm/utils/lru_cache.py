@@ -0,0 +1,117 @@
+import os
+import sys
+import threading
+
+sys.path.append(
+    os.path.abspath(os.path.join(os.path.dirname(__file__), os.path.pardir))
+)
+
+from utils.double_linked_list import DoubleLinkedList
+
+
+class LRUCache(object):
+    """thread-safe LRU cache bounded by total charge of entries(eg: byte size), and optionally entry count"""
+
+    def __init__(self, capacity, max_entries=None, on_evict=None):
+        """on_evict(key, value) is called whenever an entry leaves cache, including replacement and removal"""
+        assert capacity >= 0
+        self._capacity = capacity
+        self._max_entries = max_entries
+        self._on_evict = on_evict
+        self._usage = 0
+        # least recently used entry comes first, list node value is (key, value, charge)
+        self._list = DoubleLinkedList()
+        self._key_to_node = {}
+        self._lock = threading.Lock()
+        self._hits, self._misses, self._evictions = 0, 0, 0
+
+    @property
+    def capacity(self):
+        return self._capacity
+
+    @property
+    def usage(self):
+        return self._usage
+
+    @property
+    def hits(self):
+        return self._hits
+
+    @property
+    def misses(self):
+        return self._misses
+
+    @property
+    def evictions(self):
+        return self._evictions
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "usage": self._usage,
+                "capacity": self._capacity,
+                "size": len(self._key_to_node),
+            }
+
+    def get(self, key, default=None):
+        with self._lock:
+            list_node = self._key_to_node.get(key)
+            if list_node is None:
+                self._misses += 1
+                return default
+            self._hits += 1
+            # move to the most recently used position
+            self._list.remove(list_node)
+            self._key_to_node[key] = self._list.add_last(list_node.value)
+            return list_node.value[1]
+
+    def put(self, key, value, charge=1):
+        """insert or replace an entry, least recently used entries are evicted when capacity exceeded"""
+        with self._lock:
+            self._remove(key)
+            # entry larger than the whole cache is never cached
+            if charge > self._capacity:
+                return
+            self._key_to_node[key] = self._list.add_last((key, value, charge))
+            self._usage += charge
+            while self._usage > self._capacity or (
+                self._max_entries is not None
+                and len(self._key_to_node) > self._max_entries
+            ):
+                evicted_key, evicted_value, evicted_charge = (
+                    self._list.pop_first().value
+                )
+                del self._key_to_node[evicted_key]
+                self._usage -= evicted_charge
+                self._evictions += 1
+                if self._on_evict:
+                    self._on_evict(evicted_key, evicted_value)
+
+    def remove(self, key):
+        with self._lock:
+            return self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            for key in list(self._key_to_node.keys()):
+                self._remove(key)
+
+    def _remove(self, key):
+        list_node = self._key_to_node.pop(key, None)
+        if list_node is None:
+            return False
+        self._list.remove(list_node)
+        self._usage -= list_node.value[2]
+        if self._on_evict:
+            self._on_evict(key, list_node.value[1])
+        return True
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._key_to_node
+
+    def __len__(self):
+        return len(self._key_to_node)
@@ -4,7 +4,6 @@ from collections import deque
 import os
 import sys
 
-
 sys.path.append(
     os.path.abspath(os.path.join(os.path.dirname(__file__), os.path.pardir))
 )
@@ -61,6 +60,49 @@ class SkipList(object):
             self._size += 1
         self._global_lock.release()
 
+    def put_many(self, key_value_pairs):
+        """put key-value pairs in sorted order, later pair wins for duplicated keys.
+        Search of each key starts from predecessors of previous key(search fingers) instead of head
+        """
+        self._global_lock.acquire()
+        # predecessor of last key in each layer, bottom first
+        fingers = list(self._heads)
+        for key, value in sorted(key_value_pairs, key=lambda pair: pair[0]):
+            current, find = None, False
+            for level in range(len(self._heads) - 1, -1, -1):
+                finger, head = fingers[level], self._heads[level]
+                if current is None:
+                    current = finger
+                else:
+                    current = current.down
+                    # start from the rightmost one of finger and node descended from upper layer
+                    if finger is not head and (
+                        current is head or current.key < finger.key
+                    ):
+                        current = finger
+                while current.right and current.right.key < key:
+                    current = current.right
+                if current.right and current.right.key == key:
+                    current.right.value = value
+                    find = True
+                fingers[level] = current
+            if not find:
+                level = self._random_level()
+                # add more headers when necessary
+                while len(self._heads) < level + 1:
+                    new_head = SkipListNode(-1, -1, right=None, down=self._heads[-1])
+                    self._heads.append(new_head)
+                    fingers.append(new_head)
+                prev_insert_node = None
+                for predecessor in fingers[: level + 1]:
+                    new_node = SkipListNode(
+                        key, value, right=predecessor.right, down=prev_insert_node
+                    )
+                    predecessor.right = new_node
+                    prev_insert_node = new_node
+                self._size += 1
+        self._global_lock.release()
+
     def remove(self, key):
         self._global_lock.acquire()
         predecessors = []
@@ -262,11 +304,229 @@ class DummyLock(object):
         pass
 
 
-# TODO
 class LockFreeSkipList(object):
-    """better solution for concurrent SkipList"""
+    """concurrent SkipList with single-writer/multi-reader semantics.
+    Writers are serialized by a writer lock, readers never take any lock. A new node is fully
+    linked to its successors before it is published to predecessors, bottom layer first, so
+    readers always see a well-formed list. Iterators skip nodes inserted after they start
+    """
+
+    MAX_HEIGHT = 32
+
+    def __init__(self, iterable=None):
+        iterable = iterable if iterable else []
+        assert (
+            iter(iterable) != iterable
+        ), "Iterable collection should be provided, not iterable or other illegal data types"
+        self._write_lock = threading.Lock()
+        self._head = LockFreeSkipListNode(None, None, self.MAX_HEIGHT)
+        self._height = 1
+        self._size = 0
+        # incremented by each insertion, nodes remember the version they are inserted at
+        self._version = 0
+        self._build_from_iterable(iterable)
 
-    pass
+    @property
+    def layer(self):
+        return self._height
+
+    def put(self, key, value):
+        with self._write_lock:
+            self._put(key, value, self._find_predecessors(key))
+
+    def put_many(self, key_value_pairs):
+        """put key-value pairs in sorted order, later pair wins for duplicated keys.
+        Search of each key starts from predecessors of previous key(search fingers) instead of head
+        """
+        with self._write_lock:
+            fingers = [self._head] * self.MAX_HEIGHT
+            for key, value in sorted(key_value_pairs, key=lambda pair: pair[0]):
+                fingers = self._find_predecessors(key, fingers)
+                self._put(key, value, fingers)
+
+    def remove(self, key):
+        with self._write_lock:
+            predecessors = self._find_predecessors(key)
+            node = predecessors[0].next[0]
+            if node is None or node.key != key:
+                return False
+            # unlink from top, removed node still points to its successors for concurrent readers
+            for level in range(len(node.next) - 1, -1, -1):
+                predecessors[level].next[level] = node.next[level]
+            self._size -= 1
+            return True
+
+    def get(self, key, default=None):
+        node = self._find_greater_or_equal(key)
+        if node is not None and node.key == key:
+            return node.value
+        return default
+
+    def ceiling(self, key):
+        node = self._find_greater_or_equal(key)
+        return (node.key, node.value) if node else None
+
+    def floor(self, key):
+        current = self._head
+        for level in range(self._height - 1, -1, -1):
+            next_node = current.next[level]
+            while next_node is not None and next_node.key <= key:
+                current = next_node
+                next_node = current.next[level]
+        return (current.key, current.value) if current is not self._head else None
+
+    def floor_many(self, keys):
+        """floor of each key in sorted keys, search of each key starts from predecessors of
+        previous key(search fingers) instead of head
+        """
+        result, fingers = [], None
+        for key in keys:
+            fingers = self._find_predecessors(key, fingers)
+            node = fingers[0].next[0]
+            if node is not None and node.key == key:
+                result.append((node.key, node.value))
+            elif fingers[0] is not self._head:
+                result.append((fingers[0].key, fingers[0].value))
+            else:
+                result.append(None)
+        return result
+
+    def keys(self):
+        return map(lambda item: item[0], self.items())
+
+    def lower(self, key):
+        """return (key, value) of the largest key less than key, None if not found"""
+        node = self._find_less_than(key)
+        return (node.key, node.value) if node is not self._head else None
+
+    def items(self, start_key=None):
+        """iterate from the first key no less than start_key without lock,
+        nodes inserted after iteration starts are invisible
+        """
+        version = self._version
+        node = (
+            self._head.next[0]
+            if start_key is None
+            else self._find_greater_or_equal(start_key)
+        )
+        while node is not None:
+            if node.version <= version:
+                yield node.key, node.value
+            node = node.next[0]
+
+    def reversed_items(self, end_key=None):
+        """iterate keys less than end_key in descending order without lock, each step is a search
+        since nodes only link to successors. Nodes inserted after iteration starts are invisible
+        """
+        version = self._version
+        node = self._find_less_than(end_key)
+        while node is not self._head:
+            if node.version <= version:
+                yield node.key, node.value
+            node = self._find_less_than(node.key)
+
+    def clear(self):
+        with self._write_lock:
+            # publish an empty head at once, readers on old nodes still finish their traversal
+            self._head = LockFreeSkipListNode(None, None, self.MAX_HEIGHT)
+            self._height = 1
+            self._size = 0
+
+    def size(self, accurate=False):
+        return self._size
+
+    def _put(self, key, value, predecessors):
+        """predecessors of key in each layer are found, must be called with writer lock held"""
+        node = predecessors[0].next[0]
+        if node is not None and node.key == key:
+            # replacing a reference is atomic
+            node.value = value
+            return
+        height = self._random_height()
+        if height > self._height:
+            # new layers start from head, which is already in predecessors
+            self._height = height
+        self._version += 1
+        new_node = LockFreeSkipListNode(key, value, height, self._version)
+        for level in range(height):
+            new_node.next[level] = predecessors[level].next[level]
+        for level in range(height):
+            predecessors[level].next[level] = new_node
+        self._size += 1
+
+    def _find_predecessors(self, key, fingers=None):
+        """return last node whose key is less than key in each layer, search may start from fingers
+        which are predecessors of a smaller key
+        """
+        predecessors = [self._head] * self.MAX_HEIGHT
+        current = self._head
+        for level in range(self._height - 1, -1, -1):
+            # start from the rightmost one of finger and node descended from upper layer
+            if (
+                fingers is not None
+                and fingers[level] is not self._head
+                and (current is self._head or current.key < fingers[level].key)
+            ):
+                current = fingers[level]
+            next_node = current.next[level]
+            while next_node is not None and next_node.key < key:
+                current = next_node
+                next_node = current.next[level]
+            predecessors[level] = current
+        return predecessors
+
+    def _find_greater_or_equal(self, key):
+        current = self._head
+        for level in range(self._height - 1, -1, -1):
+            next_node = current.next[level]
+            while next_node is not None and next_node.key < key:
+                current = next_node
+                next_node = current.next[level]
+            if next_node is not None and next_node.key == key:
+                return next_node
+        return current.next[0]
+
+    def _find_less_than(self, key):
+        """last node whose key is less than key, last node of list if key is None"""
+        current = self._head
+        for level in range(self._height - 1, -1, -1):
+            next_node = current.next[level]
+            while next_node is not None and (key is None or next_node.key < key):
+                current = next_node
+                next_node = current.next[level]
+        return current
+
+    def _random_height(self):
+        height = 1
+        while height < self.MAX_HEIGHT and random.random() <= 0.5:
+            height += 1
+        return height
+
+    def _build_from_iterable(self, iterable):
+        if isinstance(iterable, dict):
+            iterable_dict = {key: value for key, value in iterable.items()}
+        else:
+            iterable_dict = {key: value for key, value in iterable}
+        # keys are sorted, append every node after tail of each layer
+        tails = [self._head] * self.MAX_HEIGHT
+        for key in sorted(iterable_dict.keys()):
+            height = self._random_height()
+            self._height = max(self._height, height)
+            node = LockFreeSkipListNode(key, iterable_dict[key], height)
+            for level in range(height):
+                tails[level].next[level] = node
+                tails[level] = node
+            self._size += 1
+
+    def __len__(self):
+        return self.size()
+
+    def __iter__(self):
+        return self.keys()
+
+    def __str__(self):
+        key_value_pairs = list(self.items())
+        return "{" + (", ".join(map(str, key_value_pairs))) + "}"
 
 
 class SkipListNode(object):
@@ -278,3 +538,15 @@ class SkipListNode(object):
         self.value = value
         self.right = right
         self.down = down
+
+
+class LockFreeSkipListNode(object):
+
+    __slots__ = ["key", "value", "next", "version"]
+
+    def __init__(self, key, value, height, version=0):
+        self.key = key
+        self.value = value
+        # successor in each layer
+        self.next = [None] * height
+        self.version = version
@@ -0,0 +1,120 @@
+import sys
+import os
+import random
+import tracemalloc
+import threading
+import concurrent.futures
+
+sys.path.append(
+    os.path.abspath(
+        os.path.join(
+            os.path.dirname(__file__),
+            os.path.pardir,
+            os.path.pardir,
+            os.path.pardir,
+            "lsm",
+        )
+    )
+)
+
+from storage.arena_skiplist import ArenaSkipList
+from storage.internal_key import InternalKey, KeyType
+from utils.skiplist import LockFreeSkipList
+
+
+def test_put_floor_and_items():
+    skiplist, expected = ArenaSkipList(), {}
+    for _ in range(100):
+        pairs = []
+        for _ in range(random.randint(1, 20)):
+            key, sequence_number = random.randint(1, 300), random.randint(1, 5)
+            type = KeyType.PUT if random.random() <= 0.8 else KeyType.DELETE
+            value = ("value", key, sequence_number) if type == KeyType.PUT else None
+            pairs.append((InternalKey(key, sequence_number, type), value))
+        if len(pairs) == 1:
+            skiplist.put(*pairs[0])
+        else:
+            skiplist.put_many(pairs)
+        for internal_key, value in pairs:
+            expected[(internal_key.key, internal_key.sequence_number)] = (
+                internal_key.type,
+                value,
+            )
+    assert len(skiplist) == len(expected)
+    assert [
+        ((k.key, k.sequence_number), (k.type, v)) for k, v in skiplist.items()
+    ] == sorted(expected.items())
+    for key in range(0, 302):
+        for sequence_number in range(0, 7):
+            candidates = [k for k in expected if k <= (key, sequence_number)]
+            result = skiplist.floor(InternalKey(key, sequence_number, KeyType.PUT))
+            if not candidates:
+                assert result is None
+            else:
+                floor_key, value = result
+                assert (floor_key.key, floor_key.sequence_number) == max(candidates)
+                assert (floor_key.type, value) == expected[max(candidates)]
+
+
+def test_range_iteration():
+    skiplist = ArenaSkipList(
+        [(InternalKey(key, 1, KeyType.PUT), key) for key in range(0, 100, 2)]
+    )
+    assert [k.key for k, _ in skiplist.items(InternalKey(31, 0, KeyType.PUT))] == list(
+        range(32, 100, 2)
+    )
+    assert [k.key for k, _ in skiplist.items(InternalKey(32, 0, KeyType.PUT))] == list(
+        range(32, 100, 2)
+    )
+    assert [
+        k.key for k, _ in skiplist.reversed_items(InternalKey(30, 0, KeyType.PUT))
+    ] == list(range(28, -1, -2))
+    assert [k.key for k, _ in skiplist.reversed_items()] == list(range(98, -1, -2))
+
+
+def test_memory_usage_is_real_and_compact():
+    pairs = [(InternalKey(key, 1, KeyType.PUT), key) for key in range(3000)]
+    tracemalloc.start()
+    start = tracemalloc.get_traced_memory()[0]
+    arena_skiplist = ArenaSkipList(pairs)
+    arena_bytes = tracemalloc.get_traced_memory()[0] - start
+    start = tracemalloc.get_traced_memory()[0]
+    object_skiplist = LockFreeSkipList(
+        [(InternalKey(key, 1, KeyType.PUT), key + 1000000) for key in range(3000)]
+    )
+    object_bytes = tracemalloc.get_traced_memory()[0] - start
+    tracemalloc.stop()
+    # allocator may over-allocate growing buffers
+    assert arena_skiplist.memory_usage <= arena_bytes <= arena_skiplist.memory_usage * 2
+    assert arena_bytes * 4 < object_bytes
+
+
+def test_concurrent_read_and_write():
+    def write_func():
+        keys = list(range(0, 4000, 2))
+        random.shuffle(keys)
+        for start in range(0, len(keys), 50):
+            skiplist.put_many(
+                [
+                    (InternalKey(key, 1, KeyType.PUT), key)
+                    for key in keys[start : start + 50]
+                ]
+            )
+        done.set()
+
+    def read_func():
+        while not done.is_set():
+            key = random.randint(0, 4000)
+            result = skiplist.floor(InternalKey(key, 1, KeyType.PUT))
+            assert result is None or (
+                result[0].key <= key and result[1] == result[0].key
+            )
+            keys = [k.key for k, _ in skiplist.items()]
+            assert keys == sorted(keys)
+
+    skiplist, done = ArenaSkipList(), threading.Event()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=3) as pool:
+        futures = [pool.submit(write_func)] + [pool.submit(read_func) for _ in range(2)]
+        for future in futures:
+            future.result()
+    assert [k.key for k, _ in skiplist.items()] == list(range(0, 4000, 2))
@@ -0,0 +1,191 @@
+import sys
+import os
+import inspect
+import shutil
+import random
+
+sys.path.append(
+    os.path.abspath(
+        os.path.join(
+            os.path.dirname(__file__),
+            os.path.pardir,
+            os.path.pardir,
+            os.path.pardir,
+            "lsm",
+        )
+    )
+)
+
+
+package_root = os.path.abspath(
+    os.path.join(
+        os.path.dirname(__file__),
+        os.path.pardir,
+        os.path.pardir,
+        "packages",
+        "storage",
+        "bulk_load",
+    )
+)
+
+from storage import sstable
+from storage.lsm_client import LSMClient
+
+
+def test_bulk_load_into_deepest_non_overlapping_level():
+    _clean_up()
+    client = LSMClient()
+    assert client.bulk_load((key, _padded(key)) for key in range(0, 20000)) == 20000
+    assert client.bulk_load((key, -key) for key in range(10000, 30000)) == 20000
+    assert client.bulk_load((key, key) for key in range(50000, 50010)) == 10
+    assert client.bulk_load([]) == 0
+    sstables = client._manifest.sstables
+    # large loads are split into several sstables
+    assert len([sstable for sstable in sstables if sstable.max_key < 20000]) > 1
+    assert set(sstable.table_level for sstable in sstables) == {5, 6}
+    for key in range(0, 30000, 7):
+        assert client.get(key) == (_padded(key) if key < 10000 else -key)
+    assert client.get(50005) == 50005 and client.get(40000) is None
+    client.put(1, "new")
+    assert client.get(1) == "new"
+    client.close()
+
+    client = LSMClient()
+    assert client.get(1) == "new" and client.get(20000) == -20000
+    assert list(client.scan(9998, 10002)) == [
+        (9998, _padded(9998)),
+        (9999, _padded(9999)),
+        (10000, -10000),
+        (10001, -10001),
+    ]
+    client.close()
+
+
+def test_bulk_loaded_sstables_use_filter_policy_of_target_level():
+    _clean_up()
+    level_filter_policy = sstable._level_filter_policy
+    sstable._level_filter_policy = lambda conf, level: (
+        "partitioned" if level > 0 else "block"
+    )
+    try:
+        client = LSMClient()
+        assert client.bulk_load((key, _padded(key)) for key in range(0, 20000)) == 20000
+        sstables = client._manifest.sstables
+        assert len(sstables) > 1 and set(s.table_level for s in sstables) == {6}
+        for metadata in sstables:
+            with client._table_cache.reader(
+                metadata.table_level, metadata.table_name
+            ) as reader:
+                assert reader.filter_policy == "partitioned"
+        assert client.get(12345) == _padded(12345)
+        client.close()
+    finally:
+        sstable._level_filter_policy = level_filter_policy
+
+
+def test_bulk_load_flushes_older_versions_in_memtable():
+    _clean_up()
+    client = LSMClient()
+    for key in range(100):
+        client.put(key, "old")
+    client.remove(50)
+    client.put(1000, "untouched")
+    assert client.bulk_load((key, "loaded") for key in range(0, 200, 2)) == 100
+    # overlapped memtable data is flushed into level 0, loaded data has to stay in level 0
+    assert set(sstable.table_level for sstable in client._manifest.sstables) == {0}
+    for key in range(200):
+        assert client.get(key) == (
+            "loaded" if key % 2 == 0 else "old" if key < 100 else None
+        )
+    assert client.get(1000) == "untouched"
+    client.close()
+
+
+def test_bulk_load_rejects_unsorted_keys():
+    _clean_up()
+    client = LSMClient()
+    try:
+        client.bulk_load([(1, 1), (3, 3), (2, 2)])
+        assert False, "unsorted keys should be rejected"
+    except Exception as e:
+        assert "strictly increasing" in str(e)
+    assert client._manifest.sstables == set()
+    assert not any(
+        os.listdir(os.path.join("sstables", level))
+        for level in os.listdir("sstables")
+        if level.isdigit()
+    )
+    client.close()
+
+
+def test_bulk_load_rejected_if_concurrent_writes_are_compacted_below():
+    def pairs():
+        yield "a", "bulk-old"
+        client.put("a", "newer")
+        # flush and compact the write into level 1 before the load registers
+        while not any(sstable.table_level > 0 for sstable in client._manifest.sstables):
+            client.put("m" + str(random.randint(0, 1000)), "filler")
+        yield "z", "bulk-old"
+
+    _clean_up()
+    with open("lsm_conf.ini", "w") as f:
+        f.write("[MEMTABLE]\nMEMTABLE_SIZE_LIMIT = 4096\n")
+    client = LSMClient("lsm_conf.ini")
+    try:
+        client.bulk_load(pairs())
+        assert False, "loaded data would shadow newer writes"
+    except Exception as e:
+        assert "conflicts with concurrent writes" in str(e)
+    assert client.get("a") == "newer" and client.get("z") is None
+    # loads without conflicts still go through
+    assert client.bulk_load([("zz", "loaded")]) == 1
+    assert client.get("zz") == "loaded"
+    client.close()
+
+
+def test_snapshot_taken_during_bulk_load_never_sees_loaded_data():
+    snapshots = []
+
+    def pairs():
+        yield "b1", 1
+        # later writes are not visible until the load registers
+        client.put("a", 1)
+        snapshots.append(client.snapshot())
+        assert client.get("a") is None and snapshots[0].get("b1") is None
+        yield "b2", 2
+
+    _clean_up()
+    client = LSMClient()
+    assert client.bulk_load(pairs()) == 2
+    assert snapshots[0].get("b1") is None and snapshots[0].get("a") is None
+    snapshots[0].release()
+    assert client.get("a") == 1 and client.get("b1") == 1
+    # visibility is not held back after failed loads either
+    try:
+        client.bulk_load([("c", 1), ("c", 2)])
+        assert False, "unsorted keys should be rejected"
+    except Exception:
+        pass
+    client.put("d", 1)
+    assert client.get("d") == 1
+    client.close()
+
+
+def _padded(key):
+    return "{:0100d}".format(key)
+
+
+def _clean_up():
+    frame = inspect.currentframe()
+    while frame:
+        name = frame.f_code.co_name
+        if name.startswith("test_"):
+            path = os.path.join(package_root, name)
+            if os.path.exists(path):
+                # remove directory temporary
+                shutil.rmtree(path)
+            os.makedirs(path)
+            # all storage files are created in working directory
+            os.chdir(path)
+            break
+        frame = frame.f_back
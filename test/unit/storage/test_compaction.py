@@ -0,0 +1,274 @@
+import sys
+import os
+import inspect
+import shutil
+import random
+import configparser
+
+sys.path.append(
+    os.path.abspath(
+        os.path.join(
+            os.path.dirname(__file__),
+            os.path.pardir,
+            os.path.pardir,
+            os.path.pardir,
+            "lsm",
+        )
+    )
+)
+
+
+package_root = os.path.abspath(
+    os.path.join(
+        os.path.dirname(__file__),
+        os.path.pardir,
+        os.path.pardir,
+        "packages",
+        "storage",
+        "compaction",
+    )
+)
+
+from storage.compaction import (
+    Compaction,
+    LeveledCompactionStrategy,
+    SizeTieredCompactionStrategy,
+)
+from storage.manifest import SSTableMetadata
+from storage.sstable import SSTableWriter, SSTableReader
+from storage.table_cache import TableCache
+from storage.internal_key_value import InternalKeyValue
+from storage.internal_key import KeyType
+from storage.lsm_client import LSMClient
+
+
+def test_pick_level0_compaction_with_overlapping_level1_sstables():
+    strategy = LeveledCompactionStrategy()
+    level0 = [
+        SSTableMetadata(0, "l0_" + str(i), 100, i * 10, i * 10 + 15) for i in range(4)
+    ]
+    overlapping = SSTableMetadata(1, "l1_a", 100, 40, 50)
+    disjoint = SSTableMetadata(1, "l1_b", 100, 60, 70)
+    deeper = SSTableMetadata(2, "l2", 100, 0, 100)
+
+    assert strategy.pick_compaction(level0[:3] + [overlapping, disjoint]) is None
+    compaction = strategy.pick_compaction(level0 + [overlapping, disjoint, deeper])
+    assert compaction.output_level == 1
+    assert set(compaction.inputs) == set(level0 + [overlapping])
+    assert not compaction.is_base_level_for_key(50)
+    assert compaction.is_base_level_for_key(200)
+
+
+def test_pick_oversized_level_in_round_robin():
+    strategy = LeveledCompactionStrategy()
+    level1 = [
+        SSTableMetadata(1, "l1_" + str(i), 4 * 1024 * 1024, i * 10, i * 10 + 5)
+        for i in range(4)
+    ]
+    level2 = [SSTableMetadata(2, "l2", 100, 12, 18)]
+    picked = []
+    for _ in range(5):
+        compaction = strategy.pick_compaction(level1 + level2)
+        assert compaction.output_level == 2
+        picked.append(
+            min(s for s in compaction.inputs if s.table_level == 1).table_name
+        )
+        if picked[-1] == "l1_1":
+            assert level2[0] in compaction.inputs
+    assert picked == ["l1_0", "l1_1", "l1_2", "l1_3", "l1_0"]
+
+
+def test_pick_size_tiered_bucket():
+    strategy = SizeTieredCompactionStrategy()
+    mb = 1024 * 1024
+    small = [
+        SSTableMetadata(0, "small_" + str(i), 1024 * i, 0, 10) for i in range(1, 4)
+    ]
+    medium = [
+        SSTableMetadata(0, "medium_" + str(i), 8 * mb + i, 0, 10) for i in range(4)
+    ]
+    large = [SSTableMetadata(0, "large", 64 * mb, 0, 10)]
+    deeper = [SSTableMetadata(1, "deeper", 8 * mb, 0, 10)]
+
+    assert strategy.pick_compaction(small + large + deeper + medium[:3]) is None
+    compaction = strategy.pick_compaction(small + medium + large + deeper)
+    assert compaction.output_level == 0
+    assert set(compaction.inputs) == set(medium)
+    # other level 0 sstables may hold older versions
+    assert not compaction.is_base_level_for_key(5)
+    # so may deeper levels
+    compaction = strategy.pick_compaction(
+        medium + [SSTableMetadata(2, "deep", mb, 20, 30)]
+    )
+    assert not compaction.is_base_level_for_key(25)
+    assert compaction.is_base_level_for_key(5)
+
+
+def test_compaction_drops_shadowed_versions_and_tombstones():
+    _clean_up()
+    newer = _write_sstable(
+        0,
+        "newer",
+        [("a", 5, KeyType.PUT), ("b", 6, KeyType.DELETE), ("c", 7, KeyType.DELETE)],
+    )
+    older = _write_sstable(
+        1,
+        "older",
+        [("a", 1, KeyType.PUT), ("b", 2, KeyType.PUT), ("d", 3, KeyType.PUT)],
+    )
+    # "c" may still exist in deeper level
+    deeper = SSTableMetadata(2, "deeper", 100, "c", "c")
+    compaction = Compaction([newer, older], 1, [deeper])
+    table_cache = TableCache(10, 1024 * 1024)
+    writers = compaction.run(table_cache, smallest_snapshot=10)
+    assert len(writers) == 1
+    reader = SSTableReader(1, writers[0].table_name)
+    assert [(r.key, r.sequence_number, r.type) for r in reader.items()] == [
+        ("a", 5, KeyType.PUT),
+        ("c", 7, KeyType.DELETE),
+        ("d", 3, KeyType.PUT),
+    ]
+    # old versions are visible to snapshot 5
+    writers = compaction.run(table_cache, smallest_snapshot=5)
+    reader = SSTableReader(1, writers[0].table_name)
+    assert [(r.key, r.sequence_number) for r in reader.items()] == [
+        ("a", 5),
+        ("b", 2),
+        ("b", 6),
+        ("c", 7),
+        ("d", 3),
+    ]
+
+
+def test_size_tiered_compaction_splits_oversized_tier():
+    _clean_up()
+    conf = configparser.ConfigParser()
+    conf.read(
+        os.path.join(
+            os.path.dirname(__file__),
+            os.path.pardir,
+            os.path.pardir,
+            os.path.pardir,
+            "lsm",
+            "conf",
+            "lsm_conf.ini",
+        )
+    )
+    conf["COMPACTION"]["SIZE_TIERED_MAX_SSTABLE_SIZE"] = "8192"
+    sstables = [
+        _write_sstable(
+            0,
+            "tier_" + str(i),
+            [(key, i + 1, KeyType.PUT) for key in range(i, 2000, 4)],
+        )
+        for i in range(4)
+    ]
+    compaction = SizeTieredCompactionStrategy(conf).pick_compaction(sstables)
+    writers = compaction.run(TableCache(10, 1024 * 1024), smallest_snapshot=10)
+    assert len(writers) > 1
+    assert all(writer.table_level == 0 for writer in writers)
+    assert all(
+        previous.max_key < writer.min_key
+        for previous, writer in zip(writers, writers[1:])
+    )
+
+
+def test_client_compacts_level0_sstables():
+    _clean_up()
+    client, expected = _new_client(), {}
+    for _ in range(6000):
+        key = random.randint(1, 500)
+        if random.random() <= 0.8:
+            expected[key] = random.randint(1, 100000)
+            client.put(key, expected[key])
+        else:
+            expected.pop(key, None)
+            client.remove(key)
+    for key in range(1, 501):
+        assert client.get(key) == expected.get(key)
+    client.close()
+    levels = [sstable.table_level for sstable in client._manifest.sstables]
+    assert levels.count(1) > 0
+    # only live sstables are left on disk
+    table_names = set()
+    for level in os.listdir("sstables"):
+        if level.isdigit():
+            table_names.update(
+                name
+                for name in os.listdir(os.path.join("sstables", level))
+                if "." not in name
+            )
+    assert table_names == set(
+        sstable.table_name for sstable in client._manifest.sstables
+    )
+
+    client = _new_client()
+    for key in range(1, 501):
+        assert client.get(key) == expected.get(key)
+    client.close()
+
+
+def test_client_with_size_tiered_compaction():
+    _clean_up()
+    client, expected = _new_client("size_tiered"), {}
+    for _ in range(6000):
+        key = random.randint(1, 500)
+        if random.random() <= 0.8:
+            expected[key] = random.randint(1, 100000)
+            client.put(key, expected[key])
+        else:
+            expected.pop(key, None)
+            client.remove(key)
+    client.close()
+    sstables = client._manifest.sstables
+    assert all(sstable.table_level == 0 for sstable in sstables) and len(sstables) < 8
+
+    client = _new_client("size_tiered")
+    for key in range(1, 501):
+        assert client.get(key) == expected.get(key)
+    client.close()
+
+
+def _write_sstable(table_level, table_name, records):
+    writer = SSTableWriter(table_level, table_name)
+    for key, sequence_number, type in records:
+        writer.append(InternalKeyValue(key, sequence_number, type, key))
+    writer.close()
+    return SSTableMetadata(
+        table_level, table_name, writer.table_size, writer.min_key, writer.max_key
+    )
+
+
+def _new_client(strategy="leveled"):
+    conf_path = os.path.join(_test_case_package_root(), "lsm_conf.ini")
+    with open(conf_path, "w") as f:
+        f.write("[MEMTABLE]\nMEMTABLE_SIZE_LIMIT = 4096\n")
+        f.write("[COMPACTION]\nSTRATEGY = {}\n".format(strategy))
+    return LSMClient(conf_path)
+
+
+def _test_case_package_root():
+    frame = inspect.currentframe()
+    while frame:
+        name = frame.f_code.co_name
+        if name.startswith("test_"):
+            path = os.path.join(package_root, name)
+            return path
+        frame = frame.f_back
+    assert Exception("Test case package path is not found")
+
+
+def _clean_up():
+    frame = inspect.currentframe()
+    while frame:
+        name = frame.f_code.co_name
+        if name.startswith("test_"):
+            path = os.path.join(package_root, name)
+            if os.path.exists(path):
+                # remove directory temporary
+                shutil.rmtree(path)
+            os.makedirs(path)
+            # all storage files are created in working directory
+            os.chdir(path)
+            break
+        frame = frame.f_back
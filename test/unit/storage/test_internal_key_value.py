@@ -2,6 +2,8 @@ import sys
 import os
 import inspect
 import shutil
+import io
+import pickle
 
 sys.path.append(
     os.path.abspath(
@@ -29,6 +31,76 @@ package_root = os.path.abspath(
 )
 
 from internal_key_value import InternalKeyValue
+from internal_key import KeyType
+
+
+def test_serialize_and_deserialize():
+    records = [
+        InternalKeyValue("key", 1, KeyType.PUT, "value"),
+        InternalKeyValue(b"bytes", 2, KeyType.PUT, b""),
+        InternalKeyValue(-12345, 3, KeyType.PUT, 1 << 70),
+        InternalKeyValue(("tuple", 1), 4, KeyType.PUT, {"a": [1, 2]}),
+        InternalKeyValue("key", 5, KeyType.PUT, None),
+        InternalKeyValue("key", (1 << 62) - 1, KeyType.DELETE),
+    ]
+    byte_array = b"".join(record.serialize() for record in records)
+    file_io, decoded, position = io.BytesIO(byte_array), [], 0
+    for record in records:
+        _assert_same(InternalKeyValue.deserialize(file_io), record)
+        internal_key_value, position = InternalKeyValue.decode(byte_array, position)
+        _assert_same(internal_key_value, record)
+    assert InternalKeyValue.deserialize(file_io) is None
+    assert InternalKeyValue.decode(byte_array, position) == (None, position)
+
+
+def test_encoding_is_smaller_than_pickle():
+    record = InternalKeyValue("key", 1, KeyType.PUT, 12345)
+    assert len(record.serialize()) < len(_serialize_v1(record)) // 2
+
+
+def test_read_version_1_records():
+    records = [
+        InternalKeyValue("key", 1, KeyType.PUT, ("value", 1)),
+        InternalKeyValue(100, 2, KeyType.DELETE),
+    ]
+    byte_array = b"".join(_serialize_v1(record) for record in records)
+    file_io, position = io.BytesIO(byte_array), 0
+    for record in records:
+        _assert_same(InternalKeyValue.deserialize(file_io), record)
+        internal_key_value, position = InternalKeyValue.decode(byte_array, position)
+        _assert_same(internal_key_value, record)
+
+
+def test_truncated_records_are_rejected():
+    byte_array = InternalKeyValue("key", 1, KeyType.PUT, "value").serialize()
+    for length in range(len(byte_array)):
+        assert InternalKeyValue.deserialize(io.BytesIO(byte_array[:length])) is None
+        assert InternalKeyValue.decode(byte_array[:length]) == (None, 0)
+
+
+def _assert_same(internal_key_value, expected):
+    assert (
+        internal_key_value.key,
+        internal_key_value.sequence_number,
+        internal_key_value.type,
+        internal_key_value.value,
+    ) == (expected.key, expected.sequence_number, expected.type, expected.value)
+
+
+def _serialize_v1(internal_key_value):
+    """legacy encoding, key and value are pickled with 4 bytes length"""
+    header = internal_key_value.sequence_number
+    if internal_key_value.type == KeyType.PUT:
+        header |= 1 << 63
+    byte_array = bytearray(header.to_bytes(8, "big"))
+    fields = [internal_key_value.key]
+    if internal_key_value.type == KeyType.PUT:
+        fields.append(internal_key_value.value)
+    for field in fields:
+        field = pickle.dumps(field)
+        byte_array.extend(len(field).to_bytes(4, "big"))
+        byte_array.extend(field)
+    return bytes(byte_array)
 
 
 def _test_case_package_root():
@@ -0,0 +1,390 @@
+import sys
+import os
+import inspect
+import shutil
+import random
+import threading
+import concurrent.futures
+
+sys.path.append(
+    os.path.abspath(
+        os.path.join(
+            os.path.dirname(__file__),
+            os.path.pardir,
+            os.path.pardir,
+            os.path.pardir,
+            "lsm",
+        )
+    )
+)
+
+
+package_root = os.path.abspath(
+    os.path.join(
+        os.path.dirname(__file__),
+        os.path.pardir,
+        os.path.pardir,
+        "packages",
+        "storage",
+        "lsm_client",
+    )
+)
+
+from storage.lsm_client import LSMClient
+from storage.write_batch import WriteBatch
+
+
+def test_put_get_and_remove():
+    _clean_up()
+    client = _new_client()
+    client.put("a", 1)
+    client.put("b", 2)
+    client.put("a", 3)
+    client.remove("b")
+    assert client.get("a") == 3 and client.get("b") is None and client.get("c") is None
+    client.close()
+
+
+def test_get_with_sequence_number():
+    _clean_up()
+    client = _new_client()
+    client.put("a", 1)
+    sequence_number = client._sequence_manager.current
+    client.put("a", 2)
+    client.remove("a")
+    assert client.get("a", sequence_number) == 1
+    assert client.get("a", sequence_number + 1) == 2
+    assert client.get("a") is None
+    client.close()
+
+
+def test_write_batch():
+    _clean_up()
+    client = _new_client()
+    client.put("a", 1)
+    batch = WriteBatch().put("b", 2).remove("a").put("c", 3).put("c", 4)
+    for key in range(200):
+        batch.put("key" + str(key), key)
+    client.write(batch)
+    client.write(WriteBatch())
+    # all operations in batch share one sequence number
+    assert client._sequence_manager.current == 2
+    assert client.get("a") is None and client.get("a", 1) == 1
+    assert client.get("b") == 2 and client.get("c") == 4 and client.get("b", 1) is None
+    client.close()
+    client = _new_client()
+    assert client.get("a") is None and client.get("c") == 4
+    assert all(client.get("key" + str(key)) == key for key in range(200))
+    client.close()
+
+
+def test_readers_see_all_or_none_of_write_batch():
+    _clean_up()
+    client = _new_client()
+    skiplist = client._memtable._skiplist
+    put_many, half_applied, resume = (
+        skiplist.put_many,
+        threading.Event(),
+        threading.Event(),
+    )
+
+    def slow_put_many(items):
+        # apply one key of the batch, then pause
+        put_many(items[:1])
+        half_applied.set()
+        resume.wait()
+        put_many(items[1:])
+
+    skiplist.put_many = slow_put_many
+    writer = threading.Thread(
+        target=client.write, args=(WriteBatch().put("a", 1).put("b", 1),)
+    )
+    writer.start()
+    half_applied.wait()
+    try:
+        assert (client.get("a"), client.get("b")) == (None, None)
+        assert client.multi_get(["a", "b"]) == [None, None]
+        assert list(client.scan()) == []
+    finally:
+        resume.set()
+        writer.join()
+    assert client.multi_get(["a", "b"]) == [1, 1]
+    client.close()
+
+
+def test_memtable_is_flushed_into_sstables():
+    _clean_up()
+    client, expected = _new_client(), {}
+    for _ in range(3000):
+        key = random.randint(1, 300)
+        if random.random() <= 0.8:
+            expected[key] = random.randint(1, 100000)
+            client.put(key, expected[key])
+        else:
+            expected.pop(key, None)
+            client.remove(key)
+    for key in range(1, 301):
+        assert client.get(key) == expected.get(key)
+    client.close()
+    assert len(client._manifest.sstables) > 0
+
+    # recover from manifest and logs
+    client = _new_client()
+    for key in range(1, 301):
+        assert client.get(key) == expected.get(key)
+    client.close()
+
+
+def test_arena_memtable():
+    _clean_up()
+    client, expected = _new_client("MEMTABLE_TYPE = arena\n"), {}
+    for _ in range(3000):
+        key = random.randint(1, 300)
+        if random.random() <= 0.8:
+            expected[key] = random.randint(1, 100000)
+            client.put(key, expected[key])
+        else:
+            expected.pop(key, None)
+            client.remove(key)
+    assert client._memtable.byte_size == client._memtable._skiplist.memory_usage
+    for key in range(1, 301):
+        assert client.get(key) == expected.get(key)
+    client.close()
+    assert len(client._manifest.sstables) > 0
+
+    client = _new_client("MEMTABLE_TYPE = arena\n")
+    for key in range(1, 301):
+        assert client.get(key) == expected.get(key)
+    client.close()
+
+
+def test_mmap_sstable_reads():
+    _clean_up()
+    client, expected = _new_client("[SSTABLE]\nUSE_MMAP = true\n"), {}
+    for _ in range(3000):
+        key = random.randint(1, 300)
+        expected[key] = random.randint(1, 100000)
+        client.put(key, expected[key])
+    assert len(client._manifest.sstables) > 0
+    for key in range(1, 301):
+        assert client.get(key) == expected.get(key)
+    assert list(client.scan()) == sorted(expected.items())
+    client.close()
+
+
+def test_sstable_and_compaction_options_from_conf_path():
+    conf = (
+        "[SSTABLE]\nCOMPRESSION = zlib\nLEVEL_FILTER_POLICIES = full, full, full, full\n"
+        "[COMPACTION]\nLEVEL0_COMPACTION_TRIGGER = 2\n"
+    )
+    _clean_up()
+    client = _new_client(conf)
+    assert client._compaction_strategy._level0_compaction_trigger == 2
+    for key in range(1000):
+        client.put(key, "x" * 50)
+    client.close()
+    client = _new_client(conf)
+    assert client._manifest.sstables
+    for metadata in client._manifest.sstables:
+        with client._table_cache.reader(
+            metadata.table_level, metadata.table_name
+        ) as reader:
+            assert reader.filter_policy == "full"
+            sstable_index = reader.sstable_indexes[0]
+            # compression type byte of zlib at block tail
+            assert reader._read(sstable_index.offset, sstable_index.length)[-1] == 1
+    assert all(client.get(key) == "x" * 50 for key in range(1000))
+    client.close()
+
+
+def test_scan():
+    _clean_up()
+    client, expected = _new_client(), {}
+    for _ in range(3000):
+        key = random.randint(1, 300)
+        if random.random() <= 0.8:
+            expected[key] = random.randint(1, 100000)
+            client.put(key, expected[key])
+        else:
+            expected.pop(key, None)
+            client.remove(key)
+    sequence_number, snapshot = client._sequence_manager.current, dict(expected)
+    for key in range(1, 301, 3):
+        client.put(key, -key)
+        expected[key] = -key
+    # data lives in memtable, immutable memtable and sstables
+    assert len(client._manifest.sstables) > 0
+    assert list(client.scan()) == sorted(expected.items())
+    assert list(client.scan(50, 100)) == sorted(
+        (key, value) for key, value in expected.items() if 50 <= key < 100
+    )
+    assert list(client.scan(50, 100, reverse=True)) == sorted(
+        ((key, value) for key, value in expected.items() if 50 <= key < 100),
+        reverse=True,
+    )
+    assert list(client.scan(end=100, sequence_number=sequence_number)) == sorted(
+        (key, value) for key, value in snapshot.items() if key < 100
+    )
+    assert list(
+        client.scan(200, reverse=True, sequence_number=sequence_number)
+    ) == sorted(
+        ((key, value) for key, value in snapshot.items() if key >= 200), reverse=True
+    )
+    # scan streams lazily, closing it unpins sstables
+    iterator = client.scan()
+    assert next(iterator) == min(expected.items())
+    assert sum(client._active_read_epochs.values()) == 1
+    iterator.close()
+    assert sum(client._active_read_epochs.values()) == 0
+    client.close()
+
+
+def test_multi_get():
+    for memtable_conf in ("", "MEMTABLE_TYPE = arena\n"):
+        _clean_up()
+        client, expected = _new_client(memtable_conf), {}
+        for _ in range(3000):
+            key = random.randint(1, 300)
+            if random.random() <= 0.8:
+                expected[key] = random.randint(1, 100000)
+                client.put(key, expected[key])
+            else:
+                expected.pop(key, None)
+                client.remove(key)
+        snapshot, snapshot_expected = client.snapshot(), dict(expected)
+        for key in range(1, 301, 3):
+            client.put(key, -key)
+            expected[key] = -key
+        assert len(client._manifest.sstables) > 0
+        keys = list(range(320, 0, -1)) + [5, 5, 0]
+        assert client.multi_get(keys) == [expected.get(key) for key in keys]
+        assert snapshot.multi_get(keys) == [snapshot_expected.get(key) for key in keys]
+        snapshot.release()
+        assert client.multi_get([]) == []
+        assert sum(client._active_read_epochs.values()) == 0
+        client.close()
+
+
+def test_concurrent_read_and_write():
+    def write_func(start_value):
+        for value in range(start_value, start_value + 500):
+            client.put(value, value)
+
+    def read_func():
+        for _ in range(500):
+            key = random.randint(0, 2000)
+            assert client.get(key) in (None, key)
+
+    _clean_up()
+    client = _new_client()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=6) as pool:
+        futures = [pool.submit(write_func, start) for start in [0, 500, 1000, 1500]]
+        futures.extend([pool.submit(read_func) for _ in range(2)])
+        for future in futures:
+            future.result()
+    for key in range(2000):
+        assert client.get(key) == key
+    client.close()
+
+
+def test_group_commit_coalesces_concurrent_writes():
+    def write_func(start_value):
+        for value in range(start_value, start_value + 200):
+            client.put(value, value)
+
+    _clean_up()
+    client = _new_client("LOG_SYNC = fsync\nGROUP_COMMIT_MAX_DELAY = 1\n")
+    memtable_log = client._memtable._memtable_log
+    write_logs_in_batch, appends = memtable_log.write_logs_in_batch, []
+
+    def counting_write_logs_in_batch(key_value_batch):
+        appends.append(len(key_value_batch))
+        return write_logs_in_batch(key_value_batch)
+
+    memtable_log.write_logs_in_batch = counting_write_logs_in_batch
+    with concurrent.futures.ThreadPoolExecutor(max_workers=8) as pool:
+        futures = [pool.submit(write_func, start) for start in range(0, 1600, 200)]
+        for future in futures:
+            future.result()
+    # every write gets its own sequence number
+    assert client._sequence_manager.current == 1600
+    assert sum(appends) == 1600 and len(appends) < 1600
+    for key in range(1600):
+        assert client.get(key) == key
+    client.close()
+
+
+def test_background_error_fails_later_writes():
+    _clean_up()
+    client = _new_client()
+
+    def failing_flush(immutable_memtable):
+        raise Exception("disk full")
+
+    client._flush_immutable_memtable = failing_flush
+    try:
+        # memtable is frozen once it is full, then its flush fails
+        for key in range(100000):
+            client.put(key, key)
+        assert False, "writes should fail after background error"
+    except Exception as e:
+        assert "disk full" in str(e)
+    assert client.get(0) == 0
+    for operation in [
+        lambda: client.put("a", 1),
+        lambda: client.bulk_load([("b", 1)]),
+        client.close,
+    ]:
+        try:
+            operation()
+            assert False, "background error should be raised"
+        except Exception as e:
+            assert "background work failed: disk full" in str(e)
+
+
+def test_recover_with_log_sync_none():
+    _clean_up()
+    client = _new_client("LOG_SYNC = none\n")
+    for key in range(100):
+        client.put(key, key)
+    client.remove(0)
+    client.close()
+    client = _new_client("LOG_SYNC = none\n")
+    assert client.get(0) is None
+    for key in range(1, 100):
+        assert client.get(key) == key
+    client.close()
+
+
+def _new_client(memtable_conf=""):
+    conf_path = os.path.join(_test_case_package_root(), "lsm_conf.ini")
+    with open(conf_path, "w") as f:
+        f.write("[MEMTABLE]\nMEMTABLE_SIZE_LIMIT = 4096\n" + memtable_conf)
+    return LSMClient(conf_path)
+
+
+def _test_case_package_root():
+    frame = inspect.currentframe()
+    while frame:
+        name = frame.f_code.co_name
+        if name.startswith("test_"):
+            path = os.path.join(package_root, name)
+            return path
+        frame = frame.f_back
+    assert Exception("Test case package path is not found")
+
+
+def _clean_up():
+    frame = inspect.currentframe()
+    while frame:
+        name = frame.f_code.co_name
+        if name.startswith("test_"):
+            path = os.path.join(package_root, name)
+            if os.path.exists(path):
+                # remove directory temporary
+                shutil.rmtree(path)
+            os.makedirs(path)
+            # all storage files are created in working directory
+            os.chdir(path)
+            break
+        frame = frame.f_back
@@ -0,0 +1,100 @@
+import sys
+import os
+import inspect
+import shutil
+
+sys.path.append(
+    os.path.abspath(
+        os.path.join(
+            os.path.dirname(__file__),
+            os.path.pardir,
+            os.path.pardir,
+            os.path.pardir,
+            "lsm",
+        )
+    )
+)
+
+
+package_root = os.path.abspath(
+    os.path.join(
+        os.path.dirname(__file__),
+        os.path.pardir,
+        os.path.pardir,
+        "packages",
+        "storage",
+        "sequence_manager",
+    )
+)
+
+from storage.sequence_manager import SequenceManager
+from storage.lsm_client import LSMClient
+
+
+def test_allocate_without_io_per_number():
+    _clean_up()
+    sequence_manager = SequenceManager()
+    writes, write_value_to_disk = [], sequence_manager._write_value_to_disk
+
+    def counting_write_value_to_disk(value):
+        writes.append(value)
+        write_value_to_disk(value)
+
+    sequence_manager._write_value_to_disk = counting_write_value_to_disk
+    lease_size = sequence_manager._lease_size
+    assert [next(sequence_manager) for _ in range(3)] == [1, 2, 3]
+    assert sequence_manager.allocate(10) == 4 and sequence_manager.current == 13
+    for _ in range(lease_size):
+        next(sequence_manager)
+    assert len(writes) == 2 and writes[-1] > sequence_manager.current
+    sequence_manager.close()
+
+
+def test_restart_never_reuses_numbers():
+    _clean_up()
+    sequence_manager = SequenceManager()
+    sequence_manager.allocate(100)
+    sequence_manager.close()
+    sequence_manager = SequenceManager()
+    assert next(sequence_manager) > 100
+    sequence_manager.advance_to(10)
+    sequence_manager.advance_to(10**7)
+    assert next(sequence_manager) == 10**7 + 1
+    sequence_manager.close()
+    assert SequenceManager().current >= 10**7 + 1
+
+
+def test_recover_from_logs_when_sequence_number_file_is_lost():
+    _clean_up()
+    client = LSMClient()
+    for key in range(100):
+        client.put(key, key)
+    client.close()
+    os.remove("sequence_number")
+    client = LSMClient()
+    assert client._sequence_manager.current == 100
+    client.put(0, -1)
+    assert client.get(0) == -1
+    client.close()
+    # legacy file which holds concatenated values is treated as lost
+    with open("sequence_number", "w") as f:
+        f.write("1234 5")
+    client = LSMClient()
+    assert client._sequence_manager.current == 101 and client.get(0) == -1
+    client.close()
+
+
+def _clean_up():
+    frame = inspect.currentframe()
+    while frame:
+        name = frame.f_code.co_name
+        if name.startswith("test_"):
+            path = os.path.join(package_root, name)
+            if os.path.exists(path):
+                # remove directory temporary
+                shutil.rmtree(path)
+            os.makedirs(path)
+            # all storage files are created in working directory
+            os.chdir(path)
+            break
+        frame = frame.f_back
@@ -0,0 +1,161 @@
+import sys
+import os
+import inspect
+import shutil
+import random
+import threading
+
+sys.path.append(
+    os.path.abspath(
+        os.path.join(
+            os.path.dirname(__file__),
+            os.path.pardir,
+            os.path.pardir,
+            os.path.pardir,
+            "lsm",
+        )
+    )
+)
+
+
+package_root = os.path.abspath(
+    os.path.join(
+        os.path.dirname(__file__),
+        os.path.pardir,
+        os.path.pardir,
+        "packages",
+        "storage",
+        "snapshot",
+    )
+)
+
+from storage.lsm_client import LSMClient
+from storage.write_batch import WriteBatch
+
+
+def test_snapshot_reads_survive_compaction():
+    _clean_up()
+    client, expected = _new_client(), {}
+    for key in range(300):
+        client.put(key, key)
+    snapshot = client.snapshot()
+    compacted_snapshots = []
+    compact = client._compact
+
+    def recording_compact(compaction):
+        with client._lock:
+            compacted_snapshots.append(min(client._snapshots, default=None))
+        return compact(compaction)
+
+    client._compact = recording_compact
+    # keep writing until versions of snapshot are compacted into level 1
+    while not any(sstable.table_level > 0 for sstable in client._manifest.sstables):
+        key = random.randint(0, 299)
+        if random.random() <= 0.8:
+            expected[key] = random.randint(1, 100000)
+            client.put(key, expected[key])
+        else:
+            expected[key] = None
+            client.remove(key)
+    assert snapshot.sequence_number in compacted_snapshots
+    for key in range(300):
+        assert snapshot.get(key) == key
+        assert client.get(key) == expected.get(key, key)
+    assert list(snapshot.scan(end=10, reverse=True)) == [
+        (key, key) for key in range(9, -1, -1)
+    ]
+
+    # compaction uses latest sequence number after all snapshots are released
+    snapshot.release()
+    snapshot.release()
+    compacted_snapshots.clear()
+    while None not in compacted_snapshots:
+        client.put(random.randint(0, 299), 0)
+    client.close()
+
+
+def test_snapshot_limit():
+    _clean_up()
+    client = _new_client("[SNAPSHOT]\nSNAPSHOT_LIMIT = 2\n")
+    first, second = client.snapshot(), client.snapshot()
+    try:
+        client.snapshot()
+        assert False, "snapshot limit is exceeded"
+    except Exception as e:
+        assert "limit" in str(e)
+    first.release()
+    with client.snapshot() as third:
+        assert third.sequence_number == second.sequence_number
+    second.release()
+    client.close()
+
+
+def test_snapshot_does_not_see_group_being_committed():
+    _clean_up()
+    client = _new_client()
+    client.put("a", 0)
+    skiplist = client._memtable._skiplist
+    put_many, half_applied, resume = (
+        skiplist.put_many,
+        threading.Event(),
+        threading.Event(),
+    )
+
+    def slow_put_many(items):
+        put_many(items[:1])
+        half_applied.set()
+        resume.wait()
+        put_many(items[1:])
+
+    skiplist.put_many = slow_put_many
+    writer = threading.Thread(
+        target=client.write, args=(WriteBatch().put("a", 1).put("b", 1),)
+    )
+    writer.start()
+    half_applied.wait()
+    try:
+        snapshot = client.snapshot()
+        assert (snapshot.get("a"), snapshot.get("b")) == (0, None)
+    finally:
+        resume.set()
+        writer.join()
+    # reads of snapshot are repeatable after the group is committed
+    assert (snapshot.get("a"), snapshot.get("b")) == (0, None)
+    snapshot.release()
+    with client.snapshot() as snapshot:
+        assert (snapshot.get("a"), snapshot.get("b")) == (1, 1)
+    client.close()
+
+
+def _new_client(extra_conf=""):
+    conf_path = os.path.join(_test_case_package_root(), "lsm_conf.ini")
+    with open(conf_path, "w") as f:
+        f.write("[MEMTABLE]\nMEMTABLE_SIZE_LIMIT = 4096\n" + extra_conf)
+    return LSMClient(conf_path)
+
+
+def _test_case_package_root():
+    frame = inspect.currentframe()
+    while frame:
+        name = frame.f_code.co_name
+        if name.startswith("test_"):
+            path = os.path.join(package_root, name)
+            return path
+        frame = frame.f_back
+    assert Exception("Test case package path is not found")
+
+
+def _clean_up():
+    frame = inspect.currentframe()
+    while frame:
+        name = frame.f_code.co_name
+        if name.startswith("test_"):
+            path = os.path.join(package_root, name)
+            if os.path.exists(path):
+                # remove directory temporary
+                shutil.rmtree(path)
+            os.makedirs(path)
+            # all storage files are created in working directory
+            os.chdir(path)
+            break
+        frame = frame.f_back
@@ -0,0 +1,482 @@
+import sys
+import os
+import inspect
+import shutil
+import pickle
+import random
+import configparser
+
+sys.path.append(
+    os.path.abspath(
+        os.path.join(
+            os.path.dirname(__file__),
+            os.path.pardir,
+            os.path.pardir,
+            os.path.pardir,
+            "lsm",
+        )
+    )
+)
+
+
+package_root = os.path.abspath(
+    os.path.join(
+        os.path.dirname(__file__),
+        os.path.pardir,
+        os.path.pardir,
+        "packages",
+        "storage",
+        "sstable",
+    )
+)
+
+from storage.sstable import (
+    SSTableWriter,
+    SSTableReader,
+    move_sstable,
+    delete_sstable,
+    _level_filter_policy,
+)
+from storage.sstable_block import SSTableBlockReader
+from storage.sstable_block_index import SSTableBlockIndex
+from storage.internal_key_value import InternalKeyValue
+from storage.internal_key import KeyType
+from utils.lru_cache import LRUCache
+from utils.bloomfilter import BytesBloomFilter
+
+
+def test_write_and_read_all_records():
+    _clean_up()
+    records = _write_sstable("table", range(2000), versions=2)
+    reader = SSTableReader(0, "table")
+    assert len(reader.sstable_indexes) > 1
+    assert [(r.key, r.sequence_number, r.value) for r in reader.items()] == [
+        (r.key, r.sequence_number, r.value) for r in records
+    ]
+    reader.close()
+
+
+def test_point_lookup_with_sequence_number():
+    _clean_up()
+    _write_sstable("table", range(0, 2000, 2), versions=3)
+    reader = SSTableReader(0, "table")
+    for key in random.sample(range(0, 2000, 2), 200):
+        # versions of key use sequence numbers 1, 2 and 3
+        assert reader.get(key, 3).value == (key, 3)
+        assert reader.get(key, 2).value == (key, 2)
+        assert reader.get(key, 0) is None
+    for key in random.sample(range(1, 2000, 2), 200):
+        assert reader.get(key, 3) is None
+    assert reader.get(-1, 3) is None and reader.get(5000, 3) is None
+    reader.close()
+
+
+def test_point_lookup_reads_at_most_one_block_for_missing_keys():
+    _clean_up()
+    _write_sstable("table", range(0, 4000, 2), versions=1)
+    reader = SSTableReader(0, "table")
+    load_block, loaded_blocks = reader.load_block, []
+
+    def counting_load_block(offset, length):
+        loaded_blocks.append(offset)
+        return load_block(offset, length)
+
+    reader.load_block = counting_load_block
+    for key in range(1, 4000, 2):
+        assert reader.get(key, 1) is None
+    # bloom filters should skip almost all blocks, about 1% false positives by default
+    assert len(loaded_blocks) <= 50
+    loaded_blocks.clear()
+    assert reader.get(100, 1).value == (100, 1)
+    assert len(loaded_blocks) == 1
+    reader.close()
+
+
+def test_get_many_shares_block_reads():
+    _clean_up()
+    _write_sstable("table", range(0, 4000, 2), versions=2)
+    reader = SSTableReader(0, "table")
+    load_block, loaded_blocks = reader.load_block, []
+
+    def counting_load_block(offset, length):
+        loaded_blocks.append(offset)
+        return load_block(offset, length)
+
+    reader.load_block = counting_load_block
+    keys = list(range(-10, 4010))
+    result = reader.get_many(keys, 1)
+    assert result == {
+        key: reader.get(key, 1) for key in keys if reader.get(key, 1) is not None
+    }
+    assert sorted(result) == list(range(0, 4000, 2))
+    assert all(result[key].value == (key, 1) for key in result)
+    loaded_blocks.clear()
+    reader.get_many(keys, 2)
+    # keys at the end of a block may look up the next block again
+    assert len(loaded_blocks) <= 2 * len(reader.sstable_indexes)
+    assert reader.get_many([], 2) == {}
+    reader.close()
+
+
+def test_versions_of_one_key_span_several_blocks():
+    _clean_up()
+    writer = SSTableWriter(0, "table")
+    for sequence_number in range(1, 301):
+        writer.append(InternalKeyValue("key", sequence_number, KeyType.PUT, "x" * 100))
+    writer.append(InternalKeyValue("key", 301, KeyType.DELETE))
+    writer.close()
+    reader = SSTableReader(0, "table")
+    assert len(reader.sstable_indexes) > 1
+    assert reader.get("key", 150).sequence_number == 150
+    assert reader.get("key", 300).sequence_number == 300
+    assert reader.get("key", 1000).type == KeyType.DELETE
+    reader.close()
+
+
+def test_scan_range():
+    _clean_up()
+    records = _write_sstable("table", range(0, 2000, 2), versions=2)
+    reader = SSTableReader(0, "table")
+
+    def expected(start, end):
+        return [
+            (r.key, r.sequence_number)
+            for r in records
+            if (start is None or r.key >= start) and (end is None or r.key < end)
+        ]
+
+    for start, end in [
+        (None, None),
+        (100, 301),
+        (101, 300),
+        (-5, 10),
+        (1990, 5000),
+        (300, 100),
+    ]:
+        assert [
+            (r.key, r.sequence_number) for r in reader.scan(start, end)
+        ] == expected(start, end)
+        assert [
+            (r.key, r.sequence_number) for r in reader.scan(start, end, reverse=True)
+        ] == list(reversed(expected(start, end)))
+    reader.close()
+
+
+def test_block_cache_avoids_reading_blocks_again():
+    _clean_up()
+    _write_sstable("table", range(2000), versions=1)
+    block_cache = LRUCache(1024 * 1024)
+    reader = SSTableReader(0, "table", block_cache)
+    for key in range(2000):
+        assert reader.get(key, 1).value == (key, 1)
+    misses = block_cache.misses
+    assert misses == len(reader.sstable_indexes)
+    for key in range(2000):
+        assert reader.get(key, 1).value == (key, 1)
+    assert block_cache.misses == misses and block_cache.hits == 4000 - misses
+    # a new reader of same sstable shares cached blocks
+    other_reader = SSTableReader(0, "table", block_cache)
+    assert other_reader.get(0, 1).value == (0, 1) and block_cache.misses == misses
+    # bulk reads don't fill cache
+    reader.close()
+    other_reader.close()
+    block_cache = LRUCache(1024 * 1024)
+    reader = SSTableReader(0, "table", block_cache)
+    assert len(list(reader.items(fill_cache=False))) == 2000 and len(block_cache) == 0
+    reader.close()
+
+
+def test_prefix_compressed_block_seeks_from_restart_point():
+    _clean_up()
+    writer = SSTableWriter(0, "table")
+    records = [
+        InternalKeyValue("user/profile/{:06d}".format(i), 1, KeyType.PUT, i)
+        for i in range(2000)
+    ]
+    for record in records:
+        writer.append(record)
+    writer.close()
+    # shared key prefixes are stored once per restart interval
+    assert writer.table_size < sum(len(record.serialize()) for record in records) * 0.6
+    reader = SSTableReader(0, "table")
+    sstable_index = reader.sstable_indexes[0]
+    block = reader.load_block(sstable_index.offset, sstable_index.length)
+    assert isinstance(block, SSTableBlockReader) and len(block._restarts) > 2
+    keys = [record.key for record in block]
+    assert keys == [record.key for record in records[: len(keys)]]
+    # decoding starts from the restart point before key
+    for key in keys[::7]:
+        assert next(block.iterate(key)).key == key
+    assert next(block.iterate(keys[20] + "a")).key == keys[21]
+    assert list(block.iterate(keys[-1] + "a")) == []
+    assert next(block.iterate("")).key == keys[0]
+    for record in random.sample(records, 100):
+        assert reader.get(record.key, 1).value == record.value
+    assert reader.get("user/profile/000100a", 1) is None
+    reader.close()
+
+
+def test_full_and_partitioned_filters():
+    _clean_up()
+    keys = list(range(0, 20000, 2))
+    memory_usages = {}
+    for filter_policy in ["block", "full", "partitioned"]:
+        writer = SSTableWriter(0, filter_policy, filter_policy=filter_policy)
+        for key in keys:
+            writer.append(InternalKeyValue(key, 1, KeyType.PUT, key))
+        writer.close()
+        block_cache = LRUCache(1024 * 1024)
+        reader = SSTableReader(0, filter_policy, block_cache)
+        assert reader.filter_policy == filter_policy
+        memory_usages[filter_policy] = reader.memory_usage
+        load_block, loaded_blocks = reader.load_block, []
+
+        def counting_load_block(offset, length):
+            loaded_blocks.append(offset)
+            return load_block(offset, length)
+
+        reader.load_block = counting_load_block
+        for key in random.sample(keys, 500):
+            assert reader.get(key, 1).value == key
+        # keys at block end may check next block without block filters
+        assert 500 <= len(loaded_blocks) <= 550
+        loaded_blocks.clear()
+        for key in range(1, 20000, 2):
+            assert reader.get(key, 1) is None
+        assert len(loaded_blocks) <= 250
+        assert reader.get(-1, 1) is None and reader.get(50000, 1) is None
+        reader.close()
+    # only index of filter partitions is held by reader
+    assert memory_usages["partitioned"] < memory_usages["full"]
+    assert memory_usages["full"] < memory_usages["block"]
+    reader = SSTableReader(0, "partitioned", LRUCache(1024 * 1024))
+    assert len(reader._filter_partitions) == 3
+    assert reader.get(100, 1).value == 100 and reader._block_cache.misses == 2
+    reader.close()
+
+
+def test_blocked_bloom_filters():
+    _clean_up()
+    keys = list(range(0, 4000, 2))
+    for filter_policy in ["block", "full"]:
+        writer = SSTableWriter(
+            0, filter_policy, filter_type="blocked", filter_policy=filter_policy
+        )
+        for key in keys:
+            writer.append(InternalKeyValue(key, 1, KeyType.PUT, key))
+        writer.close()
+        reader = SSTableReader(0, filter_policy)
+        block_filter = (
+            reader.sstable_filters[0]
+            if filter_policy == "block"
+            else reader._full_filter
+        )
+        assert type(block_filter.block_filter).__name__ == "BlockedBloomFilter"
+        assert all(reader.get(key, 1).value == key for key in keys)
+        assert all(reader.get(key, 1) is None for key in range(1, 4000, 2))
+        if filter_policy == "full":
+            assert all(block_filter.contains_many(keys))
+            assert sum(block_filter.contains_many(range(1, 4000, 2))) <= 50
+        reader.close()
+
+
+def test_level_filter_policy():
+    conf = configparser.ConfigParser()
+    conf.read_dict(
+        {
+            "SSTABLE": {
+                "FILTER_POLICY": "block",
+                "LEVEL_FILTER_POLICIES": "full, full,partitioned",
+            }
+        }
+    )
+    assert [_level_filter_policy(conf, level) for level in range(5)] == [
+        "full",
+        "full",
+        "partitioned",
+        "block",
+        "block",
+    ]
+    conf["SSTABLE"]["LEVEL_FILTER_POLICIES"] = ""
+    assert _level_filter_policy(conf, 0) == "block"
+
+
+def test_compressed_blocks():
+    _clean_up()
+    records = [
+        InternalKeyValue(
+            key, 1, KeyType.PUT, '{"id": %d, "name": "user", "tags": []}' % key
+        )
+        for key in range(2000)
+    ]
+    sizes = {}
+    for compression in ["none", "zlib", "lzma", "bz2"]:
+        writer = SSTableWriter(0, compression, compression=compression)
+        for record in records:
+            writer.append(record)
+        writer.close()
+        sizes[compression] = writer.table_size
+        for use_mmap in [False, True]:
+            reader = SSTableReader(
+                0, compression, LRUCache(1024 * 1024), use_mmap=use_mmap
+            )
+            assert [(r.key, r.value) for r in reader.items()] == [
+                (r.key, r.value) for r in records
+            ]
+            for record in random.sample(records, 100):
+                assert reader.get(record.key, 1).value == record.value
+            reader.close()
+    assert all(
+        sizes[compression] < sizes["none"] for compression in ["zlib", "lzma", "bz2"]
+    )
+
+
+def test_incompressible_blocks_are_stored_raw():
+    _clean_up()
+    records = [
+        InternalKeyValue(key, 1, KeyType.PUT, os.urandom(100)) for key in range(200)
+    ]
+    writer = SSTableWriter(0, "table", compression="zlib")
+    for record in records:
+        writer.append(record)
+    writer.close()
+    reader = SSTableReader(0, "table")
+    with open(os.path.join("sstables", "0", "table"), "rb") as f:
+        content = f.read()
+    for sstable_index in reader.sstable_indexes:
+        # compression type byte at block tail
+        assert content[sstable_index.offset + sstable_index.length - 1] == 0
+    assert [r.value for r in reader.items()] == [r.value for r in records]
+    reader.close()
+
+
+def test_mmap_reader():
+    _clean_up()
+    records = _write_sstable("table", range(0, 2000, 2), versions=2)
+    block_cache = LRUCache(1024 * 1024)
+    reader = SSTableReader(0, "table", block_cache, use_mmap=True)
+    assert reader._mmap is not None and reader._data_block_file.closed
+    assert [(r.key, r.sequence_number, r.value) for r in reader.items()] == [
+        (r.key, r.sequence_number, r.value) for r in records
+    ]
+    for key in random.sample(range(0, 2000, 2), 200):
+        assert reader.get(key, 1).value == (key, 1)
+        assert reader.get(key + 1, 2) is None
+    assert [r.key for r in reader.scan(100, 110, reverse=True)] == sorted(
+        list(range(100, 110, 2)) * 2, reverse=True
+    )
+    # decoded records don't reference mapping
+    records = list(reader.items(fill_cache=False))
+    reader.close()
+    assert reader._mmap.closed and records[0].value == (0, 1)
+    file_reader = SSTableReader(0, "table", use_mmap=False)
+    assert file_reader._mmap is None
+    assert file_reader.sstable_indexes[-1].max_key == 1998
+    file_reader.close()
+
+
+def test_sstable_is_a_single_file():
+    _clean_up()
+    records = _write_sstable("table", range(2000), versions=1)
+    assert os.listdir(os.path.join("sstables", "0")) == ["table"]
+    move_sstable(0, 1, "table")
+    reader = SSTableReader(1, "table")
+    assert [(r.key, r.value) for r in reader.items()] == [
+        (r.key, r.value) for r in records
+    ]
+    reader.close()
+    delete_sstable(1, "table")
+    assert os.listdir(os.path.join("sstables", "1")) == []
+
+
+def test_read_legacy_three_file_sstable():
+    _clean_up()
+    records = [InternalKeyValue(key, 1, KeyType.PUT, (key, 1)) for key in range(2000)]
+    # blocks of concatenated records, index and filters are in side files
+    filepath = os.path.join("sstables", "0", "table")
+    os.makedirs(os.path.dirname(filepath))
+    data, index, filters = bytearray(), bytearray(), bytearray()
+    for i in range(0, len(records), 100):
+        block_filter = BytesBloomFilter(size_estimate=512)
+        block = bytearray()
+        for record in records[i : i + 100]:
+            block.extend(record.serialize())
+            block_filter.add(record.key)
+        index.extend(
+            SSTableBlockIndex(
+                records[i + 99].key, len(data), len(block), len(filters)
+            ).serialize()
+        )
+        filters.extend(_legacy_filter_byte_array(block_filter))
+        data.extend(block)
+    for suffix, byte_array in [("", data), (".filter", filters), (".index", index)]:
+        with open(filepath + suffix, "wb") as f:
+            f.write(byte_array)
+    reader = SSTableReader(0, "table")
+    assert len(reader.sstable_indexes) > 1
+    assert [(r.key, r.value) for r in reader.items()] == [
+        (r.key, r.value) for r in records
+    ]
+    assert reader.get(100, 1).value == (100, 1)
+    reader.close()
+    move_sstable(0, 1, "table")
+    assert sorted(os.listdir(os.path.join("sstables", "1"))) == [
+        "table",
+        "table.filter",
+        "table.index",
+    ]
+    delete_sstable(1, "table")
+    assert os.listdir(os.path.join("sstables", "1")) == []
+
+
+def _legacy_filter_byte_array(block_filter):
+    """filter type and hash functions are pickled in legacy filter encoding"""
+    filter_type = pickle.dumps(type(block_filter))
+    bitmap = block_filter.bitmap.tobytes()
+    byte_array = bytearray(len(filter_type).to_bytes(4, "big") + filter_type)
+    byte_array.extend(len(bitmap).to_bytes(4, "big") + bitmap)
+    byte_array.append(len(block_filter.hash_functions))
+    for func in block_filter.hash_functions:
+        func_byte_array = pickle.dumps(func)
+        byte_array.extend(len(func_byte_array).to_bytes(4, "big") + func_byte_array)
+    return byte_array
+
+
+def _write_sstable(table_name, keys, versions):
+    writer, records = SSTableWriter(0, table_name), []
+    for key in keys:
+        for sequence_number in range(1, versions + 1):
+            record = InternalKeyValue(
+                key, sequence_number, KeyType.PUT, (key, sequence_number)
+            )
+            assert writer.append(record)
+            records.append(record)
+    writer.close()
+    return records
+
+
+def _test_case_package_root():
+    frame = inspect.currentframe()
+    while frame:
+        name = frame.f_code.co_name
+        if name.startswith("test_"):
+            path = os.path.join(package_root, name)
+            return path
+        frame = frame.f_back
+    assert Exception("Test case package path is not found")
+
+
+def _clean_up():
+    frame = inspect.currentframe()
+    while frame:
+        name = frame.f_code.co_name
+        if name.startswith("test_"):
+            path = os.path.join(package_root, name)
+            if os.path.exists(path):
+                # remove directory temporary
+                shutil.rmtree(path)
+            os.makedirs(path)
+            # all storage files are created in working directory
+            os.chdir(path)
+            break
+        frame = frame.f_back
@@ -0,0 +1,131 @@
+import sys
+import os
+import inspect
+import shutil
+
+sys.path.append(
+    os.path.abspath(
+        os.path.join(
+            os.path.dirname(__file__),
+            os.path.pardir,
+            os.path.pardir,
+            os.path.pardir,
+            "lsm",
+        )
+    )
+)
+
+
+package_root = os.path.abspath(
+    os.path.join(
+        os.path.dirname(__file__),
+        os.path.pardir,
+        os.path.pardir,
+        "packages",
+        "storage",
+        "table_cache",
+    )
+)
+
+from storage.table_cache import TableCache
+from storage.sstable import SSTableWriter
+from storage.internal_key_value import InternalKeyValue
+from storage.internal_key import KeyType
+
+
+def test_readers_are_opened_lazily_and_reused():
+    _clean_up()
+    _write_sstables(3)
+    table_cache = TableCache(10, 1024 * 1024)
+    assert len(table_cache._cache) == 0
+    with table_cache.reader(0, "table_0") as reader:
+        assert reader.get(0, 1).value == 0
+    with table_cache.reader(0, "table_0") as other_reader:
+        assert other_reader is reader
+    assert table_cache.stats()["size"] == 1
+    table_cache.close()
+    assert reader._data_block_file.closed
+
+
+def test_open_tables_are_bounded():
+    _clean_up()
+    _write_sstables(5)
+    table_cache = TableCache(2, 1024 * 1024)
+    readers = []
+    for i in range(5):
+        with table_cache.reader(0, "table_" + str(i)) as reader:
+            assert reader.get(i, 1).value == i
+            readers.append(reader)
+    assert len(table_cache._cache) == 2 and table_cache.stats()["evictions"] == 3
+    assert [reader._data_block_file.closed for reader in readers] == [
+        True,
+        True,
+        True,
+        False,
+        False,
+    ]
+    # bounded by memory of indexes and filters
+    table_cache = TableCache(10, max(reader.memory_usage for reader in readers) * 2)
+    for i in range(5):
+        with table_cache.reader(0, "table_" + str(i)) as reader:
+            pass
+    assert len(table_cache._cache) == 2
+
+
+def test_reader_in_use_is_closed_after_release():
+    _clean_up()
+    _write_sstables(2)
+    table_cache = TableCache(1, 1024 * 1024)
+    with table_cache.reader(0, "table_0") as reader:
+        # evict table_0 while it is still in use
+        with table_cache.reader(0, "table_1"):
+            pass
+        assert not reader._data_block_file.closed
+        assert reader.get(0, 1).value == 0
+    assert reader._data_block_file.closed
+
+
+def test_invalidate():
+    _clean_up()
+    _write_sstables(1)
+    table_cache = TableCache(10, 1024 * 1024)
+    with table_cache.reader(0, "table_0") as reader:
+        pass
+    table_cache.invalidate(0, "table_0")
+    assert reader._data_block_file.closed and len(table_cache._cache) == 0
+    with table_cache.reader(0, "table_0") as other_reader:
+        assert other_reader is not reader
+
+
+def _write_sstables(count):
+    for i in range(count):
+        writer = SSTableWriter(0, "table_" + str(i))
+        writer.append(InternalKeyValue(i, 1, KeyType.PUT, i))
+        writer.close()
+
+
+def _test_case_package_root():
+    frame = inspect.currentframe()
+    while frame:
+        name = frame.f_code.co_name
+        if name.startswith("test_"):
+            path = os.path.join(package_root, name)
+            return path
+        frame = frame.f_back
+    assert Exception("Test case package path is not found")
+
+
+def _clean_up():
+    frame = inspect.currentframe()
+    while frame:
+        name = frame.f_code.co_name
+        if name.startswith("test_"):
+            path = os.path.join(package_root, name)
+            if os.path.exists(path):
+                # remove directory temporary
+                shutil.rmtree(path)
+            os.makedirs(path)
+            # all storage files are created in working directory
+            os.chdir(path)
+            break
+        frame = frame.f_back
@@ -2,10 +2,10 @@ import sys
 import os
 import inspect
 import shutil
+import io
 import random
 import string
 
-
 sys.path.append(
     os.path.abspath(
         os.path.join(
@@ -31,7 +31,7 @@ package_root = os.path.abspath(
     )
 )
 
-from bloomfilter import BytesBloomFilter
+from bloomfilter import BytesBloomFilter, DoubleHashingBloomFilter, BlockedBloomFilter
 from bloomfilter_hash_functions import (
     Murmur32HashFunction,
     MD5HashFunction,
@@ -92,6 +92,95 @@ def test_bloom_filter_in_real_scenario():
     assert cnt <= 100
 
 
+def test_bloom_filter_serialize_without_pickle():
+    func_dict = {Murmur32HashFunction: 4, MD5HashFunction: 4, SHA1HashFunction: 4}
+    filter = BytesBloomFilter(func_dict, size_estimate=512)
+    values = [str(i) for i in range(512)]
+    for value in values:
+        filter.add(value)
+    byte_array = filter.serialize()
+    # bitmap, function count and 17 bytes for each function
+    assert len(byte_array) == 4 + len(filter.bitmap) // 8 + 1 + 17 * 12
+    deserialized = BytesBloomFilter.deserialize(io.BytesIO(byte_array))
+    assert deserialized.bitmap == filter.bitmap
+    assert [type(func).__name__ for func in deserialized.hash_functions] == [
+        type(func).__name__ for func in filter.hash_functions
+    ]
+    assert all(value in deserialized for value in values)
+    assert [str(i) in deserialized for i in range(512, 2000)] == [
+        str(i) in filter for i in range(512, 2000)
+    ]
+    assert BytesBloomFilter.deserialize(io.BytesIO(byte_array[:-1])) is None
+
+
+def test_double_hashing_bloom_filter_false_positive_rate():
+    values = ["".join(random.choices(string.ascii_letters, k=20)) for _ in range(10000)]
+    filter = DoubleHashingBloomFilter(len(values), false_positive_rate=0.01)
+    # about 9.6 bits per key and 7 hash indexes
+    assert filter.hash_count == 7 and filter.bits == 95856
+    for value in values:
+        filter.add(value)
+    assert all(value in filter for value in values)
+    false_positives = sum(str(i) in filter for i in range(100000))
+    assert false_positives <= 1500
+
+
+def test_double_hashing_bloom_filter_serialize():
+    filter = DoubleHashingBloomFilter(100, false_positive_rate=0.001, seed=7)
+    for value in range(100):
+        filter.add(value)
+    deserialized = DoubleHashingBloomFilter.deserialize(io.BytesIO(filter.serialize()))
+    assert deserialized.bitmap == filter.bitmap
+    assert (deserialized.hash_count, deserialized.seed) == (filter.hash_count, 7)
+    assert all(value in deserialized for value in range(100))
+    assert (
+        DoubleHashingBloomFilter.deserialize(io.BytesIO(filter.serialize()[:-1]))
+        is None
+    )
+
+
+def test_blocked_bloom_filter_contains_many():
+    values = ["".join(random.choices(string.ascii_letters, k=20)) for _ in range(10000)]
+    filter = BlockedBloomFilter(len(values), false_positive_rate=0.01)
+    assert filter.bits % 512 == 0 and filter.bits >= 95856
+    for value in values:
+        filter.add(value)
+    assert all(filter.contains_many(values))
+    missing_values = [str(i) for i in range(100000)]
+    result = filter.contains_many(missing_values)
+    assert result == [value in filter for value in missing_values]
+    assert sum(result) <= 2000
+    # probes see values added after last probe
+    filter.add("0")
+    assert filter.contains_many(["0"]) == [True]
+    deserialized = BlockedBloomFilter.deserialize(io.BytesIO(filter.serialize()))
+    assert (
+        deserialized.bitmap == filter.bitmap
+        and deserialized.hash_count == filter.hash_count
+    )
+    assert deserialized.contains_many(values + missing_values) == filter.contains_many(
+        values + missing_values
+    )
+
+
+def test_blocked_bloom_filter_with_few_items_round_trips():
+    for values in [["only"], ["a", "b"], ["a", "b", "c"]]:
+        filter = BlockedBloomFilter(len(values), false_positive_rate=0.01)
+        # hash count follows bits per key, not the whole block
+        assert filter.hash_count == 7
+        for value in values:
+            filter.add(value)
+        deserialized = BlockedBloomFilter.deserialize(io.BytesIO(filter.serialize()))
+        assert deserialized.hash_count == filter.hash_count
+        assert all(deserialized.contains_many(values))
+    assert BlockedBloomFilter(1, false_positive_rate=1e-20).hash_count == 30
+    try:
+        BlockedBloomFilter(hash_count=256)
+        assert False, "hash count can not be serialized in 8 bits"
+    except Exception as e:
+        assert "hash count" in str(e)
+
+
 def _test_case_package_root():
     frame = inspect.currentframe()
     while frame:
@@ -0,0 +1,75 @@
+import sys
+import os
+import random
+from bitarray import bitarray
+
+sys.path.append(
+    os.path.abspath(
+        os.path.join(
+            os.path.dirname(__file__),
+            os.path.pardir,
+            os.path.pardir,
+            os.path.pardir,
+            "lsm",
+            "utils",
+        )
+    )
+)
+
+from byte_utils import (
+    byte_array_to_integer,
+    byte_array_to_integers,
+    integers_to_byte_array,
+    integer_to_n_bytes_array,
+    byte_array_to_bitarray,
+    bitarray_to_byte_array,
+    encode_varint,
+    decode_varint,
+)
+
+
+def test_integer_and_byte_array_conversion():
+    for n in [1, 2, 3, 4, 8]:
+        for _ in range(100):
+            value = random.randint(0, (1 << (n * 8)) - 1)
+            byte_array = integer_to_n_bytes_array(value, n)
+            assert len(byte_array) == n and byte_array_to_integer(byte_array) == value
+    # higher bits are dropped
+    assert integer_to_n_bytes_array(0x1234, 1) == b"\x34"
+    assert byte_array_to_integer(memoryview(b"\x01\x00")) == 256
+
+
+def test_batch_integer_conversion():
+    for width in [1, 2, 3, 4, 8]:
+        values = [random.randint(0, (1 << (width * 8)) - 1) for _ in range(50)]
+        byte_array = integers_to_byte_array(values, width)
+        assert byte_array == b"".join(
+            integer_to_n_bytes_array(v, width) for v in values
+        )
+        assert byte_array_to_integers(byte_array, width) == values
+        assert byte_array_to_integers(byte_array, width, 3, width * 10) == values[10:13]
+    # values out of width are never masked silently
+    for values, width in [([1 << 32], 4), ([-1], 4), ([1 << 24], 3)]:
+        try:
+            integers_to_byte_array(values, width)
+            assert False, "overflow should be rejected"
+        except Exception as e:
+            assert "does not fit" in str(e)
+
+
+def test_bitarray_and_byte_array_conversion():
+    bit_array = bitarray("1011000011")
+    assert bitarray_to_byte_array(bit_array) == bytearray(b"\xb0\xc0")
+    assert bitarray_to_byte_array(bitarray("1011000011", endian="little")) == bytearray(
+        b"\xb0\xc0"
+    )
+    assert byte_array_to_bitarray(b"\xb0\xc0") == bitarray("1011000011000000")
+    byte_array = bytes(random.randint(0, 255) for _ in range(1000))
+    assert bitarray_to_byte_array(byte_array_to_bitarray(byte_array)) == byte_array
+
+
+def test_varint():
+    for value in [0, 1, 127, 128, 300, 1 << 40, 1 << 70]:
+        byte_array = b"\xff" + encode_varint(value)
+        assert decode_varint(byte_array, 1) == (value, len(byte_array))
+    assert decode_varint(encode_varint(1 << 40)[:-1]) is None
@@ -0,0 +1,91 @@
+import sys
+import os
+import random
+import concurrent.futures
+
+sys.path.append(
+    os.path.abspath(
+        os.path.join(
+            os.path.dirname(__file__),
+            os.path.pardir,
+            os.path.pardir,
+            os.path.pardir,
+            "lsm",
+            "utils",
+        )
+    )
+)
+
+from lru_cache import LRUCache
+
+
+def test_basic_put_and_get():
+    cache = LRUCache(10)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.put("a", 3)
+    assert cache.get("a") == 3 and cache.get("b") == 2 and cache.get("c") is None
+    assert len(cache) == 2 and cache.usage == 2
+    assert cache.hits == 2 and cache.misses == 1 and cache.evictions == 0
+
+
+def test_evict_least_recently_used_by_charge():
+    cache = LRUCache(100)
+    cache.put("a", 1, charge=40)
+    cache.put("b", 2, charge=40)
+    # touch "a", so "b" becomes least recently used
+    assert cache.get("a") == 1
+    cache.put("c", 3, charge=30)
+    assert "b" not in cache and "a" in cache and "c" in cache
+    assert cache.usage == 70 and cache.evictions == 1
+    # entry larger than capacity is never cached
+    cache.put("d", 4, charge=101)
+    assert "d" not in cache and cache.usage == 70
+
+
+def test_remove():
+    cache = LRUCache(100)
+    cache.put("a", 1, charge=10)
+    assert cache.remove("a") and not cache.remove("a")
+    assert cache.usage == 0 and len(cache) == 0
+
+
+def test_random_operations_against_reference():
+    capacity, cache = 50, LRUCache(50)
+    # (key, charge) pairs, least recently used first
+    reference = []
+    for _ in range(10000):
+        key = random.randint(1, 100)
+        keys = [entry[0] for entry in reference]
+        if random.random() <= 0.5:
+            charge = random.randint(1, 5)
+            cache.put(key, key * 2, charge=charge)
+            if key in keys:
+                reference.pop(keys.index(key))
+            reference.append((key, charge))
+            while sum(entry[1] for entry in reference) > capacity:
+                reference.pop(0)
+        else:
+            value = cache.get(key)
+            assert value == (key * 2 if key in keys else None)
+            if key in keys:
+                reference.append(reference.pop(keys.index(key)))
+        assert [node.value[0] for node in cache._list] == [
+            entry[0] for entry in reference
+        ]
+        assert cache.usage == sum(entry[1] for entry in reference)
+
+
+def test_multi_thread_put_and_get():
+    def thread_func(start_value):
+        for value in range(start_value, start_value + 1000):
+            cache.put(value, value, charge=1)
+            assert cache.get(value) in (None, value)
+
+    cache = LRUCache(500)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=4) as pool:
+        futures = [pool.submit(thread_func, start) for start in [0, 1000, 2000, 3000]]
+        for future in futures:
+            future.result()
+    assert len(cache) == 500 and cache.usage == 500
+    assert cache.evictions == 3500
@@ -3,9 +3,10 @@ import os
 import inspect
 import shutil
 import random
+import time
+import threading
 import concurrent.futures
 
-
 sys.path.append(
     os.path.abspath(
         os.path.join(
@@ -19,7 +20,7 @@ sys.path.append(
     )
 )
 
-from skiplist import SkipList
+from skiplist import SkipList, LockFreeSkipList
 
 
 def test_basic_skiplist_put_and_get():
@@ -113,6 +114,16 @@ def test_skiplist_floor():
     assert floor_result == ((7, 100), 200)
 
 
+def test_lock_free_skiplist_floor_many():
+    skiplist = LockFreeSkipList()
+    for key in range(0, 1000, 3):
+        skiplist.put(key, -key)
+    keys = sorted(random.sample(range(-10, 1010), 300))
+    assert skiplist.floor_many(keys) == [skiplist.floor(key) for key in keys]
+    assert skiplist.floor_many([]) == []
+    assert LockFreeSkipList().floor_many([1, 2]) == [None, None]
+
+
 def test_skiplist_remove():
     l = SkipList({1: 2, 3: 4, 5: 6})
 
@@ -232,6 +243,142 @@ def test_skiplist_multi_thread_put():
     assert list(l) == [value for value in range(1, 56)]
 
 
+def test_skiplist_put_many():
+    skiplist, comp_dict = SkipList(), {}
+    for _ in range(50):
+        key_value_pairs = [
+            (random.randint(1, 2000), random.randint(1, 10000))
+            for _ in range(random.randint(0, 100))
+        ]
+        skiplist.put_many(key_value_pairs)
+        comp_dict.update(key_value_pairs)
+    assert len(skiplist) == len(comp_dict)
+    assert list(skiplist.items()) == sorted(comp_dict.items())
+    # every layer is sorted and linked to layer below
+    for head in skiplist._heads:
+        node, keys = head.right, []
+        while node:
+            keys.append(node.key)
+            assert node.down is None or node.down.key == node.key
+            node = node.right
+        assert keys == sorted(set(keys))
+    for key in range(1, 2001):
+        assert skiplist.get(key) == comp_dict.get(key)
+
+
+def test_lock_free_skiplist_real_scenario():
+    comp_dict = {key: key for key in range(0, 1000, 3)}
+    l = LockFreeSkipList(comp_dict)
+    for _ in range(20000):
+        rand = random.random()
+        key = random.randint(1, 1000)
+        if rand <= 0.4:
+            l.put(key, key * 2)
+            comp_dict[key] = key * 2
+        elif rand <= 0.5:
+            pairs = [(random.randint(1, 1000), rand) for _ in range(10)]
+            l.put_many(pairs)
+            comp_dict.update(pairs)
+        elif rand <= 0.7:
+            assert l.remove(key) == (comp_dict.pop(key, None) is not None)
+        elif rand <= 0.8:
+            floor_keys = [k for k in comp_dict if k <= key]
+            expected = max(floor_keys) if floor_keys else None
+            assert l.floor(key) == (
+                (expected, comp_dict[expected]) if floor_keys else None
+            )
+        elif rand <= 0.9:
+            ceiling_keys = [k for k in comp_dict if k >= key]
+            expected = min(ceiling_keys) if ceiling_keys else None
+            assert l.ceiling(key) == (
+                (expected, comp_dict[expected]) if ceiling_keys else None
+            )
+        elif rand <= 0.9995:
+            assert l.get(key) == comp_dict.get(key)
+        else:
+            l.clear()
+            comp_dict.clear()
+    assert list(l.items()) == sorted(comp_dict.items())
+    assert len(l) == len(comp_dict)
+
+
+def test_lock_free_skiplist_concurrent_read_and_write():
+    def write_func():
+        keys = list(range(0, 20000, 2))
+        random.shuffle(keys)
+        for key in keys:
+            l.put(key, key)
+        done.set()
+
+    def read_func():
+        while not done.is_set():
+            key = random.randint(0, 20000)
+            assert l.get(key) in (None, key)
+            floor = l.floor(key)
+            assert floor is None or (floor[0] <= key and floor[0] % 2 == 0)
+            keys = list(l.keys())
+            assert keys == sorted(keys)
+
+    l, done = LockFreeSkipList(), threading.Event()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=4) as pool:
+        futures = [pool.submit(write_func)] + [pool.submit(read_func) for _ in range(3)]
+        for future in futures:
+            future.result()
+    assert list(l.keys()) == list(range(0, 20000, 2))
+
+
+def test_lock_free_skiplist_iterator_sees_consistent_view():
+    l = LockFreeSkipList([(key, key) for key in range(0, 100, 2)])
+    iterator = l.items()
+    assert next(iterator) == (0, 0)
+    # insertions after iteration starts are invisible, iterator doesn't block writer
+    l.put_many([(key, key) for key in range(1, 100, 2)])
+    assert list(iterator) == [(key, key) for key in range(2, 100, 2)]
+    assert len(list(l.items())) == 100
+
+
+def test_lock_free_skiplist_range_iteration():
+    l = LockFreeSkipList([(key, key) for key in range(0, 100, 2)])
+    assert list(l.keys()) == list(range(0, 100, 2))
+    assert [key for key, _ in l.items(31)] == list(range(32, 100, 2))
+    assert [key for key, _ in l.items(32)] == list(range(32, 100, 2))
+    assert [key for key, _ in l.reversed_items(31)] == list(range(30, -1, -2))
+    assert [key for key, _ in l.reversed_items(30)] == list(range(28, -1, -2))
+    assert [key for key, _ in l.reversed_items()] == list(range(98, -1, -2))
+    assert l.lower(0) is None and l.lower(1) == (0, 0) and l.lower(1000) == (98, 98)
+
+
+def test_benchmark_writes_while_iterating():
+    """global lock blocks writers during the whole iteration, lock-free one doesn't"""
+
+    def elapsed_writes_during_slow_iteration(skiplist):
+        def write_func():
+            start = time.perf_counter()
+            for key in range(1000, 3000):
+                skiplist.put(key, key)
+            elapsed.append(time.perf_counter() - start)
+
+        elapsed = []
+        iterator = skiplist.items()
+        next(iterator)
+        writer = threading.Thread(target=write_func)
+        writer.start()
+        # slow consumer
+        time.sleep(0.2)
+        for _ in iterator:
+            pass
+        writer.join()
+        return elapsed[0]
+
+    global_lock_elapsed = elapsed_writes_during_slow_iteration(
+        SkipList([(key, key) for key in range(1000)], global_lock=True)
+    )
+    lock_free_elapsed = elapsed_writes_during_slow_iteration(
+        LockFreeSkipList([(key, key) for key in range(1000)])
+    )
+    assert global_lock_elapsed >= 0.2 and lock_free_elapsed < global_lock_elapsed
+
+
 def test_skiplist_build_from_iterable():
     data_dict = {}
     for _ in range(1000):